@@ -0,0 +1,146 @@
+# benchmarks/fake_llm_server.py
+# OpenAI/DeepSeek 호환 가짜 LLM·임베딩 서버 (API 비용 없이 /chat 부하 테스트용)
+#
+#   python -m benchmarks.fake_llm_server --port 9100 --latency-ms 400 --jitter-ms 150 --catalog books_with_age.json
+#   DEEPSEEK_BASE_URL=http://127.0.0.1:9100/v1 OPENAI_BASE_URL=http://127.0.0.1:9100/v1 uvicorn main:app
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import time
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+LATENCY_MS = float(os.getenv("FAKE_LLM_LATENCY_MS", "300"))
+JITTER_MS = float(os.getenv("FAKE_LLM_JITTER_MS", "100"))
+EMBED_LATENCY_MS = float(os.getenv("FAKE_EMBED_LATENCY_MS", "50"))
+CATALOG_PATH = os.getenv("FAKE_LLM_CATALOG", "books_with_age.json")
+EMBEDDING_DIM = 1536
+
+QUESTIONS = [
+    "주말엔 혼자 쉬는 걸 좋아하세요, 친구들과 어울리는 걸 좋아하세요?",
+    "요즘 가장 관심 있는 주제는 무엇인가요?",
+    "학교에 다니시나요, 아니면 일을 하고 계신가요?",
+    "최근에 재미있게 읽은 책이 있나요?",
+]
+
+app = FastAPI(title="fake llm")
+stats = {"chat": 0, "stream": 0, "embeddings": 0, "embedded_texts": 0}
+_titles = []
+_vocab = []
+
+
+def _load_catalog(path: str):
+    global _titles, _vocab
+    if not os.path.exists(path):
+        return
+    with open(path, "r", encoding="utf-8") as f:
+        books = json.load(f)
+    _titles = [book["title"] for book in books if book.get("title")]
+    _vocab = sorted({kw["word"] for book in books for kw in book.get("keywords", [])}, key=len, reverse=True)
+
+
+async def _sleep(base_ms: float):
+    await asyncio.sleep(max(0.0, base_ms + random.uniform(-JITTER_MS, JITTER_MS)) / 1000)
+
+
+def _canned_answer(messages: list) -> str:
+    system = " ".join(m["content"] for m in messages if m["role"] == "system")
+    user = messages[-1]["content"] if messages else ""
+
+    if "high_level_keywords" in system or "high_level_keywords" in user:
+        # LightRAG 질의 키워드 추출
+        words = [w for w in _vocab if w in user][:4] or ["책"]
+        return json.dumps({"high_level_keywords": words[:2], "low_level_keywords": words}, ensure_ascii=False)
+    if '"keywords"' in system:
+        words = [w for w in _vocab if w in user][:5]
+        return json.dumps({"keywords": words or random.sample(_vocab or ["책"], min(2, len(_vocab) or 1))},
+                          ensure_ascii=False)
+    if '"titles"' in system:
+        candidates = re.findall(r"^\s*- (.+)$", system, flags=re.MULTILINE) or _titles
+        titles = random.sample(candidates, min(3, len(candidates))) if candidates else []
+        return json.dumps({"titles": titles}, ensure_ascii=False)
+    return random.choice(QUESTIONS)
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    payload = await request.json()
+    answer = _canned_answer(payload.get("messages", []))
+    model = payload.get("model", "fake")
+
+    if payload.get("stream"):
+        stats["stream"] += 1
+
+        async def events():
+            await _sleep(LATENCY_MS / 3)  # 첫 토큰까지
+            for piece in re.findall(r"\S+\s*", answer):
+                await asyncio.sleep(0.01)
+                chunk = {"choices": [{"index": 0, "delta": {"content": piece}}], "model": model}
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    stats["chat"] += 1
+    await _sleep(LATENCY_MS)
+    return {
+        "id": f"fake-{time.time_ns()}",
+        "object": "chat.completion",
+        "model": model,
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": answer}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+    }
+
+
+@app.post("/v1/embeddings")
+async def embeddings(request: Request):
+    payload = await request.json()
+    texts = payload["input"] if isinstance(payload["input"], list) else [payload["input"]]
+    stats["embeddings"] += 1
+    stats["embedded_texts"] += len(texts)
+    await _sleep(EMBED_LATENCY_MS)
+
+    data = []
+    for i, text in enumerate(texts):
+        # 같은 텍스트는 항상 같은 벡터 (해시 시드)
+        seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:4], "little")
+        vector = np.random.default_rng(seed).standard_normal(EMBEDDING_DIM).astype(np.float32)
+        vector /= np.linalg.norm(vector)
+        data.append({"object": "embedding", "index": i, "embedding": vector.tolist()})
+    return {"object": "list", "data": data, "model": payload.get("model", "fake")}
+
+
+@app.get("/stats")
+def get_stats():
+    return stats
+
+
+_load_catalog(CATALOG_PATH)
+
+
+def main():
+    global LATENCY_MS, JITTER_MS, EMBED_LATENCY_MS
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="OpenAI 호환 가짜 LLM/임베딩 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency-ms", type=float, default=LATENCY_MS)
+    parser.add_argument("--jitter-ms", type=float, default=JITTER_MS)
+    parser.add_argument("--embed-latency-ms", type=float, default=EMBED_LATENCY_MS)
+    parser.add_argument("--catalog", default=CATALOG_PATH)
+    args = parser.parse_args()
+
+    LATENCY_MS, JITTER_MS, EMBED_LATENCY_MS = args.latency_ms, args.jitter_ms, args.embed_latency_ms
+    _load_catalog(args.catalog)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
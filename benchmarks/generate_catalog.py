@@ -0,0 +1,61 @@
+# benchmarks/generate_catalog.py
+# 벤치마크용 가짜 books_with_age.json 생성기 (실제 data4library 응답과 같은 필드 구성)
+
+import argparse
+import json
+import os
+import random
+
+# 작업 디렉터리의 실제 books_with_age.json을 덮어쓰지 않도록 기본 출력은 벤치마크 전용 경로
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "out", "books_with_age.json")
+
+AGE_LABELS = ["8-13", "14-16", "17-19", "20-39", "40-59", "60-80"]
+CATEGORIES = ["문학", "사회과학", "자연과학", "역사", "예술", "철학", "기술과학", "언어"]
+KEYWORD_POOL = [
+    "친구", "학교", "가족", "모험", "우정", "성장", "환경", "인권", "역사", "과학", "우주", "동물",
+    "사랑", "여행", "요리", "음악", "미술", "경제", "심리", "철학", "마음", "왕따", "사회 문제", "진로",
+    "공부", "독서", "자연", "바다", "전쟁", "평화", "미래", "로봇", "인공지능", "건강", "운동", "취미",
+    "추리", "판타지", "마법", "용기", "도전", "꿈", "행복", "위로", "고민", "중학생", "고등학생", "직장",
+]
+TITLE_WORDS = ["작은", "푸른", "비밀의", "마지막", "우리들의", "빛나는", "조용한", "낯선", "따뜻한", "어느"]
+TITLE_NOUNS = ["정원", "여름", "편지", "도서관", "숲", "기차", "섬", "하늘", "약속", "시간"]
+
+
+def generate_books(size: int, seed: int = 42) -> list:
+    rng = random.Random(seed)
+    books = []
+    for i in range(size):
+        title = f"{rng.choice(TITLE_WORDS)} {rng.choice(TITLE_NOUNS)} {i + 1}"
+        keywords = rng.sample(KEYWORD_POOL, rng.randint(8, 20))
+        books.append({
+            "title": title,
+            "authors": f"작가{rng.randint(1, size // 3 + 1)}",
+            "publisher": f"출판사{rng.randint(1, 50)}",
+            "publication_year": str(rng.randint(1990, 2025)),
+            "class_nm": f"{rng.choice(CATEGORIES)} > {rng.choice(CATEGORIES)}",
+            "isbn13": f"979{i:010d}",
+            "summary": " ".join(f"{title}은(는) {kw}에 관한 이야기입니다." for kw in keywords[:6]),
+            "keywords": [{"word": kw, "weight": rng.randint(1, 40)} for kw in keywords],
+            "imageUrl": f"https://example.com/cover/{i}.jpg",
+            "bookUrl": f"https://example.com/book/{i}",
+            "age": sorted(rng.sample(AGE_LABELS, rng.randint(1, 2)), key=AGE_LABELS.index),
+        })
+    return books
+
+
+def main():
+    parser = argparse.ArgumentParser(description="벤치마크용 합성 도서 카탈로그 생성")
+    parser.add_argument("--size", type=int, default=720, help="도서 수 (예: 100, 720, 5000, 50000)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    books = generate_books(args.size, args.seed)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(books, f, ensure_ascii=False, indent=2)
+    print(f"📚 {args.output}: {len(books)}권 생성")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+# benchmarks/load_test.py
+# 여러 가상 사용자가 /users -> /chat (여러 턴) -> /book-recommend 흐름을 동시에 실행하며 지연/처리량을 측정
+#
+#   python -m benchmarks.load_test --base-url http://127.0.0.1:8000 --users 50 --concurrency 10 --turns 6
+#   python -m benchmarks.load_test ... --output result.json --baseline baseline.json --max-regression 0.2
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import httpx
+
+USER_MESSAGES = [
+    "안녕하세요! 책 추천 받고 싶어요.",
+    "요즘 중학생 딸이 학교에서 친구 문제로 고민이 많아요.",
+    "주말엔 혼자 조용히 음악 듣는 걸 좋아해요.",
+    "사회 문제에 관심 많은 고등학생인데 환경이나 인권 쪽 책이 좋아요.",
+    "우주나 과학 이야기도 재미있어요.",
+    "마음이 따뜻해지는 성장 이야기를 읽고 싶어요.",
+    "추리나 판타지 소설도 좋아해요.",
+    "진로 고민이 있어서 꿈과 도전에 관한 책이면 좋겠어요.",
+]
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def read_rss_mb(pid: int) -> float:
+    """리눅스 /proc 기준 상주 메모리(MB). 읽을 수 없으면 0"""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return 0.0
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    def add(self, endpoint: str, seconds: float, ok: bool):
+        self.latencies.setdefault(endpoint, [])
+        self.errors.setdefault(endpoint, 0)
+        if ok:
+            self.latencies[endpoint].append(seconds)
+        else:
+            self.errors[endpoint] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        endpoints = {}
+        for endpoint, values in self.latencies.items():
+            ms = [v * 1000 for v in values]
+            endpoints[endpoint] = {
+                "count": len(values),
+                "errors": self.errors[endpoint],
+                "p50_ms": round(percentile(ms, 50), 1),
+                "p95_ms": round(percentile(ms, 95), 1),
+                "p99_ms": round(percentile(ms, 99), 1),
+                "max_ms": round(max(ms, default=0.0), 1),
+                "rps": round(len(values) / elapsed, 2) if elapsed else 0.0,
+            }
+        total = sum(len(v) for v in self.latencies.values())
+        return {"elapsed_sec": round(elapsed, 2), "requests": total,
+                "rps": round(total / elapsed, 2) if elapsed else 0.0, "endpoints": endpoints}
+
+
+async def _timed(client: httpx.AsyncClient, recorder: Recorder, endpoint: str, payload: dict):
+    started = time.perf_counter()
+    try:
+        response = await client.post(endpoint, json=payload)
+        ok = response.status_code < 400
+        recorder.add(endpoint, time.perf_counter() - started, ok)
+        return response.json() if ok else None
+    except httpx.HTTPError:
+        recorder.add(endpoint, time.perf_counter() - started, False)
+        return None
+
+
+async def run_conversation(client: httpx.AsyncClient, recorder: Recorder, user_no: int, turns: int, rng: random.Random):
+    user = await _timed(client, recorder, "/users", {"name": f"벤치{user_no}"})
+    if not user:
+        return
+    for message in rng.sample(USER_MESSAGES, min(turns, len(USER_MESSAGES))):
+        reply = await _timed(client, recorder, "/chat", {"userId": user["userId"], "userMessage": message})
+        if reply and reply.get("canRecommend"):
+            await _timed(client, recorder, "/book-recommend", {"userId": user["userId"], "name": user["name"]})
+            return
+
+
+async def run_load_test(base_url: str, users: int, concurrency: int, turns: int,
+                        server_pid: int = None, seed: int = 7, timeout: float = 120.0) -> dict:
+    recorder = Recorder()
+    rng = random.Random(seed)
+    semaphore = asyncio.Semaphore(concurrency)
+    peak_rss = [read_rss_mb(server_pid) if server_pid else 0.0]
+    start_rss = peak_rss[0]
+
+    async def one(user_no):
+        async with semaphore:
+            await run_conversation(client, recorder, user_no, turns, random.Random(rng.random()))
+
+    async def sample_memory():
+        while True:
+            peak_rss[0] = max(peak_rss[0], read_rss_mb(server_pid))
+            await asyncio.sleep(0.2)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits) as client:
+        sampler = asyncio.create_task(sample_memory()) if server_pid else None
+        started = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(users)))
+        elapsed = time.perf_counter() - started
+        if sampler is not None:
+            sampler.cancel()
+
+    result = recorder.summary(elapsed)
+    result["config"] = {"users": users, "concurrency": concurrency, "turns": turns}
+    if server_pid:
+        result["memory_mb"] = {"start": round(start_rss, 1), "peak": round(peak_rss[0], 1)}
+    return result
+
+
+def check_regression(result: dict, baseline: dict, max_regression: float) -> list:
+    """엔드포인트별 p95가 기준보다 max_regression 비율 이상 느려졌거나 처리량이 줄었으면 메시지 반환"""
+    problems = []
+    for endpoint, base in baseline.get("endpoints", {}).items():
+        current = result["endpoints"].get(endpoint)
+        if current is None:
+            continue
+        if base["p95_ms"] and current["p95_ms"] > base["p95_ms"] * (1 + max_regression):
+            problems.append(f"{endpoint} p95 {base['p95_ms']}ms -> {current['p95_ms']}ms")
+        if current["errors"] > base.get("errors", 0):
+            problems.append(f"{endpoint} 오류 {base.get('errors', 0)} -> {current['errors']}")
+    if baseline.get("rps") and result["rps"] < baseline["rps"] * (1 - max_regression):
+        problems.append(f"처리량 {baseline['rps']} -> {result['rps']} req/s")
+    if "memory_mb" in baseline and "memory_mb" in result:
+        if result["memory_mb"]["peak"] > baseline["memory_mb"]["peak"] * (1 + max_regression):
+            problems.append(f"최대 메모리 {baseline['memory_mb']['peak']}MB -> {result['memory_mb']['peak']}MB")
+    return problems
+
+
+def print_report(result: dict):
+    print(f"⏱️ {result['elapsed_sec']}s 동안 {result['requests']}건, {result['rps']} req/s")
+    for endpoint, r in result["endpoints"].items():
+        print(f" - {endpoint:16s} n={r['count']:5d} err={r['errors']:3d} "
+              f"p50={r['p50_ms']:8.1f}ms p95={r['p95_ms']:8.1f}ms p99={r['p99_ms']:8.1f}ms")
+    if "memory_mb" in result:
+        print(f"🧠 서버 메모리: 시작 {result['memory_mb']['start']}MB / 최대 {result['memory_mb']['peak']}MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/chat, /book-recommend 부하 테스트")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--server-pid", type=int, help="메모리 측정용 서버 프로세스 PID")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    parser.add_argument("--max-regression", type=float, default=0.2)
+    args = parser.parse_args()
+
+    result = asyncio.run(run_load_test(args.base_url, args.users, args.concurrency, args.turns, args.server_pid))
+    print_report(result)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            problems = check_regression(result, json.load(f), args.max_regression)
+        for problem in problems:
+            print(f"📉 성능 저하: {problem}")
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# benchmarks/run_benchmark.py
+# 카탈로그 크기별로 가짜 LLM 서버 + API 서버를 띄워 부하 테스트를 돌리고 결과를 한 JSON으로 모읍니다.
+#
+#   python -m benchmarks.run_benchmark --sizes 100 720 5000 --users 30 --output bench.json
+#   python -m benchmarks.run_benchmark --micro-only            # 서버 없이 카탈로그/키워드/추천 엔진만 측정
+#
+# 서버 부하 테스트는 main:app 전체를 띄우므로 lightrag와 앱이 import하는 모듈(services.book_searcher,
+# models.schemas 등)이 모두 있어야 합니다. import에 실패하면 부하 테스트는 건너뛰고 이유를 결과에 남깁니다.
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import httpx
+from benchmarks.generate_catalog import generate_books
+from benchmarks.load_test import percentile, print_report, run_load_test
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_until_ready(url: str, timeout: float = 120.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if httpx.get(url, timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"{url} 가 {timeout}s 안에 준비되지 않았습니다.")
+
+
+def _time_ms(func, repeat: int) -> dict:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {"p50_ms": round(percentile(samples, 50), 3), "p95_ms": round(percentile(samples, 95), 3)}
+
+
+def run_micro_benchmarks(catalog_path: str, repeat: int = 200) -> dict:
+    """LLM 호출이 없는 프로세스 내부 경로 측정 (카탈로그 로드, 로컬 키워드 추출, 추천 엔진)"""
+    from benchmarks.load_test import USER_MESSAGES
+    from services.book_catalog import BookCatalog
+    from services.local_keyword_extractor import LocalKeywordExtractor
+    from services.recommendation_engine import RecommendationEngine
+
+    catalog = BookCatalog(catalog_path)
+    load = _time_ms(catalog.reload, 3)
+    books = catalog.books
+
+    started = time.perf_counter()
+    extractor = LocalKeywordExtractor(books)
+    engine = RecommendationEngine(books)
+    build_ms = round((time.perf_counter() - started) * 1000, 1)
+
+    messages = iter(USER_MESSAGES * repeat)
+    extract = _time_ms(lambda: extractor.extract(next(messages)), repeat)
+    keywords = ["친구", "학교", "성장", "우정", "마음"]
+    recommend = _time_ms(lambda: engine.recommend(keywords, k=3), repeat)
+    lookup_titles = [book["title"] for book in books[:50]]
+    lookup = _time_ms(lambda: catalog.find_by_titles(lookup_titles[:3]), repeat)
+
+    columnar_catalog = BookCatalog(catalog_path, catalog_format="columnar")
+    columnar_catalog.reload()  # 첫 로드에서 .bin 빌드
+    columnar_load = _time_ms(columnar_catalog.reload, 3)
+
+    return {"books": len(books), "catalog_load": load, "columnar_catalog_load": columnar_load,
+            "index_build_ms": build_ms,
+            "local_keyword_extract": extract, "recommend_top3": recommend, "catalog_lookup": lookup}
+
+
+def _app_import_error(workdir: str, env: dict):
+    """main:app을 import할 수 없으면 마지막 오류 줄, 가능하면 None"""
+    proc = subprocess.run([sys.executable, "-c", "import main"], cwd=workdir, env=env, capture_output=True, text=True)
+    if proc.returncode == 0:
+        return None
+    lines = proc.stderr.strip().splitlines()
+    return lines[-1] if lines else f"exit code {proc.returncode}"
+
+
+def run_server_benchmark(workdir: str, catalog_path: str, args) -> dict:
+    llm_port, app_port = _free_port(), _free_port()
+    env = {
+        **os.environ,
+        "PYTHONPATH": REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""),
+        "DEEPSEEK_BASE_URL": f"http://127.0.0.1:{llm_port}/v1",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{llm_port}/v1",
+        "DEEPSEEK_API_KEY": "fake",
+        "OPENAI_API_KEY": "fake",
+        "FAKE_LLM_CATALOG": catalog_path,
+    }
+    import_error = _app_import_error(workdir, env)
+    if import_error:
+        print(f"⚠️ 서버 부하 테스트 건너뜀 (main:app import 실패): {import_error}")
+        return {"skipped": import_error}
+    llm = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fake_llm_server", "--port", str(llm_port),
+         "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms), "--catalog", catalog_path],
+        cwd=REPO_ROOT, env=env,
+    )
+    # 앱은 작업 디렉터리 기준 상대 경로(books_with_age.json, rag_working_dir3 등)를 쓰므로 임시 디렉터리에서 실행
+    app = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(app_port), "--log-level", "warning"],
+        cwd=workdir, env=env,
+    )
+    try:
+        _wait_until_ready(f"http://127.0.0.1:{llm_port}/stats")
+        _wait_until_ready(f"http://127.0.0.1:{app_port}/ready")
+        result = asyncio.run(run_load_test(
+            f"http://127.0.0.1:{app_port}", args.users, args.concurrency, args.turns, server_pid=app.pid
+        ))
+        result["llm_calls"] = httpx.get(f"http://127.0.0.1:{llm_port}/stats").json()
+        return result
+    finally:
+        for proc in (app, llm):
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="오프라인 성능 벤치마크")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 720, 5000])
+    parser.add_argument("--users", type=int, default=30)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--jitter-ms", type=float, default=100)
+    parser.add_argument("--micro-only", action="store_true", help="서버 없이 내부 경로만 측정")
+    parser.add_argument("--output", help="결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory(prefix=f"bench-{size}-") as workdir:
+            catalog_path = os.path.join(workdir, "books_with_age.json")
+            with open(catalog_path, "w", encoding="utf-8") as f:
+                json.dump(generate_books(size), f, ensure_ascii=False)
+
+            print(f"\n📚 카탈로그 {size}권")
+            entry = {"micro": run_micro_benchmarks(catalog_path)}
+            print(json.dumps(entry["micro"], ensure_ascii=False))
+            if not args.micro_only:
+                entry["load"] = run_server_benchmark(workdir, catalog_path, args)
+                if "skipped" not in entry["load"]:
+                    print_report(entry["load"])
+            results[str(size)] = entry
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,56 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from routes.recommendation import router as recommendation_router
 from routes.chat import router as chat_router
 from routes.users import router as user_router
+from routes import admin, health
 from fastapi.middleware.cors import CORSMiddleware
 from services.logger_middleware import LoggingMiddleware
+from services.http_clients import init_http_clients, close_http_clients
+from services.book_catalog import get_catalog
+from services.keyword_cache import keyword_cache
+from services.query_cache import query_cache
+from services.llm_scheduler import llm_scheduler
+from services.metrics import MetricsMiddleware, metrics
+from services.persona_cache import persona_cache
+from models.deepseek_lightrag import RAG_WARMUP, embedding_cache_stats, get_rag_instance, warmup_rag
+from models.deepseek_model import LOCAL_LLM_ENABLED, get_inference_worker
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.http_clients = await init_http_clients()
+    # /metrics 에 게이지로 내보낼 각 서비스의 stats()
+    metrics.register_stats("http", app.state.http_clients.stats)
+    metrics.register_stats("keyword_cache", keyword_cache.stats)
+    metrics.register_stats("query_cache", query_cache.stats)
+    metrics.register_stats("embedding_cache", embedding_cache_stats)
+    metrics.register_stats("llm_scheduler", llm_scheduler.stats)
+    metrics.register_stats("persona_cache", persona_cache.stats)
+    if LOCAL_LLM_ENABLED:
+        metrics.register_stats("local_llm", get_inference_worker().stats)
+    # 첫 /chat 요청이 아니라 서버 시작 시점에 RAG 저장소와 도서 카탈로그를 로드
+    rag = await get_rag_instance()
+    get_catalog().snapshot()
+    # 파트너 연동용 기본 페르소나 추천을 미리 계산 (카탈로그가 바뀌면 다음 요청 때 다시 계산)
+    precompute_task = asyncio.create_task(asyncio.to_thread(persona_cache.precompute))
+    warmup_task = None
+    if RAG_WARMUP:
+        # 워밍업은 백그라운드로 돌리고 끝나면 /ready 가 200을 반환
+        warmup_task = asyncio.create_task(warmup_rag(rag))
+    yield
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    await asyncio.gather(precompute_task, return_exceptions=True)
+    if LOCAL_LLM_ENABLED:
+        await get_inference_worker().stop()
+    await close_http_clients()
 
 app = FastAPI(
     title="도서 추천 챗봇 API",
     description="채팅을 통한 사용자의 입력에서 관심 키워드를 추출하고, 도서 데이터 중 유사한 책을 추천합니다.",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -19,7 +61,13 @@ app.add_middleware(
     allow_headers=["*"],
 )
 app.add_middleware(LoggingMiddleware)
+app.add_middleware(MetricsMiddleware)
 
+app.include_router(health.router, tags=["상태 확인"])
 app.include_router(user_router, tags=["유저 ID 생성"])
 app.include_router(chat_router, tags=["채팅"])
-app.include_router(recommendation_router, tags=["도서 추천"])
\ No newline at end of file
+app.include_router(recommendation_router, tags=["도서 추천"])
+app.include_router(admin.router, tags=["관리"])
+if LOCAL_LLM_ENABLED:
+    from routes.local_chat import router as local_chat_router
+    app.include_router(local_chat_router, tags=["채팅"])
\ No newline at end of file
@@ -1,105 +1,250 @@
+import hashlib
 import json
+import os
+
+KG_MANIFEST_PATH = "kg_manifest.json"
+
+# KG에 반영되는 필드만 해시에 포함 (이미지 URL 등이 바뀌어도 재삽입하지 않음)
+KG_FIELDS = ("title", "summary", "authors", "isbn13", "keywords", "age")
+
+
+def book_source_id(book: dict) -> str:
+    """ISBN + 내용 해시 기반의 안정적인 source_id (카탈로그 순서와 무관)"""
+    content = {field: book.get(field) for field in KG_FIELDS}
+    content["keywords"] = [kw["word"] for kw in book.get("keywords", [])[:10]]
+    digest = hashlib.sha1(json.dumps(content, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+    key = book.get("isbn13") or hashlib.sha1(book.get("title", "").encode("utf-8")).hexdigest()[:13]
+    return f"book-{key}-{digest}"
+
+
+def book_chunk_content(book: dict) -> str:
+    return f"{book.get('title', '')} - {book.get('summary', '')}"
+
+
+def book_chunk_id(book: dict) -> str:
+    """ainsert_custom_kg가 청크 내용으로 만드는 것과 같은 청크 ID (clean_text 후 해시)"""
+    from lightrag.utils import compute_mdhash_id
+    return compute_mdhash_id(book_chunk_content(book).strip().replace("\x00", ""), prefix="chunk-")
+
 
 async def generate_custom_kg_from_books(json_path: str) -> dict: 
     with open(json_path, "r", encoding="utf-8") as f: books = json.load(f)
+    return build_custom_kg(books)
+
+
+def build_custom_kg(books: list) -> dict:
+    chunks, entities, relationships = [], [], []
+    for book in books:
+        kg = build_book_kg(book)
+        chunks.extend(kg["chunks"])
+        entities.extend(kg["entities"])
+        relationships.extend(kg["relationships"])
+
+    return {
+        "chunks": chunks,
+        "entities": entities,
+        "relationships": relationships
+    }
+
 
+def build_book_kg(book: dict) -> dict:
     chunks, entities, relationships = [], [], []
 
-    for idx, book in enumerate(books):
-        book_id = f"book-{idx}"
-        title = book.get("title", "")
-        summary = book.get("summary", "")
-        authors = book.get("authors", "")
-        isbn = book.get("isbn13", "")
-        keywords = [kw["word"] for kw in book.get("keywords", [])]
-        age = ", ".join(book.get("age", []))
-
-        # 📘 Chunk (책 내용 요약)
-        chunks.append({
-            "content": f"{title} - {summary}",
+    book_id = book_source_id(book)
+    title = book.get("title", "")
+    summary = book.get("summary", "")
+    authors = book.get("authors", "")
+    isbn = book.get("isbn13", "")
+    keywords = [kw["word"] for kw in book.get("keywords", [])]
+    age = ", ".join(book.get("age", []))
+
+    # 📘 Chunk (책 내용 요약)
+    chunks.append({
+        "content": book_chunk_content(book),
+        "source_id": book_id
+    })
+
+    # 🧠 Entities
+    entities.append({
+        "entity_name": title,
+        "entity_type": "book",
+        "description": summary,
+        "source_id": book_id
+    })
+
+    if isbn:
+        entities.append({
+            "entity_name": isbn,
+            "entity_type": "isbn13",
+            "description": f"{title}의 고유 ISBN",
             "source_id": book_id
         })
 
-        # 🧠 Entities
+    if authors:
         entities.append({
-            "entity_name": title,
-            "entity_type": "book",
-            "description": summary,
+            "entity_name": authors,
+            "entity_type": "author",
+            "description": f"{title}의 저자",
+            "source_id": book_id
+        })
+
+    for kw in keywords[:10]:
+        entities.append({
+            "entity_name": kw,
+            "entity_type": "keyword",
+            "description": f"{title}과 관련된 키워드",
+            "source_id": book_id
+        })
+
+    if authors:
+        relationships.append({
+            "src_id": title,
+            "tgt_id": authors,
+            "description": f"{authors}는 {title}의 저자입니다.",
+            "keywords": "저자",
+            "weight": 1.0,
             "source_id": book_id
         })
 
-        if isbn:
-            entities.append({
-                "entity_name": isbn,
-                "entity_type": "isbn13",
-                "description": f"{title}의 고유 ISBN",
-                "source_id": book_id
-            })
-
-        if authors:
-            entities.append({
-                "entity_name": authors,
-                "entity_type": "author",
-                "description": f"{title}의 저자",
-                "source_id": book_id
-            })
-
-        for kw in keywords[:10]:
-            entities.append({
-                "entity_name": kw,
-                "entity_type": "keyword",
-                "description": f"{title}과 관련된 키워드",
-                "source_id": book_id
-            })
-
-        if authors:
-            relationships.append({
-                "src_id": title,
-                "tgt_id": authors,
-                "description": f"{authors}는 {title}의 저자입니다.",
-                "keywords": "저자",
-                "weight": 1.0,
-                "source_id": book_id
-            })
-
-        if isbn:
-            relationships.append({
-                "src_id": title,
-                "tgt_id": isbn,
-                "description": f"{title}의 ISBN은 {isbn}입니다.",
-                "keywords": "식별자",
-                "weight": 1.0,
-                "source_id": book_id
-            })
-
-        for kw in keywords[:10]:
-            relationships.append({
-                "src_id": title,
-                "tgt_id": kw,
-                "description": f"{title}은(는) '{kw}'와 관련된 책입니다.",
-                "keywords": "주제 키워드",
-                "weight": 0.8,
-                "source_id": book_id
-            })
-        
-        for age_group in book.get("age", []):
-            entities.append({
-                "entity_name": age_group,
-                "entity_type": "age_group",
-                "description": f"{title}의 주요 인기 연령대: {age_group}",
-                "source_id": book_id
-            })
-            relationships.append({
-                "src_id": title,
-                "tgt_id": age_group,
-                "description": f"{title}은(는) {age_group} 연령대에서 인기가 많습니다.",
-                "keywords": "인기 연령대",
-                "weight": 0.7,
-                "source_id": book_id
-            })
+    if isbn:
+        relationships.append({
+            "src_id": title,
+            "tgt_id": isbn,
+            "description": f"{title}의 ISBN은 {isbn}입니다.",
+            "keywords": "식별자",
+            "weight": 1.0,
+            "source_id": book_id
+        })
+
+    for kw in keywords[:10]:
+        relationships.append({
+            "src_id": title,
+            "tgt_id": kw,
+            "description": f"{title}은(는) '{kw}'와 관련된 책입니다.",
+            "keywords": "주제 키워드",
+            "weight": 0.8,
+            "source_id": book_id
+        })
+
+    for age_group in book.get("age", []):
+        entities.append({
+            "entity_name": age_group,
+            "entity_type": "age_group",
+            "description": f"{title}의 주요 인기 연령대: {age_group}",
+            "source_id": book_id
+        })
+        relationships.append({
+            "src_id": title,
+            "tgt_id": age_group,
+            "description": f"{title}은(는) {age_group} 연령대에서 인기가 많습니다.",
+            "keywords": "인기 연령대",
+            "weight": 0.7,
+            "source_id": book_id
+        })
 
     return {
         "chunks": chunks,
         "entities": entities,
         "relationships": relationships
     }
+
+
+def load_kg_manifest(manifest_path: str = KG_MANIFEST_PATH) -> dict:
+    """마지막으로 삽입한 KG 상태: ISBN(또는 키) -> {"source_id", "title", "isbn13", "chunk_id"}"""
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_kg_manifest(manifest: dict, manifest_path: str = KG_MANIFEST_PATH):
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def diff_books_against_manifest(books: list, manifest: dict) -> dict:
+    """
+    현재 카탈로그와 이전에 삽입한 KG 매니페스트를 비교합니다.
+    :return: {"added": [book], "changed": [(이전 항목, book)], "removed": [이전 항목], "unchanged": int, "current": 새 매니페스트}
+    """
+    added, changed = [], []
+    current = {}
+    for book in books:
+        source_id = book_source_id(book)
+        key = source_id.rsplit("-", 1)[0]
+        current[key] = {
+            "source_id": source_id,
+            "title": book.get("title", ""),
+            "isbn13": book.get("isbn13", ""),
+            "chunk_id": book_chunk_id(book),
+        }
+        previous = manifest.get(key)
+        if previous is None:
+            added.append(book)
+        elif previous["source_id"] != source_id:
+            changed.append((previous, book))
+
+    removed = [entry for key, entry in manifest.items() if key not in current]
+    unchanged = len(current) - len(added) - len(changed)
+    return {"added": added, "changed": changed, "removed": removed, "unchanged": unchanged, "current": current}
+
+
+def _manifest_key(entry: dict) -> str:
+    return entry["source_id"].rsplit("-", 1)[0]
+
+
+async def _delete_book_entities(rag, entry: dict, current: dict):
+    """
+    책 고유 엔티티(ISBN, 제목)와 이전 청크를 삭제합니다 (연결된 관계도 함께 삭제됨).
+    키워드/저자/연령대 엔티티는 다른 책과 공유되므로 남기고, 제목도 다른 ISBN(다른 판본 등)이
+    아직 쓰고 있으면 남깁니다. 이때 이 책이 만든 제목-키워드 관계는 다른 판본 것과 합쳐져 있어 그대로 둡니다.
+    """
+    key = _manifest_key(entry)
+    title = entry.get("title")
+    title_shared = any(other_key != key and other.get("title") == title for other_key, other in current.items())
+    if entry.get("isbn13"):
+        await rag.adelete_by_entity(entry["isbn13"])
+    if title and not title_shared:
+        await rag.adelete_by_entity(title)
+    # chunk_id가 없는 예전 매니페스트 항목은 청크를 찾을 수 없어 건너뜀
+    return [entry["chunk_id"]] if entry.get("chunk_id") else []
+
+
+async def _delete_chunks(rag, chunk_ids: list):
+    if not chunk_ids:
+        return
+    await rag.chunks_vdb.delete(chunk_ids)
+    await rag.text_chunks.delete(chunk_ids)
+    await rag.chunks_vdb.index_done_callback()
+    await rag.text_chunks.index_done_callback()
+
+
+async def upsert_custom_kg(rag, json_path: str, manifest_path: str = KG_MANIFEST_PATH) -> dict:
+    """
+    이전 삽입 이후 추가/변경/삭제된 책만 KG에 반영합니다.
+    변경된 책은 기존 책 엔티티와 청크를 지운 뒤 다시 삽입해서 사라진 키워드 관계나 이전 요약이 남지 않도록 합니다.
+    """
+    with open(json_path, "r", encoding="utf-8") as f:
+        books = json.load(f)
+
+    diff = diff_books_against_manifest(books, load_kg_manifest(manifest_path))
+    print(
+        f"🧮 KG 변경분: 추가 {len(diff['added'])} / 변경 {len(diff['changed'])} / "
+        f"삭제 {len(diff['removed'])} / 유지 {diff['unchanged']}"
+    )
+
+    stale_chunks = []
+    for entry in diff["removed"] + [previous for previous, _ in diff["changed"]]:
+        stale_chunks.extend(await _delete_book_entities(rag, entry, diff["current"]))
+    # 내용이 그대로인 청크는 곧 같은 ID로 다시 삽입되므로 지우지 않음
+    keep = {entry["chunk_id"] for entry in diff["current"].values()}
+    await _delete_chunks(rag, [chunk_id for chunk_id in dict.fromkeys(stale_chunks) if chunk_id not in keep])
+
+    upserts = diff["added"] + [book for _, book in diff["changed"]]
+    if upserts:
+        await rag.ainsert_custom_kg(build_custom_kg(upserts))
+
+    save_kg_manifest(diff["current"], manifest_path)
+    return {key: len(diff[key]) for key in ("added", "changed", "removed")}
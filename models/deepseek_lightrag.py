@@ -1,10 +1,14 @@
 import os
 import asyncio
+import time
 from lightrag import LightRAG, QueryParam
-from lightrag.llm.openai import openai_complete_if_cache, openai_embed
 from lightrag.kg.shared_storage import initialize_pipeline_status
 from lightrag.utils import EmbeddingFunc
 from services.book_formatter import format_book_json_with_weight
+from services.http_clients import get_http_clients
+from services.embedding_cache import CachedEmbedder
+from services.llm_scheduler import CallerPriority, llm_scheduler
+from services.metrics import metrics
 from dotenv import load_dotenv
 import numpy as np
 
@@ -16,37 +20,90 @@ if not os.path.exists(WORKING_DIR):
     os.mkdir(WORKING_DIR)
 
 
-async def llm_model_func(prompt, system_prompt=None, history_messages=[], **kwargs) -> str:
-    from lightrag.llm.openai import openai_complete_if_cache
-    
-    return await openai_complete_if_cache(
-        model="deepseek-chat",
-        prompt=prompt,
-        system_prompt=system_prompt,
-        history_messages=history_messages,
-        base_url="https://api.deepseek.com/v1",
-        api_key=os.getenv("DEEPSEEK_API_KEY"),
-        **kwargs
-    )
+DEEPSEEK_BASE_URL = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1")
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+LLM_MODEL = "deepseek-chat"
+EMBEDDING_MODEL = "text-embedding-3-small"
+
+# LightRAG가 넘기는 kwargs 중 chat/completions 요청에 그대로 실을 수 있는 항목
+_CHAT_PARAMS = ("temperature", "top_p", "max_tokens", "stop", "seed", "response_format")
+
+
+async def llm_model_func(prompt, system_prompt=None, history_messages=[], keyword_extraction=False,
+                         priority=None, **kwargs) -> str:
+    """:param priority: llm_scheduler 우선순위. None이면 현재 llm_priority 컨텍스트를 따름"""
+    messages = []
+    if system_prompt:
+        messages.append({"role": "system", "content": system_prompt})
+    messages.extend(history_messages)
+    messages.append({"role": "user", "content": prompt})
+
+    payload = {"model": LLM_MODEL, "messages": messages}
+    payload.update({key: kwargs[key] for key in _CHAT_PARAMS if key in kwargs})
+    if keyword_extraction:
+        payload["response_format"] = {"type": "json_object"}
+
+    if kwargs.get("stream"):
+        # QueryParam(stream=True)이면 LightRAG가 이 async iterator를 그대로 aquery 결과로 돌려줌
+        return _stream_chat_completion(payload, priority)
+
+    with metrics.stage("llm_call"):
+        async with llm_scheduler.slot("deepseek", priority):
+            result = await get_http_clients().post_json(
+                DEEPSEEK_BASE_URL, "/chat/completions", payload,
+                api_key=os.getenv("DEEPSEEK_API_KEY"),
+            )
+    return result["choices"][0]["message"]["content"]
+
+async def _stream_chat_completion(payload: dict, priority=None):
+    payload = {**payload, "stream": True}
+    # 스트림을 끝까지 받은 시점까지를 llm_stream 단계로 기록
+    with metrics.stage("llm_stream"):
+        async with llm_scheduler.slot("deepseek", priority):
+            async for event in get_http_clients().stream_sse(
+                DEEPSEEK_BASE_URL, "/chat/completions", payload,
+                api_key=os.getenv("DEEPSEEK_API_KEY"),
+            ):
+                choices = event.get("choices") or [{}]
+                delta = choices[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
 
 # Embedding: OpenAI
-async def embedding_func(texts: list[str]) -> np.ndarray:
-    from lightrag.llm.openai import openai_embed
-
-    return await openai_embed(
-        texts,
-        model="text-embedding-3-small",
-        api_key=os.getenv("OPENAI_API_KEY"),
-        base_url="https://api.openai.com/v1"
-    )
+async def openai_embedding_func(texts: list[str]) -> np.ndarray:
+    with metrics.stage("embedding_call"):
+        async with llm_scheduler.slot("openai"):
+            result = await get_http_clients().post_json(
+                OPENAI_BASE_URL, "/embeddings", {"model": EMBEDDING_MODEL, "input": texts},
+                api_key=os.getenv("OPENAI_API_KEY"),
+            )
+    data = sorted(result["data"], key=lambda item: item["index"])
+    return np.array([item["embedding"] for item in data], dtype=np.float32)
+
+EMBEDDING_DIM = 1536  # OpenAI text-embedding-3-small 기준
+_cached_embedder = None
+
+# 같은 텍스트는 디스크 캐시에서, 나머지는 동시에 들어온 요청과 묶어서 한 번에 요청
+async def embedding_func(texts: list[str], priority=None) -> np.ndarray:
+    global _cached_embedder
+    if _cached_embedder is None:
+        _cached_embedder = CachedEmbedder(openai_embedding_func, model=EMBEDDING_MODEL, dim=EMBEDDING_DIM)
+    return await _cached_embedder(texts, priority)
+
+def embedding_cache_stats() -> dict:
+    return _cached_embedder.stats() if _cached_embedder is not None else {}
+
+# 도서 삽입 시 한 ainsert 배치 안에서 동시에 처리할 문서 수
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "4"))
 
 # LightRAG 초기화
 async def initialize_rag():
     rag = LightRAG(
         working_dir=WORKING_DIR,
+        max_parallel_insert=INGEST_CONCURRENCY,
         llm_model_func=llm_model_func,
         embedding_func=EmbeddingFunc(
-            embedding_dim=1536,  # OpenAI text-embedding-3-small 기준
+            embedding_dim=EMBEDDING_DIM,
             max_token_size=8192,
             func=embedding_func
         )
@@ -54,17 +111,75 @@ async def initialize_rag():
 
     await rag.initialize_storages()
     await initialize_pipeline_status()
+    _pass_caller_priority(rag)
 
     return rag
 
+def _pass_caller_priority(rag):
+    """
+    LightRAG 워커 큐 바깥에서 호출자의 llm_priority를 읽어 llm_model_func/embedding_func에 priority로 넘기도록 감쌈.
+    벡터 저장소는 초기화 때 받은 embedding_func를 따로 들고 있어서 함께 감쌈.
+    """
+    rag.llm_model_func = CallerPriority(rag.llm_model_func)
+    rag.embedding_func = CallerPriority(rag.embedding_func)
+    for name in ("entities_vdb", "relationships_vdb", "chunks_vdb"):
+        storage = getattr(rag, name, None)
+        if storage is not None and not isinstance(storage.embedding_func, CallerPriority):
+            storage.embedding_func = CallerPriority(storage.embedding_func)
+
 _rag_instance = None
+_rag_lock = asyncio.Lock()
+
+# /ready 에서 보여주는 초기화·워밍업 상태
+rag_status = {
+    "initialized": False,
+    "warmed_up": False,
+    "init_seconds": None,
+    "warmup_seconds": None,
+    "error": None,
+}
 
 async def get_rag_instance():
+    """동시에 여러 요청이 들어와도 initialize_rag()는 한 번만 실행됩니다 (single-flight)."""
     global _rag_instance
     if _rag_instance is None:
-        _rag_instance = await initialize_rag()
+        async with _rag_lock:
+            if _rag_instance is None:
+                started = time.perf_counter()
+                _rag_instance = await initialize_rag()
+                rag_status["initialized"] = True
+                rag_status["init_seconds"] = round(time.perf_counter() - started, 2)
     return _rag_instance
 
+RAG_WARMUP = os.getenv("RAG_WARMUP", "1") == "1"
+WARMUP_QUERY = "청소년에게 추천할 만한 책"
+# 키워드를 직접 넘기면 LightRAG가 질의에서 키워드를 뽑는 LLM 호출을 건너뜀
+WARMUP_HL_KEYWORDS = ["청소년 도서 추천"]
+WARMUP_LL_KEYWORDS = ["청소년", "책"]
+
+async def warmup_rag(rag):
+    """
+    벡터/그래프 저장소를 실제로 한 번 조회해서 첫 사용자 요청이 로딩 비용을 내지 않도록 합니다.
+    only_need_context=True로 답변 생성을 건너뛰고, hl/ll 키워드를 직접 넘겨 키워드 추출도 건너뛰므로
+    LLM은 호출하지 않고 키워드 임베딩과 저장소 조회만 합니다.
+    """
+    started = time.perf_counter()
+    try:
+        for mode in ("local", "global"):
+            await rag.aquery(WARMUP_QUERY, param=QueryParam(
+                mode=mode,
+                only_need_context=True,
+                hl_keywords=WARMUP_HL_KEYWORDS,
+                ll_keywords=WARMUP_LL_KEYWORDS,
+            ))
+        rag_status["warmed_up"] = True
+        print(f"🔥 RAG 워밍업 완료 ({time.perf_counter() - started:.1f}s)")
+    except Exception as e:
+        rag_status["error"] = str(e)
+        print("❗RAG 워밍업 실패:", e)
+    finally:
+        rag_status["warmup_seconds"] = round(time.perf_counter() - started, 2)
+
 def main():
     # Initialize RAG instance
     rag = asyncio.run(initialize_rag())
@@ -1,34 +1,198 @@
 from transformers import AutoTokenizer, AutoModelForCausalLM
+import asyncio
+import os
+import threading
+import time
 import torch
 import re
-from services.book_searcher import search_books
+from concurrent.futures import ThreadPoolExecutor
 
-# 모델 로딩
-tokenizer = AutoTokenizer.from_pretrained("deepseek-ai/deepseek-llm-7b-chat", trust_remote_code=True)
-model = AutoModelForCausalLM.from_pretrained(
-    "deepseek-ai/deepseek-llm-7b-chat",
-    device_map="auto",
-    torch_dtype=torch.float16,
-    trust_remote_code=True
-)
+# 작은 체크포인트(예: hf-internal-testing/tiny-random-LlamaForCausalLM)로 바꾸면 CPU에서도 빠르게 확인 가능
+LOCAL_MODEL_NAME = os.getenv("LOCAL_MODEL_NAME", "deepseek-ai/deepseek-llm-7b-chat")
+LOCAL_LLM_MAX_BATCH = int(os.getenv("LOCAL_LLM_MAX_BATCH", "8"))
+LOCAL_LLM_MAX_WAIT_MS = float(os.getenv("LOCAL_LLM_MAX_WAIT_MS", "20"))
+# 1이면 /chat/local 라우트로 로컬 모델 응답을 제공 (모델은 첫 요청 때 로드)
+LOCAL_LLM_ENABLED = os.getenv("LOCAL_LLM_ENABLED", "0") == "1"
 
-def generate_chat_response(messages: list[str], max_tokens=512):
+_model = None
+_tokenizer = None
+_model_lock = threading.Lock()
+
+def get_model():
+    """모델 로딩 (처음 사용할 때 한 번). GPU가 없으면 float32로 CPU에 올림"""
+    global _model, _tokenizer
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                tokenizer = AutoTokenizer.from_pretrained(LOCAL_MODEL_NAME, trust_remote_code=True)
+                # decoder-only 모델은 왼쪽 패딩이어야 배치 안의 모든 프롬프트가 같은 위치에서 생성을 이어감
+                tokenizer.padding_side = "left"
+                if tokenizer.pad_token is None:
+                    tokenizer.pad_token = tokenizer.eos_token
+                if torch.cuda.is_available():
+                    model = AutoModelForCausalLM.from_pretrained(
+                        LOCAL_MODEL_NAME,
+                        device_map="auto",
+                        torch_dtype=torch.float16,
+                        trust_remote_code=True
+                    )
+                else:
+                    model = AutoModelForCausalLM.from_pretrained(
+                        LOCAL_MODEL_NAME,
+                        torch_dtype=torch.float32,
+                        trust_remote_code=True
+                    )
+                model.eval()
+                _tokenizer, _model = tokenizer, model
+    return _tokenizer, _model
+
+def build_prompt(messages: list[str]) -> str:
     prompt = "<|system|>\n너는 사용자에게 책을 추천해주는 친절한 챗봇이야.\n"
     for i, m in enumerate(messages):
         role = "<|user|>" if i % 2 == 0 else "<|assistant|>"
         prompt += f"{role}\n{m}\n"
     prompt += "<|assistant|>\n"
+    return prompt
+
+def generate_batch(prompts: list[str], max_tokens: list[int]) -> list[str]:
+    """
+    여러 프롬프트를 왼쪽 패딩한 한 배치로 생성합니다 (동기 호출).
+    배치 전체는 가장 긴 max_tokens까지 생성하고, 각 응답은 자기 max_tokens만큼만 잘라 디코딩합니다.
+    """
+    tokenizer, model = get_model()
+    inputs = tokenizer(prompts, return_tensors="pt", padding=True).to(model.device)
+    with torch.inference_mode():
+        outputs = model.generate(
+            **inputs,
+            max_new_tokens=max(max_tokens),
+            pad_token_id=tokenizer.pad_token_id,
+        )
+    prompt_length = inputs["input_ids"].shape[1]
+    return [
+        tokenizer.decode(output[prompt_length:prompt_length + limit], skip_special_tokens=True).strip()
+        for output, limit in zip(outputs, max_tokens)
+    ]
+
+def generate_chat_response(messages: list[str], max_tokens=512):
+    return generate_batch([build_prompt(messages)], [max_tokens])[0]
+
+
+class BatchingInferenceWorker:
+    """
+    로컬 모델 추론 워커. 요청을 큐에 모았다가 첫 요청 후 max_wait_ms 동안(또는 max_batch개가 찰 때까지)
+    들어온 요청을 한 배치로 묶어, 이벤트 루프가 아닌 전용 스레드에서 generate_batch를 실행하고
+    결과는 요청별 future로 돌려줍니다. 모델은 한 번에 한 배치만 돌립니다.
+    워커 태스크가 죽었거나 다른 이벤트 루프에서 호출되면 다음 요청 때 큐와 태스크를 새로 만듭니다.
+    """
+
+    def __init__(self, generate_batch=generate_batch, max_batch: int = LOCAL_LLM_MAX_BATCH,
+                 max_wait_ms: float = LOCAL_LLM_MAX_WAIT_MS):
+        self.generate_batch = generate_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue = None
+        self._task = None
+        self._loop = None
+        self._inflight = []  # 생성 중인 배치의 (프롬프트, max_tokens, future)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="local-llm")
+        self.batches = 0
+        self.requests = 0
+
+    def start(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # 이전 루프의 큐·future는 이 루프에서 쓸 수 없으므로 버림 (그 루프가 닫히면서 함께 정리됨)
+            self._queue, self._task, self._inflight, self._loop = asyncio.Queue(), None, [], loop
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
 
-    inputs = tokenizer(prompt, return_tensors="pt").to(model.device)
-    outputs = model.generate(**inputs, max_new_tokens=max_tokens)
-    result = tokenizer.decode(outputs[0], skip_special_tokens=True)
-    return result.split("<|assistant|>")[-1].strip()
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        # 생성 중이던 배치와 아직 큐에 남은 요청을 기다리는 쪽이 멈추지 않도록 모두 취소
+        pending, self._inflight = self._inflight, []
+        while self._queue is not None and not self._queue.empty():
+            pending.append(self._queue.get_nowait())
+        for _, _, future in pending:
+            if not future.done():
+                future.cancel()
+
+    async def generate(self, messages: list[str], max_tokens: int = 512) -> str:
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((build_prompt(messages), max_tokens, future))
+        return await future
+
+    async def _collect(self) -> list:
+        # 큐에서 꺼낸 요청은 바로 _inflight에 넣어 두어 모으는 중에 stop()돼도 취소되게 함
+        batch = self._inflight = [await self._queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch:
+            timeout = deadline - asyncio.get_running_loop().time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        # 기다리는 동안 취소된 요청은 빼고 생성
+        return [item for item in batch if not item[2].done()]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = self._inflight = await self._collect()  # 취소된 요청을 뺀 목록으로 교체
+            if not batch:
+                continue
+            prompts = [prompt for prompt, _, _ in batch]
+            max_tokens = [limit for _, limit, _ in batch]
+            started = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(self._executor, self.generate_batch, prompts, max_tokens)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                self._inflight = []
+                continue
+            self.batches += 1
+            self.requests += len(batch)
+            print(f"🧮 로컬 모델 배치 {len(batch)}건 생성 ({time.perf_counter() - started:.2f}s)")
+            for (_, _, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+            self._inflight = []
+
+    def stats(self) -> dict:
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+        }
+
+
+_worker = None
+
+def get_inference_worker() -> BatchingInferenceWorker:
+    global _worker
+    if _worker is None:
+        _worker = BatchingInferenceWorker()
+    return _worker
+
+async def generate_chat_response_async(messages: list[str], max_tokens=512) -> str:
+    """이벤트 루프를 막지 않는 generate_chat_response. 동시에 들어온 요청은 한 배치로 묶여 생성됩니다."""
+    return await get_inference_worker().generate(messages, max_tokens)
 
 def extract_search_keywords(output: str):
     match = re.search(r"search_books\(\"(.*?)\"\)", output)
     return match.group(1) if match else None
 
 def full_recommendation_conversation(user_input: str):
+    from services.book_searcher import search_books
+
     messages = [user_input]
     first_response = generate_chat_response(messages)
     print("🤖 1차 응답:", first_response)
@@ -50,4 +214,4 @@ def full_recommendation_conversation(user_input: str):
 if __name__ == "__main__":
     user_input = input("당신의 고민이나 관심사를 입력해주세요: ")
     final = full_recommendation_conversation(user_input)
-    print("\n📚 최종 추천 답변:\n", final)
\ No newline at end of file
+    print("\n📚 최종 추천 답변:\n", final)
@@ -0,0 +1,56 @@
+import asyncio
+import os
+import time
+from fastapi import APIRouter, Header, HTTPException
+from models.deepseek_lightrag import get_rag_instance
+from services.book_updater import load_or_update_books_and_insert
+
+router = APIRouter()
+
+# 설정되지 않으면 /admin/ingest 는 항상 403
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+_ingest_task = None
+ingest_status = {
+    "running": False,
+    "started_at": None,
+    "finished_at": None,
+    "books": None,
+    "error": None,
+}
+
+def _check_token(token):
+    if not ADMIN_TOKEN or token != ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="관리자 토큰이 올바르지 않습니다.")
+
+async def _run_ingest():
+    ingest_status.update(running=True, started_at=time.time(), finished_at=None, books=None, error=None)
+    try:
+        rag = await get_rag_instance()
+        books = await load_or_update_books_and_insert(rag)
+        ingest_status["books"] = len(books)
+    except Exception as e:
+        ingest_status["error"] = str(e)
+        print("❗도서 삽입 실패:", e)
+    finally:
+        ingest_status.update(running=False, finished_at=time.time())
+
+@router.post("/admin/ingest", status_code=202,
+             responses={403: {"description": "ADMIN_TOKEN이 없거나 일치하지 않습니다."},
+                        409: {"description": "이미 도서 삽입이 진행 중입니다."}})
+async def start_ingest(x_admin_token: str = Header(None)):
+    """
+    도서 데이터 갱신·삽입을 서버 프로세스 안에서 백그라운드로 실행합니다.
+    같은 프로세스의 llm_scheduler를 쓰므로 삽입 중에도 /chat 요청의 LLM·임베딩 호출이 먼저 처리됩니다.
+    """
+    global _ingest_task
+    _check_token(x_admin_token)
+    if _ingest_task is not None and not _ingest_task.done():
+        raise HTTPException(status_code=409, detail="이미 도서 삽입이 진행 중입니다.")
+    _ingest_task = asyncio.create_task(_run_ingest())
+    return ingest_status
+
+@router.get("/admin/ingest", responses={403: {"description": "ADMIN_TOKEN이 없거나 일치하지 않습니다."}})
+def get_ingest_status(x_admin_token: str = Header(None)):
+    _check_token(x_admin_token)
+    return ingest_status
@@ -1,16 +1,33 @@
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from lightrag import QueryParam
 from models.deepseek_lightrag import get_rag_instance
-from services.session_store import user_sessions, user_exists, get_user_name
-from services.keyword_extractor import extract_keywords_from_gpt
+from services.session_store import user_sessions, save_session_async
+from services.keyword_extractor import extract_keywords
 from services.utils import parse_json_from_response
 import asyncio
-from services.user_type_extractor import save_user_type_async
 import json
+import os
+from services.user_type_extractor import save_user_type_async
+from services.title_index import get_title_index
+from services.recommendation_engine import HYBRID_CANDIDATES, RECOMMEND_MODE, get_recommendation_engine
+from services.facet_index import candidate_rows_for_keywords
+from services.query_cache import query_cache
+from services.history_manager import recent_messages, render_history, schedule_summary_update
+from services.metrics import metrics
 
 router = APIRouter()
 
+RECOMMEND_KEYWORD_THRESHOLD = 3
+# sequential: 단계별 순차 실행, concurrent: 키워드 추출/후속 질문(/추천) 동시 실행
+CHAT_PIPELINE = os.getenv("CHAT_PIPELINE", "sequential")
+SPECULATIVE_KEYWORD_MARGIN = int(os.getenv("CHAT_SPECULATIVE_MARGIN", "1"))
+
+# 응답 캐시(query_cache)는 렌더링된 프롬프트가 아니라 이 키로 구분하므로 프롬프트 문구를 바꾸면 버전도 올릴 것
+RECOMMEND_PROMPT_KEY = "recommend-v1"
+INTERVIEW_PROMPT_KEY = "interview-v1"
+
 class ChatRequest(BaseModel):
     userMessage: str
     userId: str
@@ -19,70 +36,262 @@ class ChatResponse(BaseModel):
     responseText: str
     canRecommend: bool
 
+async def recommend_titles_with_rag(rag, session: dict, candidates: list = None) -> list:
+    """
+    :param candidates: 로컬 엔진이 고른 후보 제목. 주어지면 LLM이 이 안에서만 고르도록 프롬프트에 넣음
+    """
+    recommend_system_prompt = """
+        너는 책 추천 시스템이야. 사용자와의 대화에서 추천할 수 있는 책 제목을 무조건 3개 JSON으로 반환해.
+        title에 해당하는 제목만 말해줘.
+        형식: {{ "titles": ["추천 책 제목1", "추천 책 제목2", "추천 책 제목3"] }} 외 텍스트 금지
+        """
+    if candidates:
+        # system_prompt는 LightRAG에서 format 되므로 제목 속 중괄호를 이스케이프
+        candidate_lines = "\n".join(f"- {title}".replace("{", "{{").replace("}", "}}") for title in candidates)
+        recommend_system_prompt += f"""
+        반드시 아래 후보 도서 중에서만 골라줘:
+{candidate_lines}
+        """
+    prompt_key = RECOMMEND_PROMPT_KEY
+    if candidates:
+        prompt_key += "\0" + "\0".join(candidates)
+    query = "사용자와의 대화:\n" + render_history(session)
+    with metrics.stage("rag_local"):
+        response = await query_cache.aquery(
+            rag,
+            query,
+            param=QueryParam(mode="local", conversation_history=recent_messages(session), history_turns=5),
+            system_prompt=recommend_system_prompt,
+            prompt_key=prompt_key,
+        )
+
+    with metrics.stage("title_filter"):
+        book_titles = parse_json_from_response(response, key="titles") or []
+        # ✅ 띄어쓰기·오탈자가 조금 달라도 카탈로그의 정식 제목으로 바꿔서 저장 (/book-recommend에서 그대로 조회)
+        return get_title_index().resolve(book_titles)
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat_handler(req: ChatRequest):
     rag = await get_rag_instance()
     user_id = req.userId
     user_message = req.userMessage
 
-    if not user_exists(user_id):
+    session = await user_sessions.aget(user_id)
+    if session is None:
         raise HTTPException(status_code=401, detail="존재하지 않는 사용자입니다. 먼저 /users에서 등록해 주세요.")
 
-    session = user_sessions[user_id]
     session["messages"].append({"role": "user", "content": user_message})
-    user_name = get_user_name(user_id)
+    user_name = session.name or "사용자"
 
-    keywords = await extract_keywords_from_gpt(user_message)
+    if CHAT_PIPELINE == "concurrent":
+        return await _run_concurrent_pipeline(rag, session, user_id, user_name, user_message)
+
+    with metrics.stage("keyword_extraction"):
+        keywords = await extract_keywords(user_message)
     session["keywords"].extend(kw for kw in keywords if kw not in session["keywords"])
 
-    if len(session["keywords"]) >= 3:
-        session["can_recommend"] = True
+    if len(session["keywords"]) >= RECOMMEND_KEYWORD_THRESHOLD:
+        filtered_titles = await recommend_titles(rag, session)
+        if filtered_titles:
+            return await _finish_with_recommendation(session, user_id, user_name, filtered_titles)
+        _reset_recommendation(session)
+
+    # 추가 정보 유도 질문
+    followup = await interview_followup(rag, session, user_name)
+    return await _finish_with_followup(session, followup)
 
-        recommend_system_prompt = """
-        너는 책 추천 시스템이야. 사용자와의 대화에서 추천할 수 있는 책 제목을 무조건 3개 JSON으로 반환해.
-        title에 해당하는 제목만 말해줘.
-        형식: {{ "titles": ["추천 책 제목1", "추천 책 제목2", "추천 책 제목3"] }} 외 텍스트 금지
-        """
-        query = "사용자와의 대화:\n" + "\n".join(f"{m['role']}: {m['content']}" for m in session["messages"])
-        response = await rag.aquery(
-            query,
-            param=QueryParam(mode="local", conversation_history=session["messages"], history_turns=5),
-            system_prompt=recommend_system_prompt
-        )
 
-        with open("books_with_age.json", "r", encoding="utf-8") as f:
-            book_data = json.load(f)
-        db_titles = set(book["title"] for book in book_data)
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
-        book_titles = parse_json_from_response(response, key="titles") or []
-        # ✅ 부분 일치로 필터링
-        filtered_titles = [
-            candidate for candidate in book_titles
-            if any(candidate in db_title for db_title in db_titles)
-        ]
 
-        if filtered_titles:
-            session["recommended_titles"] = filtered_titles[:3]
-            asyncio.create_task(save_user_type_async(user_id, session["messages"]))
-            title_preview = "', '".join(session["recommended_titles"])
-            responseText = f"{user_name}님께 추천드릴 책이 있어요! 📚 '{title_preview}' 을(를) 곧 알려드릴게요."
-            session["messages"].append({"role": "assistant", "content": responseText})
-            return {"responseText": responseText, "canRecommend": True}
-        else:
-            session["can_recommend"] = False
-            session["recommended_titles"] = []
+@router.post("/chat/stream")
+async def chat_stream_handler(req: ChatRequest):
+    """
+    /chat과 같은 흐름이지만 후속 질문을 생성되는 대로 Server-Sent Events로 보냅니다.
+    - event: delta  data: {"text": "..."}                              (여러 번)
+    - event: done   data: {"responseText": "...", "canRecommend": bool} (마지막 한 번)
+    """
+    rag = await get_rag_instance()
+    user_id = req.userId
+    user_message = req.userMessage
 
-    # 추가 정보 유도 질문
+    session = await user_sessions.aget(user_id)
+    if session is None:
+        raise HTTPException(status_code=401, detail="존재하지 않는 사용자입니다. 먼저 /users에서 등록해 주세요.")
+
+    session["messages"].append({"role": "user", "content": user_message})
+    user_name = session.name or "사용자"
+
+    async def event_stream():
+        finished = False
+        response = None
+        try:
+            with metrics.stage("keyword_extraction"):
+                keywords = await extract_keywords(user_message)
+            session["keywords"].extend(kw for kw in keywords if kw not in session["keywords"])
+
+            if len(session["keywords"]) >= RECOMMEND_KEYWORD_THRESHOLD:
+                filtered_titles = await recommend_titles(rag, session)
+                if filtered_titles:
+                    result = await _finish_with_recommendation(session, user_id, user_name, filtered_titles)
+                    finished = True
+                    yield _sse("delta", {"text": result["responseText"]})
+                    yield _sse("done", result)
+                    return
+                _reset_recommendation(session)
+
+            parts = []
+            response = await interview_followup(rag, session, user_name, stream=True)
+            if isinstance(response, str):
+                # LightRAG 캐시 적중 등으로 완성된 문자열이 오면 한 번에 전송
+                parts.append(response)
+                yield _sse("delta", {"text": response})
+            else:
+                async for chunk in response:
+                    parts.append(chunk)
+                    yield _sse("delta", {"text": chunk})
+            result = await _finish_with_followup(session, "".join(parts))
+            finished = True
+            yield _sse("done", result)
+        finally:
+            # 오류나 클라이언트 연결 끊김으로 중단돼도 이미 추가한 사용자 메시지는 저장
+            if not finished:
+                await asyncio.shield(save_session_async(session))
+            # 끝까지 읽지 않은 토큰 스트림을 닫아야 llm_scheduler 슬롯과 HTTP 연결이 바로 반환됨.
+            # 연결 끊김으로 취소된 중이어도 정리가 끝나도록 shield
+            if response is not None and hasattr(response, "aclose"):
+                await asyncio.shield(response.aclose())
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def recommend_titles(rag, session: dict, keywords: list = None) -> list:
+    """RECOMMEND_MODE에 따라 추천 제목을 고릅니다. keywords를 주면 세션 키워드 대신 사용"""
+    keywords = session["keywords"] if keywords is None else keywords
+    filtered_titles = []
+    if RECOMMEND_MODE == "local":
+        with metrics.stage("local_recommend"):
+            recommended = _recommend_local(keywords, k=3)
+        filtered_titles = [book["title"] for book, _ in recommended]
+
+    # 로컬 키워드로 추천할 책을 못 찾으면 RAG 추천으로 대체
+    if not filtered_titles:
+        candidates = None
+        if RECOMMEND_MODE == "hybrid":
+            with metrics.stage("local_recommend"):
+                recommended = _recommend_local(keywords, k=HYBRID_CANDIDATES)
+            candidates = [book["title"] for book, _ in recommended]
+        filtered_titles = await recommend_titles_with_rag(rag, session, candidates)
+    return filtered_titles
+
+
+def _recommend_local(keywords: list, k: int) -> list:
+    """키워드가 연령대를 암시하면('중학생', '15살') 그 연령대 도서 안에서 먼저 순위를 매기고, 결과가 없으면 전체에서 찾음"""
+    engine = get_recommendation_engine()
+    with metrics.stage("facet_filter"):
+        rows = candidate_rows_for_keywords(keywords)
+    if rows is not None and len(rows):
+        recommended = engine.recommend(keywords, k=k, rows=rows)
+        if recommended:
+            return recommended
+    return engine.recommend(keywords, k=k)
+
+
+async def interview_followup(rag, session: dict, user_name: str, stream: bool = False):
+    """stream=True면 LightRAG가 돌려주는 토큰 async iterator(또는 캐시된 문자열)를 그대로 반환"""
     interview_prompt = f"""
     너는 책 MBTI 테스트의 인터뷰어야. 사용자({user_name}님)의 성격과 라이프스타일을 파악해서 책을 추천하기 위한 자연스러운 질문을 하나 생성해.
     질문은 대화체로 짧게 말해줘. 예: '주말엔 혼자 쉬는 걸 좋아하세요, 친구들과 어울리는 걸 좋아하세요?', '학교에 다니시나요?'
     """
-    context = "지금까지 사용자 대화: " + " ".join(m["content"] for m in session["messages"])
-    followup = await rag.aquery(
-        context,
-        param=QueryParam(mode="global", conversation_history=session["messages"], history_turns=5),
-        system_prompt=interview_prompt
-    )
+    context = "지금까지 사용자 대화:\n" + render_history(session)
+    # stream=True면 토큰 스트림을 돌려받기까지(검색 + LLM 호출 시작)만 포함
+    with metrics.stage("rag_global"):
+        return await query_cache.aquery(
+            rag,
+            context,
+            param=QueryParam(mode="global", conversation_history=recent_messages(session), history_turns=5, stream=stream),
+            system_prompt=interview_prompt,
+            # 프롬프트에 사용자 이름이 들어가므로 캐시 키에도 포함
+            prompt_key=f"{INTERVIEW_PROMPT_KEY}\0{user_name}",
+        )
+
+
+async def _classify_user_type(user_id: str, messages: list):
+    await save_user_type_async(user_id, messages)
+    # save_user_type_async는 세션 객체의 user_type 필드만 바꾸므로, 저장해야 다른 워커(SQLite 백엔드)에서도 보임
+    session = await user_sessions.aget(user_id)
+    if session is not None:
+        await save_session_async(session)
 
+
+async def _finish_with_recommendation(session: dict, user_id: str, user_name: str, filtered_titles: list) -> dict:
+    session["can_recommend"] = True
+    session["recommended_titles"] = filtered_titles[:3]
+    asyncio.create_task(_classify_user_type(user_id, list(session["messages"])))
+    title_preview = "', '".join(session["recommended_titles"])
+    responseText = f"{user_name}님께 추천드릴 책이 있어요! 📚 '{title_preview}' 을(를) 곧 알려드릴게요."
+    session["messages"].append({"role": "assistant", "content": responseText})
+    await save_session_async(session)
+    schedule_summary_update(session)
+    return {"responseText": responseText, "canRecommend": True}
+
+
+def _reset_recommendation(session: dict):
+    session["can_recommend"] = False
+    session["recommended_titles"] = []
+
+
+async def _finish_with_followup(session: dict, followup: str) -> dict:
     session["messages"].append({"role": "assistant", "content": followup})
+    await save_session_async(session)
+    schedule_summary_update(session)
     return {"responseText": followup, "canRecommend": False}
+
+
+async def _cancel(*tasks):
+    for task in tasks:
+        if task is not None and not task.done():
+            task.cancel()
+    await asyncio.gather(*(t for t in tasks if t is not None), return_exceptions=True)
+
+
+async def _timed_extract_keywords(user_message: str) -> list:
+    with metrics.stage("keyword_extraction"):
+        return await extract_keywords(user_message)
+
+
+async def _run_concurrent_pipeline(rag, session, user_id: str, user_name: str, user_message: str) -> dict:
+    """
+    키워드 추출과 후속 질문 생성을 동시에 시작하고, RAG 추천 모드에서 세션 키워드가 추천 기준에 가까우면
+    추천 쿼리도 미리(추측 실행) 시작합니다. 결과가 필요 없어진 쪽은 취소합니다.
+    로컬/하이브리드 후보는 새 키워드에 의존해 어차피 다시 계산해야 하므로 추측 실행하지 않습니다.
+    """
+    keyword_task = asyncio.create_task(_timed_extract_keywords(user_message))
+    followup_task = asyncio.create_task(interview_followup(rag, session, user_name))
+    recommend_task = None
+    if RECOMMEND_MODE == "rag" and len(session["keywords"]) >= RECOMMEND_KEYWORD_THRESHOLD - SPECULATIVE_KEYWORD_MARGIN:
+        recommend_task = asyncio.create_task(recommend_titles(rag, session, keywords=list(session["keywords"])))
+
+    try:
+        keywords = await keyword_task
+        session["keywords"].extend(kw for kw in keywords if kw not in session["keywords"])
+
+        if len(session["keywords"]) >= RECOMMEND_KEYWORD_THRESHOLD:
+            if recommend_task is None:
+                recommend_task = asyncio.create_task(recommend_titles(rag, session))
+            filtered_titles = await recommend_task
+            if filtered_titles:
+                await _cancel(followup_task)
+                return await _finish_with_recommendation(session, user_id, user_name, filtered_titles)
+            _reset_recommendation(session)
+        else:
+            await _cancel(recommend_task)
+
+        return await _finish_with_followup(session, await followup_task)
+    finally:
+        await _cancel(keyword_task, followup_task, recommend_task)
@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse
+from models.deepseek_lightrag import RAG_WARMUP, rag_status
+from services.metrics import metrics
+
+router = APIRouter()
+
+@router.get("/health")
+def health():
+    return {"status": "ok"}
+
+@router.get("/ready",
+            responses={503: {"description": "RAG 초기화 또는 워밍업이 아직 끝나지 않았습니다."}})
+def ready():
+    # 워밍업이 실패해도 끝나기만 하면 준비 완료로 보고, 실패 내용은 error 필드로 알림
+    ready = rag_status["initialized"] and (rag_status["warmup_seconds"] is not None or not RAG_WARMUP)
+    return JSONResponse(status_code=200 if ready else 503, content={"ready": ready, **rag_status})
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Prometheus 텍스트 형식 (단계별/요청별 히스토그램 + 캐시·스케줄러 통계 게이지)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, HTTPException
+from models.deepseek_model import generate_chat_response_async
+from routes.chat import ChatRequest, ChatResponse
+from services.history_manager import recent_messages
+from services.session_store import user_sessions, save_session_async
+from services.metrics import metrics
+import os
+
+router = APIRouter()
+
+LOCAL_CHAT_MAX_TOKENS = int(os.getenv("LOCAL_CHAT_MAX_TOKENS", "256"))
+
+@router.post("/chat/local", response_model=ChatResponse,
+             responses={401: {"description": "존재하지 않는 사용자입니다. 먼저 /users에서 등록해 주세요."}})
+async def local_chat_handler(req: ChatRequest):
+    """
+    LightRAG 대신 로컬 deepseek 모델로 답합니다 (LOCAL_LLM_ENABLED=1일 때만 등록).
+    동시에 들어온 요청은 BatchingInferenceWorker가 한 배치로 묶어 생성합니다.
+    """
+    session = await user_sessions.aget(req.userId)
+    if session is None:
+        raise HTTPException(status_code=401, detail="존재하지 않는 사용자입니다. 먼저 /users에서 등록해 주세요.")
+
+    session["messages"].append({"role": "user", "content": req.userMessage})
+    # build_prompt는 사용자/챗봇 발화가 번갈아 온다고 보고 첫 메시지를 사용자 발화로 씀
+    history = recent_messages(session)
+    while history and history[0]["role"] != "user":
+        history = history[1:]
+    try:
+        with metrics.stage("local_llm"):
+            responseText = await generate_chat_response_async([m["content"] for m in history], LOCAL_CHAT_MAX_TOKENS)
+    except Exception:
+        await save_session_async(session)
+        raise
+    session["messages"].append({"role": "assistant", "content": responseText})
+    await save_session_async(session)
+    return {"responseText": responseText, "canRecommend": bool(session["can_recommend"])}
@@ -1,11 +1,9 @@
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-import json
-from services.session_store import user_sessions, user_exists, get_user_type
-
-BOOKS_JSON_PATH = "./books_with_age.json"
-with open(BOOKS_JSON_PATH, "r", encoding="utf-8") as f:
-    books = json.load(f)
+from pydantic import BaseModel, Field
+from services.session_store import user_sessions, get_user_type
+from services.book_catalog import get_catalog
+from services.metrics import metrics
+from services.persona_cache import DEFAULT_PERSONAS, PERSONA_DEFAULT_K, persona_cache
 
 router = APIRouter()
 
@@ -27,6 +25,34 @@ class BookRecommendationList(BaseModel):
     userType: str
     userTypeReason: str
 
+class RecommendationProfile(BaseModel):
+    keywords: list[str] = []
+    age: list[str] = Field(default=[], description="연령대 라벨 (예: 14-16)")
+    classNm: list[str] = Field(default=[], description="분류. 상위 분류('문학')를 주면 하위 분류 포함")
+    k: int = Field(default=PERSONA_DEFAULT_K, ge=1, le=20)
+
+class BatchRecommendRequest(BaseModel):
+    profiles: list[RecommendationProfile] = Field(..., max_length=200)
+
+class ProfileRecommendation(BaseModel):
+    profile: RecommendationProfile
+    recommendations: list[BookRecommendation]
+    cached: bool
+
+class BatchRecommendResponse(BaseModel):
+    results: list[ProfileRecommendation]
+
+def _to_recommendation(book) -> dict:
+    keywords = [kw["word"] for kw in book.get("keywords", [])[:5]]
+    return {
+        "bookTitle": book["title"],
+        "bookReason": f"{', '.join(keywords)} 관련 주제",
+        "imageUrl": book.get("imageUrl") or "",
+        "bookUrl": book.get("bookUrl") or "",
+        "bookSummary": book.get("summary") or "",
+        "bookGenre": book.get("class_nm") or ""
+    }
+
 @router.post("/book-recommend",
             response_model=BookRecommendationList,
             responses={
@@ -40,11 +66,10 @@ def book_recommend(userinfo: Userinfo):
     user_id = userinfo.userId
 
     # 유저 존재 확인
-    if not user_exists(user_id):
+    session = user_sessions.get(user_id)
+    if session is None:
         raise HTTPException(status_code=401, detail="유저가 존재하지 않습니다. 먼저 등록해주세요.")
 
-    session = user_sessions[user_id]
-
     if not session["can_recommend"]:
         raise HTTPException(status_code=402, detail="아직 책 추천이 불가능한 상태입니다. 더 많은 대화를 나눠주세요.")
 
@@ -52,26 +77,43 @@ def book_recommend(userinfo: Userinfo):
     if not target_titles:
         raise HTTPException(status_code=400, detail="추천 도서가 존재하지 않습니다.")
 
-    matched_books = [b for b in books if b["title"] in target_titles][:3]
+    with metrics.stage("catalog_lookup"):
+        matched_books = get_catalog().find_by_titles(target_titles)[:3]
 
     if not matched_books:
         raise HTTPException(status_code=400, detail="책 데이터에서 추천 도서를 찾을 수 없습니다.")
 
-    recommendations = []
-    for book in matched_books:
-        keywords = [kw["word"] for kw in book.get("keywords", [])[:5]]
-        recommendations.append({
-            "bookTitle": book["title"],
-            "bookReason": f"{', '.join(keywords)} 관련 주제",
-            "imageUrl": book.get("imageUrl", ""),
-            "bookUrl": book.get("bookUrl", ""),
-            "bookSummary": book.get("summary", ""),
-            "bookGenre": book.get("class_nm", "")
-        })
-
     return {
-        "recommendations": recommendations,
+        "recommendations": [_to_recommendation(book) for book in matched_books],
         "keywords": session["keywords"],
         "userType": session.get("user_type", "분석 중..."),
         "userTypeReason": session.get("user_type_reason", "분석 중...")
     }
+
+@router.post("/book-recommend/batch", response_model=BatchRecommendResponse)
+async def book_recommend_batch(req: BatchRecommendRequest):
+    """
+    키워드/연령대 프로필 여러 개에 대한 추천을 한 번에 계산합니다 (LLM 호출 없이 로컬 엔진 사용).
+    같은 프로필은 카탈로그가 바뀌기 전까지 메모리 캐시에서 바로 응답합니다.
+    """
+    with metrics.stage("batch_recommend"):
+        results = await persona_cache.recommend_many([
+            {"keywords": p.keywords, "age": p.age, "class_nm": p.classNm, "k": p.k} for p in req.profiles
+        ])
+    return {"results": [
+        {"profile": profile, "recommendations": [_to_recommendation(book) for book, _ in books], "cached": cached}
+        for profile, (books, cached) in zip(req.profiles, results)
+    ]}
+
+@router.get("/book-recommend/personas", response_model=BatchRecommendResponse)
+async def book_recommend_personas():
+    """연령대별·대표 키워드 프로필별 기본 추천 (미리 계산된 결과)"""
+    results = await persona_cache.recommend_many(DEFAULT_PERSONAS)
+    return {"results": [
+        {
+            "profile": {"keywords": persona["keywords"], "age": persona["age"]},
+            "recommendations": [_to_recommendation(book) for book, _ in books],
+            "cached": cached,
+        }
+        for persona, (books, cached) in zip(DEFAULT_PERSONAS, results)
+    ]}
@@ -3,6 +3,7 @@ from pydantic import BaseModel
 from typing import List
 from models.deepseek_model import handle_conversation
 from models.schemas import Userinfo, UserName
+from services.session_store import register_user
 from uuid import uuid4
 
 router = APIRouter()
@@ -13,4 +14,5 @@ users = {}
 def createUser(userName: UserName):
     userId = str(uuid4())
     users[userName.name] = userId
+    register_user(userId, userName.name)
     return {"name": userName.name, "userId": userId}
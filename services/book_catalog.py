@@ -0,0 +1,162 @@
+# services/book_catalog.py
+
+import json
+import os
+import threading
+
+BOOKS_JSON_PATH = "./books_with_age.json"
+# json: 파일 전체를 dict 리스트로 로드, columnar: books_with_age.bin(COLUMNAR_CATALOG_PATH)을 mmap으로 열어 행을 지연 조회
+CATALOG_FORMAT = os.getenv("CATALOG_FORMAT", "json")
+
+
+class _CatalogSnapshot:
+    """한 시점의 books_with_age.json 내용과 조회용 인덱스 (생성 후 변경하지 않음)"""
+
+    def __init__(self, books: list, mtime: float):
+        self.books = books
+        self.mtime = mtime
+        self.title_index = {}  # 제목 -> 첫 번째 행 번호
+        self.isbn_index = {}   # ISBN13 -> 행 번호
+        for row, book in enumerate(books):
+            title = book.get("title")
+            if title and title not in self.title_index:
+                self.title_index[title] = row
+            isbn = book.get("isbn13")
+            if isbn:
+                self.isbn_index[isbn] = row
+        self.titles = frozenset(self.title_index)
+
+    def row_by_title(self, title: str):
+        return self.title_index.get(title)
+
+    def row_by_isbn(self, isbn13: str):
+        return self.isbn_index.get(isbn13)
+
+
+class _ColumnarSnapshot:
+    """컬럼 카탈로그 기반 스냅샷. books는 BookRow를 돌려주는 시퀀스이고 조회는 파일 안의 정렬 인덱스를 씁니다."""
+
+    def __init__(self, catalog, mtime: float):
+        self.books = catalog
+        self.mtime = mtime
+        self.titles = catalog.titles()
+
+    def row_by_title(self, title: str):
+        return self.books.row_by_title(title)
+
+    def row_by_isbn(self, isbn13: str):
+        return self.books.row_by_isbn(isbn13)
+
+
+class BookCatalog:
+    """
+    도서 데이터를 한 번만 로드해서 모든 라우트가 공유하는 카탈로그.
+    파일의 mtime이 바뀌면 새 스냅샷을 만든 뒤 참조만 교체하므로,
+    요청 처리 중에는 항상 완전한 한 버전의 데이터만 보입니다.
+    """
+
+    def __init__(self, path: str = BOOKS_JSON_PATH, catalog_format: str = CATALOG_FORMAT):
+        self.path = path
+        self.catalog_format = catalog_format
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def _load(self):
+        mtime = os.path.getmtime(self.path)
+        if self.catalog_format == "columnar":
+            from services.columnar_catalog import open_columnar_catalog
+            return _ColumnarSnapshot(open_columnar_catalog(self.path), mtime)
+        with open(self.path, "r", encoding="utf-8") as f:
+            books = json.load(f)
+        return _CatalogSnapshot(books, mtime)
+
+    def snapshot(self):
+        current = self._snapshot
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            if current is not None:
+                return current  # 파일 교체 중이면 기존 데이터 유지
+            raise
+
+        if current is not None and current.mtime == mtime:
+            return current
+
+        with self._lock:
+            current = self._snapshot
+            if current is None or current.mtime != mtime:
+                current = self._load()
+                self._snapshot = current
+                print(f"📚 도서 카탈로그 로드 완료: {len(current.books)}권")
+        return current
+
+    def reload(self):
+        with self._lock:
+            self._snapshot = self._load()
+            return self._snapshot
+
+    @property
+    def books(self):
+        return self.snapshot().books
+
+    @property
+    def titles(self) -> frozenset:
+        return self.snapshot().titles
+
+    def get_by_title(self, title: str):
+        snap = self.snapshot()
+        row = snap.row_by_title(title)
+        return snap.books[row] if row is not None else None
+
+    def get_by_isbn(self, isbn13: str):
+        snap = self.snapshot()
+        row = snap.row_by_isbn(isbn13)
+        return snap.books[row] if row is not None else None
+
+    def find_by_titles(self, titles) -> list:
+        """주어진 제목들에 해당하는 책을 카탈로그 순서대로 반환"""
+        snap = self.snapshot()
+        rows = sorted(row for row in map(snap.row_by_title, set(titles)) if row is not None)
+        return [snap.books[row] for row in rows]
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> BookCatalog:
+    global _catalog
+    if _catalog is None:
+        with _catalog_lock:
+            if _catalog is None:
+                _catalog = BookCatalog()
+    return _catalog
+
+
+class SnapshotCache:
+    """
+    카탈로그 스냅샷에서 만든 파생 객체(색인, 행렬 등)를 보관합니다.
+    스냅샷이 바뀌면 (파일 갱신) build(snapshot)으로 한 번만 다시 만들고, 그 전까지는 같은 객체를 돌려줍니다.
+    """
+
+    def __init__(self, build):
+        self.build = build
+        self._lock = threading.Lock()
+        self._current = (None, None)  # (스냅샷, 파생 객체) 한 번에 교체
+
+    def get(self, snapshot=None):
+        """
+        :param snapshot: 이 스냅샷에서 만든 객체를 받습니다. 여러 파생 객체를 같은 스냅샷 기준으로 맞춰 쓸 때 넘기며,
+                         최신이 아닌 스냅샷으로 만든 객체는 보관하지 않습니다. 기본값은 최신 스냅샷
+        """
+        latest = get_catalog().snapshot()
+        snapshot = latest if snapshot is None else snapshot
+        built_from, value = self._current
+        if built_from is not snapshot:
+            with self._lock:
+                built_from, value = self._current
+                if built_from is not snapshot:
+                    value = self.build(snapshot)
+                    if snapshot is latest:
+                        self._current = (snapshot, value)
+        return value
@@ -1,4 +1,5 @@
 import json
+import os
 def format_book_json_with_weight(json_path: str) -> list:
     with open(json_path, "r", encoding="utf-8") as f:
         data = json.load(f)
@@ -27,3 +28,103 @@ def format_book_json_with_weight(json_path: str) -> list:
 
         docs.append(json.dumps(doc_obj, ensure_ascii=False))
     return docs
+
+DOC_FORMAT = os.getenv("DOC_FORMAT", "weighted")  # weighted(기존 반복 방식) | compact
+DOC_TOKEN_BUDGET = int(os.getenv("DOC_TOKEN_BUDGET", "400"))
+DOC_SUMMARY_CHARS = int(os.getenv("DOC_SUMMARY_CHARS", "300"))
+DOC_MAX_KEYWORDS = int(os.getenv("DOC_MAX_KEYWORDS", "15"))
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("cl100k_base")
+except ImportError:
+    _encoding = None
+
+
+def count_tokens(text: str) -> int:
+    """tiktoken이 있으면 cl100k 기준, 없으면 근사치 (한글 등 비 ASCII 1자 ≈ 1토큰, ASCII 4자 ≈ 1토큰)"""
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return non_ascii + (len(text) - non_ascii + 3) // 4
+
+
+def _truncate(text: str, max_chars: int) -> str:
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rstrip() + "…"
+
+
+def format_book_compact(book: dict, token_budget: int = DOC_TOKEN_BUDGET,
+                        summary_chars: int = DOC_SUMMARY_CHARS, max_keywords: int = DOC_MAX_KEYWORDS) -> str:
+    """
+    키워드를 반복하지 않고 가중치 순으로 정렬해 "단어:가중치" 형태로 한 번씩만 적는 압축 문서.
+    토큰 예산을 넘으면 가중치가 낮은 키워드부터 빼고, 그래도 넘으면 요약을 줄입니다.
+    """
+    keywords = sorted(book.get("keywords", []), key=lambda kw: int(kw["weight"]), reverse=True)[:max_keywords]
+    summary = _truncate(book.get("summary", "") or "", summary_chars)
+
+    def render():
+        return json.dumps({
+            "title": book.get("title", ""),
+            "category": book.get("class_nm", ""),
+            "summary": summary,
+            "keywords": [f"{kw['word']}:{int(kw['weight'])}" for kw in keywords],
+            "age_group": book.get("age", [])
+        }, ensure_ascii=False)
+
+    doc = render()
+    while count_tokens(doc) > token_budget and len(keywords) > 3:
+        keywords = keywords[:-1]
+        doc = render()
+    while count_tokens(doc) > token_budget and len(summary) > 50:
+        summary = _truncate(summary, int(len(summary) * 0.8))
+        doc = render()
+    return doc
+
+
+def format_book_json_compact(json_path: str, **options) -> list:
+    with open(json_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [format_book_compact(book, **options) for book in data]
+
+
+def format_book_documents(json_path: str, doc_format: str = DOC_FORMAT) -> list:
+    if doc_format == "compact":
+        return format_book_json_compact(json_path)
+    return format_book_json_with_weight(json_path)
+
+
+def compare_document_sizes(json_path: str, **options) -> dict:
+    """기존 가중치 반복 문서와 압축 문서의 크기/토큰 수 비교"""
+    before = format_book_json_with_weight(json_path)
+    after = format_book_json_compact(json_path, **options)
+
+    def measure(docs):
+        tokens = [count_tokens(doc) for doc in docs]
+        return {
+            "docs": len(docs),
+            "bytes": sum(len(doc.encode("utf-8")) for doc in docs),
+            "tokens": sum(tokens),
+            "max_tokens": max(tokens, default=0),
+            "avg_tokens": round(sum(tokens) / len(tokens), 1) if tokens else 0.0,
+        }
+
+    report = {"weighted": measure(before), "compact": measure(after)}
+    if report["weighted"]["tokens"]:
+        report["token_reduction"] = round(1 - report["compact"]["tokens"] / report["weighted"]["tokens"], 3)
+    return report
+
+
+if __name__ == "__main__":
+    import sys
+
+    path = sys.argv[1] if len(sys.argv) > 1 else "books_with_age.json"
+    report = compare_document_sizes(path)
+    print(f"📏 토큰 계산: {'tiktoken cl100k_base' if _encoding is not None else '근사치'}")
+    for name in ("weighted", "compact"):
+        r = report[name]
+        print(f" - {name:8s}: {r['docs']}개 문서, {r['bytes']:,} bytes, {r['tokens']:,} tokens "
+              f"(평균 {r['avg_tokens']}, 최대 {r['max_tokens']})")
+    if "token_reduction" in report:
+        print(f"✂️ 토큰 {report['token_reduction'] * 100:.1f}% 감소")
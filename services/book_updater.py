@@ -4,64 +4,37 @@ import os
 import requests
 import json
 from dotenv import load_dotenv
-from models.custom_kg_generator import generate_custom_kg_from_books  
+from models.custom_kg_generator import upsert_custom_kg
+from services.isbn_cache import IsbnResponseCache
+from services.llm_scheduler import BULK, llm_priority
+from services.metrics import metrics
+from services.ingest_journal import INGEST_JOURNAL_PATH, IngestJournal, ingest_documents
+from services.library_fetcher import (
+    AGE_GROUPS, LibraryFetcher, build_book_data, parse_keywords, parse_summary, select_books_by_age
+)
 
 load_dotenv()
 
 BOOKS_JSON_PATH = "books_with_age.json"
 
-# 📚 연령대별 인기 도서 수집 (초등~노년층까지 연령대별 수집)
+# 📚 연령대별 인기 도서 수집 (초등~노년층까지 연령대별 수집, 순차 요청)
 def fetch_popular_books_all_ages():
-    all_books = []
-    seen = {}
-    age_groups = [
-        ("8-13", 8, 13),     # 초등학생
-        ("14-16", 14, 16),   # 중학생
-        ("17-19", 17, 19),   # 고등학생
-        ("20-39", 20, 39),   # 20~30대
-        ("40-59", 40, 59),   # 40~50대
-        ("60-80", 60, 80)    # 60~80대
-    ]
-
-    for label, from_age, to_age in age_groups:
+    lists_by_age = []
+    for label, from_age, to_age in AGE_GROUPS:
         print(f"📥 연령대 {label} 수집 중...")
-        books_raw = fetch_popular_books(from_age=str(from_age), to_age=str(to_age), page_size=200)
-        count = 0
-        for item in books_raw:
-            if count >= 120:
-                break
-            doc = item.get("doc", {})
-            isbn = doc.get("isbn13")
-            if not isbn:
-                continue
-            if isbn in seen:
-                if label not in seen[isbn]["age"]:
-                    seen[isbn]["age"].append(label)
-                continue
-
-            summary = fetch_summary_for_book(isbn)
-            keywords = fetch_keywords_for_book(isbn)
-
-            book_data = {
-                "title": doc.get("bookname"),
-                "authors": doc.get("authors"),
-                "publisher": doc.get("publisher"),
-                "publication_year": doc.get("publication_year"),
-                'class_nm': doc.get('class_nm'),
-                "isbn13": isbn,
-                "summary": summary,
-                "keywords": keywords,
-                "imageUrl": doc.get("bookImageURL"),
-                "bookUrl": doc.get("bookDtlUrl"),
-                "age": [label]
-            }
-            seen[isbn] = book_data
-            all_books.append(book_data)
-            count += 1
-
-        print(f"✅ {label} 연령대에서 {count}권 수집 완료.")
-
-    return list(seen.values())
+        lists_by_age.append((label, fetch_popular_books(from_age=str(from_age), to_age=str(to_age), page_size=200)))
+
+    books = []
+    for isbn, (doc, labels) in select_books_by_age(lists_by_age).items():
+        book_data = build_book_data(doc, labels[0], fetch_summary_for_book(isbn), fetch_keywords_for_book(isbn))
+        book_data["age"] = labels
+        books.append(book_data)
+    return books
+
+# ⚡ 비동기 동시 수집 (LibraryFetcher 사용)
+async def fetch_popular_books_all_ages_async(existing_books: list = None, **fetcher_options):
+    async with LibraryFetcher(**fetcher_options) as fetcher:
+        return await fetcher.fetch_popular_books_all_ages(existing_books=existing_books)
 
 def fetch_popular_books(start_date="2023-01-01", end_date="2025-04-13", from_age="8", to_age="13", page_size=100):
     auth_key = os.getenv("DATA4LIBRARY_API_KEY")
@@ -89,12 +62,7 @@ def fetch_keywords_for_book(isbn13: str) -> list:
         "format": "json"
     }
     response = requests.get(url, params=params)
-    data = response.json()
-    items = data.get("response", {}).get("items", [])
-    return [
-        {"word": item["item"]["word"], "weight": int(item["item"]["weight"])}
-        for item in items if "item" in item
-    ]
+    return parse_keywords(response.json())
 
 def fetch_summary_for_book(isbn13: str) -> str:
     auth_key = os.getenv("DATA4LIBRARY_API_KEY")
@@ -106,15 +74,33 @@ def fetch_summary_for_book(isbn13: str) -> str:
         "format": "json"
     }
     response = requests.get(url, params=params)
-    data = response.json()
-    try:
-        return data["response"]["detail"][0]["book"]["description"]
-    except (KeyError, IndexError):
-        return ""
-
-def update_book_data():
-    books = fetch_popular_books_all_ages()
+    return parse_summary(response.json())
+
+def update_book_data(incremental: bool = False):
+    return asyncio.run(update_book_data_async(incremental=incremental))
+
+async def update_book_data_async(incremental: bool = False, **fetcher_options):
+    """
+    :param incremental: True면 기존 데이터와 ISBN 캐시를 재사용해서 새로 들어왔거나 TTL이 지난 ISBN만 상세 조회합니다.
+                        False면 ISBN 캐시를 읽지도 쓰지도 않고 모든 ISBN을 다시 조회합니다.
+    """
+    existing_books = None
+    cache = None
+    if incremental:
+        cache = IsbnResponseCache()
+        if os.path.exists(BOOKS_JSON_PATH):
+            with open(BOOKS_JSON_PATH, "r", encoding="utf-8") as f:
+                existing_books = json.load(f)
+            seeded = cache.seed_from_books(existing_books, fetched_at=os.path.getmtime(BOOKS_JSON_PATH))
+            if seeded:
+                print(f"🗂️ 기존 도서 {seeded}권으로 ISBN 캐시 초기화")
+
+    with metrics.stage("ingest_fetch"):
+        books = await fetch_popular_books_all_ages_async(existing_books=existing_books, cache=cache, **fetcher_options)
+    save_books(books)
+    return books
 
+def save_books(books: list):
     # 연령대별 통계
     from collections import defaultdict
     age_counts = defaultdict(int)
@@ -126,72 +112,63 @@ def update_book_data():
     for age_range, count in age_counts.items():
         print(f" - {age_range}세: {count}권")
 
-    with open(BOOKS_JSON_PATH, "w", encoding="utf-8") as f:
+    # 임시 파일에 쓴 뒤 교체해서 카탈로그가 반쯤 쓰인 파일을 읽지 않도록 함
+    tmp_path = BOOKS_JSON_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
         json.dump(books, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, BOOKS_JSON_PATH)
 
-    return books
-
-FAILED_LOG_PATH = "failed_indices.json"
+# 배치 하나가 ainsert 한 번. 배치 안 동시 처리 수는 LightRAG max_parallel_insert (INGEST_CONCURRENCY)로 조절
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "20"))
 
-async def load_or_update_books_and_insert(rag, start_index: int = 0) -> list:
+async def load_or_update_books_and_insert(rag, batch_size: int = INGEST_BATCH_SIZE) -> list:
     if not os.path.exists(BOOKS_JSON_PATH):
         print("📚 데이터 파일이 없어 업데이트를 진행합니다...")
-        books = update_book_data()
+        books = await update_book_data_async()
     else:
         print("✅ 기존 도서 데이터 로드 중...")
         with open(BOOKS_JSON_PATH, "r", encoding="utf-8") as f:
             books = json.load(f)
 
-    # 실패 인덱스 불러오기
-    if os.path.exists(FAILED_LOG_PATH):
-        with open(FAILED_LOG_PATH, "r", encoding="utf-8") as f:
-            failed_indices = set(json.load(f))
-        print(f"⚠️ 이전 실패 인덱스 {len(failed_indices)}개 재시도 중...")
-    else:
-        failed_indices = None
-
-    from services.book_formatter import format_book_json_with_weight
-    docs = format_book_json_with_weight(BOOKS_JSON_PATH)
+    from services.book_formatter import format_book_documents
+    with metrics.stage("ingest_format"):
+        docs = format_book_documents(BOOKS_JSON_PATH)
 
-    failed = []
+    # ISBN을 저널 키로 사용해서 카탈로그 순서가 바뀌어도 재시작 지점이 유지되도록 함
+    items = [(book.get("isbn13") or f"row-{i}", doc) for i, (book, doc) in enumerate(zip(books, docs))]
 
-    for i, doc in enumerate(docs):
-        if failed_indices is not None:
-            if i not in failed_indices:
-                continue
-        elif i < start_index:
-            continue
-
-        try:
-            await rag.ainsert(doc)
-            print(f"✅ [{i}] insert 성공")
-        except Exception as e:
-            print(f"❌ [{i}] insert 실패: {e}")
-            failed.append(i)
+    journal = IngestJournal()
+    try:
+        # 같은 API 키로 /chat도 서비스하므로 삽입 중 LLM/임베딩 호출은 남는 처리량만 쓰도록 bulk로 표시
+        with llm_priority(BULK), metrics.stage("ingest_documents"):
+            await ingest_documents(rag, items, journal, batch_size=batch_size)
+        current_keys = {key for key, _ in items}
+        failed = [key for key in journal.failed_keys() if key in current_keys]
+    finally:
+        journal.close()
 
     if failed:
-        with open(FAILED_LOG_PATH, "w", encoding="utf-8") as f:
-            json.dump(failed, f, ensure_ascii=False, indent=2)
-        print(f"📛 총 {len(failed)}개 실패 → {FAILED_LOG_PATH} 저장 완료.")
-    elif os.path.exists(FAILED_LOG_PATH):
-        os.remove(FAILED_LOG_PATH)
-        print("🎉 모든 insert 성공 → 실패 로그 삭제됨.")
+        print(f"📛 총 {len(failed)}개 실패 → 다시 실행하면 {INGEST_JOURNAL_PATH} 기준으로 실패한 문서부터 재시도합니다.")
+    else:
+        print("🎉 모든 insert 성공")
 
     # ✅ Custom KG 삽입
     print("📌 커스텀 Knowledge Graph 삽입 중...")
-    custom_kg = await generate_custom_kg_from_books(BOOKS_JSON_PATH)
-    await rag.ainsert_custom_kg(custom_kg)
+    with llm_priority(BULK), metrics.stage("ingest_custom_kg"):
+        await upsert_custom_kg(rag, BOOKS_JSON_PATH)
     print("✅ 커스텀 KG 삽입 완료")
 
     return books
 
 # 🔪 테스트 실행 시
 if __name__ == "__main__":
+    # 별도 프로세스로 실행하면 서버의 llm_scheduler와 슬롯을 나누지 않으므로 /chat 요청보다 뒤로 밀리지 않습니다.
+    # 서버가 떠 있을 때는 POST /admin/ingest 로 서버 프로세스 안에서 실행하세요.
     import asyncio
 
     async def test():
         rag = await get_rag_instance()
-        books = await load_or_update_books_and_insert(rag,start_index=309)
+        books = await load_or_update_books_and_insert(rag)
         print(f"총 {len(books)}권의 책이 로드됨.")
 
     asyncio.run(test())
@@ -0,0 +1,333 @@
+# services/columnar_catalog.py
+#
+# books_with_age.json -> 열 단위 바이너리 카탈로그(books_with_age.bin) 변환과 mmap 리더.
+#
+#   python -m services.columnar_catalog                          # books_with_age.json -> books_with_age.bin
+#   python -m services.columnar_catalog --input books.json --output books.bin
+#
+# 파일 구조 (모든 배열은 8바이트 정렬, little-endian)
+#   MAGIC(8) | 헤더 길이 uint64 | 헤더 JSON | 배열들...
+#   - str_data(uint8) / str_offsets(int64): 중복 제거한 UTF-8 문자열 테이블
+#   - col_<필드>(int32): 행별 문자열 ID (-1 = 없음)
+#   - kw_offsets(int64) / kw_ids(int32) / kw_weights(float32): 행별 키워드 (CSR)
+#   - age_offsets(int64) / age_ids(int32): 행별 연령대 라벨 (CSR)
+#   - title_order / isbn_order(int32): 제목·ISBN 바이트 순으로 정렬한 행 번호 (이진 탐색용)
+
+import argparse
+import fcntl
+import json
+import mmap
+import os
+from collections.abc import Mapping, Sequence
+import numpy as np
+
+# 지정하지 않으면 원본 JSON 옆에 확장자만 .bin으로 바꿔 저장
+COLUMNAR_CATALOG_PATH = os.getenv("COLUMNAR_CATALOG_PATH")
+FORMAT_VERSION = 1
+MAGIC = b"BKCOL\x00\x00\x01"
+STRING_FIELDS = (
+    "title", "authors", "publisher", "publication_year", "class_nm",
+    "isbn13", "summary", "imageUrl", "bookUrl",
+)
+FIELDS = STRING_FIELDS + ("keywords", "age")
+_ALIGN = 8
+
+
+class _StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.chunks = []
+        self.offsets = [0]
+
+    def intern(self, value) -> int:
+        if value is None:
+            return -1
+        value = str(value)
+        sid = self.ids.get(value)
+        if sid is None:
+            sid = self.ids[value] = len(self.chunks)
+            encoded = value.encode("utf-8")
+            self.chunks.append(encoded)
+            self.offsets.append(self.offsets[-1] + len(encoded))
+        return sid
+
+
+def columnar_path_for(json_path: str) -> str:
+    return COLUMNAR_CATALOG_PATH or os.path.splitext(json_path)[0] + ".bin"
+
+
+def build_columnar_catalog(books: list, output_path: str, source_mtime: float = None) -> str:
+    """도서 dict 리스트를 열 단위 바이너리 파일로 저장 (임시 파일에 쓴 뒤 os.replace)"""
+    strings = _StringTable()
+    columns = {field: np.empty(len(books), dtype=np.int32) for field in STRING_FIELDS}
+    kw_offsets, kw_ids, kw_weights = [0], [], []
+    age_offsets, age_ids = [0], []
+
+    for row, book in enumerate(books):
+        for field in STRING_FIELDS:
+            columns[field][row] = strings.intern(book.get(field))
+        for kw in book.get("keywords") or []:
+            kw_ids.append(strings.intern(kw["word"]))
+            kw_weights.append(float(kw["weight"]))
+        kw_offsets.append(len(kw_ids))
+        for label in book.get("age") or []:
+            age_ids.append(strings.intern(label))
+        age_offsets.append(len(age_ids))
+
+    chunks = strings.chunks
+
+    def sort_rows(field: str) -> np.ndarray:
+        sids = columns[field]
+        rows = [row for row in range(len(books)) if sids[row] >= 0]
+        rows.sort(key=lambda row: chunks[sids[row]])
+        return np.asarray(rows, dtype=np.int32)
+
+    arrays = {
+        "str_data": np.frombuffer(b"".join(chunks), dtype=np.uint8),
+        "str_offsets": np.asarray(strings.offsets, dtype=np.int64),
+        **{f"col_{field}": column for field, column in columns.items()},
+        "kw_offsets": np.asarray(kw_offsets, dtype=np.int64),
+        "kw_ids": np.asarray(kw_ids, dtype=np.int32),
+        "kw_weights": np.asarray(kw_weights, dtype=np.float32),
+        "age_offsets": np.asarray(age_offsets, dtype=np.int64),
+        "age_ids": np.asarray(age_ids, dtype=np.int32),
+        "title_order": sort_rows("title"),
+        "isbn_order": sort_rows("isbn13"),
+    }
+
+    layout, position = {}, 0
+    for name, array in arrays.items():
+        layout[name] = {"dtype": array.dtype.str, "length": int(array.size), "offset": position}
+        position += -(-array.nbytes // _ALIGN) * _ALIGN
+    header = json.dumps({
+        "version": FORMAT_VERSION,
+        "rows": len(books),
+        "source_mtime": source_mtime,
+        "arrays": layout,
+    }).encode("utf-8")
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // _ALIGN) * _ALIGN
+
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(np.ascontiguousarray(array).tobytes())
+        f.truncate(data_start + position)
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def build_from_json(json_path: str, output_path: str = None) -> str:
+    output_path = output_path or columnar_path_for(json_path)
+    mtime = os.path.getmtime(json_path)
+    with open(json_path, "r", encoding="utf-8") as f:
+        books = json.load(f)
+    return build_columnar_catalog(books, output_path, source_mtime=mtime)
+
+
+class BookRow(Mapping):
+    """
+    카탈로그 한 행에 대한 지연 조회 뷰. book["title"], book.get("summary") 처럼 기존 dict와 같이 쓰되
+    값은 접근할 때 mmap에서 읽습니다. to_dict()로 원래 모양의 dict를 만들 수 있습니다.
+    """
+
+    __slots__ = ("_catalog", "row")
+
+    def __init__(self, catalog: "ColumnarCatalog", row: int):
+        self._catalog = catalog
+        self.row = row
+
+    def __getitem__(self, key):
+        if key in STRING_FIELDS:
+            return self._catalog.field(self.row, key)
+        if key == "keywords":
+            return [{"word": word, "weight": weight} for word, weight in self._catalog.keywords(self.row)]
+        if key == "age":
+            return self._catalog.ages(self.row)
+        raise KeyError(key)
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def __repr__(self):
+        return f"BookRow({self.row}, {self['title']!r})"
+
+    def to_dict(self) -> dict:
+        return {field: self[field] for field in FIELDS}
+
+
+class ColumnarCatalog(Sequence):
+    """
+    컬럼 카탈로그 파일 리더. 파일을 mmap으로 열고 np.frombuffer로 배열을 만들기 때문에
+    복사 없이 로드되고, 같은 파일을 연 여러 워커가 페이지 캐시를 공유합니다.
+    행은 BookRow 뷰로 돌려주며 필요한 필드만 그때그때 디코딩합니다.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path}: 컬럼 카탈로그 파일이 아닙니다.")
+        header_len = int.from_bytes(self._mmap[len(MAGIC):len(MAGIC) + 8], "little")
+        header_end = len(MAGIC) + 8 + header_len
+        header = json.loads(self._mmap[len(MAGIC) + 8:header_end])
+        if header["version"] != FORMAT_VERSION:
+            raise ValueError(f"{path}: 지원하지 않는 버전 {header['version']}")
+        self.rows = header["rows"]
+        self.source_mtime = header.get("source_mtime")
+
+        data_start = -(-header_end // _ALIGN) * _ALIGN
+        self._arrays = {
+            name: np.frombuffer(self._mmap, dtype=np.dtype(spec["dtype"]), count=spec["length"],
+                                offset=data_start + spec["offset"])
+            for name, spec in header["arrays"].items()
+        }
+        self._str_data = self._arrays["str_data"]
+        self._str_offsets = self._arrays["str_offsets"]
+
+    def close(self):
+        self._arrays = {}
+        self._str_data = self._str_offsets = None
+        self._mmap.close()
+
+    # --- 문자열 테이블 ---
+    @property
+    def string_count(self) -> int:
+        return len(self._str_offsets) - 1
+
+    def _string_bytes(self, sid: int) -> bytes:
+        return self._str_data[self._str_offsets[sid]:self._str_offsets[sid + 1]].tobytes()
+
+    def string(self, sid: int):
+        return None if sid < 0 else self._string_bytes(sid).decode("utf-8")
+
+    # --- 행 단위 조회 ---
+    def __len__(self):
+        return self.rows
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [BookRow(self, row) for row in range(*index.indices(self.rows))]
+        if index < 0:
+            index += self.rows
+        if not 0 <= index < self.rows:
+            raise IndexError(index)
+        return BookRow(self, index)
+
+    def field(self, row: int, name: str):
+        return self.string(int(self._arrays[f"col_{name}"][row]))
+
+    def column(self, name: str) -> np.ndarray:
+        """행별 문자열 ID 배열 (읽기 전용 mmap 뷰)"""
+        return self._arrays[f"col_{name}"]
+
+    def keyword_arrays(self, row: int):
+        """(키워드 문자열 ID, 가중치) numpy 뷰"""
+        start, end = self._arrays["kw_offsets"][row:row + 2]
+        return self._arrays["kw_ids"][start:end], self._arrays["kw_weights"][start:end]
+
+    def keywords(self, row: int) -> list:
+        ids, weights = self.keyword_arrays(row)
+        return [
+            (self.string(int(sid)), int(weight) if float(weight).is_integer() else float(weight))
+            for sid, weight in zip(ids, weights)
+        ]
+
+    def ages(self, row: int) -> list:
+        start, end = self._arrays["age_offsets"][row:row + 2]
+        return [self.string(int(sid)) for sid in self._arrays["age_ids"][start:end]]
+
+    def keyword_csr(self):
+        """(kw_offsets, kw_ids, kw_weights): 행렬 구성에 바로 쓸 수 있는 CSR 배열"""
+        return self._arrays["kw_offsets"], self._arrays["kw_ids"], self._arrays["kw_weights"]
+
+    # --- 제목 / ISBN 조회 (정렬 배열 이진 탐색) ---
+    def _find_row(self, order_name: str, field: str, value: str):
+        if not value:
+            return None
+        target = value.encode("utf-8")
+        order = self._arrays[order_name]
+        column = self._arrays[f"col_{field}"]
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._string_bytes(int(column[order[mid]])) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(order) and self._string_bytes(int(column[order[lo]])) == target:
+            return int(order[lo])  # 같은 제목이 여러 개면 가장 앞 행 (안정 정렬)
+        return None
+
+    def row_by_title(self, title: str):
+        return self._find_row("title_order", "title", title)
+
+    def row_by_isbn(self, isbn13: str):
+        return self._find_row("isbn_order", "isbn13", isbn13)
+
+    def get_by_title(self, title: str):
+        row = self.row_by_title(title)
+        return None if row is None else BookRow(self, row)
+
+    def get_by_isbn(self, isbn13: str):
+        row = self.row_by_isbn(isbn13)
+        return None if row is None else BookRow(self, row)
+
+    def titles(self) -> frozenset:
+        column = self._arrays["col_title"]
+        return frozenset(self.string(int(sid)) for sid in np.unique(column[column >= 0]))
+
+
+def open_columnar_catalog(json_path: str, path: str = None) -> ColumnarCatalog:
+    """
+    컬럼 카탈로그를 엽니다. 파일이 없거나 원본 JSON보다 오래됐으면 먼저 다시 빌드하며,
+    여러 워커가 동시에 시작해도 flock으로 한 프로세스만 빌드합니다.
+    """
+    path = path or columnar_path_for(json_path)
+    source_mtime = os.path.getmtime(json_path)
+
+    def is_fresh() -> bool:
+        if not os.path.exists(path):
+            return False
+        try:
+            catalog = ColumnarCatalog(path)
+        except ValueError:
+            return False
+        fresh = catalog.source_mtime == source_mtime
+        catalog.close()
+        return fresh
+
+    if not is_fresh():
+        with open(path + ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            if not is_fresh():
+                build_from_json(json_path, path)
+                print(f"🗜️ 컬럼 카탈로그 빌드 완료: {path}")
+    return ColumnarCatalog(path)
+
+
+def main():
+    from services.book_catalog import BOOKS_JSON_PATH
+
+    parser = argparse.ArgumentParser(description="books_with_age.json -> 컬럼 바이너리 카탈로그 변환")
+    parser.add_argument("--input", default=BOOKS_JSON_PATH)
+    parser.add_argument("--output", help="기본값: 입력 파일과 같은 이름의 .bin")
+    args = parser.parse_args()
+
+    output = build_from_json(args.input, args.output)
+    catalog = ColumnarCatalog(output)
+    json_size = os.path.getsize(args.input)
+    bin_size = os.path.getsize(output)
+    print(f"🗜️ {output}: {len(catalog)}권, 문자열 {catalog.string_count}개, "
+          f"{json_size / 1024:.0f}KB -> {bin_size / 1024:.0f}KB")
+
+
+if __name__ == "__main__":
+    main()
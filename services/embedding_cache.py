@@ -0,0 +1,192 @@
+# services/embedding_cache.py
+
+import asyncio
+import fcntl
+import hashlib
+import os
+import numpy as np
+from services.llm_scheduler import current_priority, llm_priority
+
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "./embedding_cache")
+EMBEDDING_BATCH_WINDOW = float(os.getenv("EMBEDDING_BATCH_WINDOW", "0.01"))
+EMBEDDING_MAX_BATCH = int(os.getenv("EMBEDDING_MAX_BATCH", "256"))
+
+
+def text_key(model: str, text: str) -> str:
+    return hashlib.sha1(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """
+    (모델, 텍스트 해시) -> 벡터 영구 캐시.
+    벡터는 float32로 {model}-{dim}.f32 파일 끝에 이어 붙이고 np.memmap으로 읽으며,
+    키와 행 번호는 {model}-{dim}.keys 파일에 한 줄씩 기록합니다.
+    쓰기는 flock으로 직렬화하므로 여러 프로세스가 같은 디렉터리를 써도 행 번호가 꼬이지 않습니다.
+    쓰다가 중단된 경우(키 없이 남은 벡터 행, 줄바꿈 없는 마지막 키 줄)는 다음 쓰기 전에 잘라냅니다.
+    """
+
+    def __init__(self, model: str, dim: int, cache_dir: str = EMBEDDING_CACHE_DIR):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.model = model
+        self.dim = dim
+        self.row_bytes = dim * 4
+        self.vectors_path = os.path.join(cache_dir, f"{model}-{dim}.f32")
+        self.keys_path = os.path.join(cache_dir, f"{model}-{dim}.keys")
+        self.lock_path = os.path.join(cache_dir, f"{model}-{dim}.lock")
+        self.index = {}
+        self._keys_offset = 0
+        self._row_count = 0  # 키가 기록된 벡터 행 수
+        self._mmap = None
+        self.hits = 0
+        self.misses = 0
+        self._load_new_keys()
+
+    def _load_new_keys(self):
+        """다른 프로세스가 추가한 키까지 읽어 들임"""
+        if not os.path.exists(self.keys_path):
+            return
+        with open(self.keys_path, "r", encoding="utf-8") as f:
+            f.seek(self._keys_offset)
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # 기록 중인 마지막 줄
+                key, row = line.split()
+                self.index[key] = int(row)
+                self._row_count = max(self._row_count, int(row) + 1)
+                self._keys_offset += len(line.encode("utf-8"))
+
+    def _truncate_torn_writes(self):
+        """flock을 잡은 상태에서 호출. 키가 없는 벡터 행과 끊긴 키 줄을 잘라내 다음 행 번호를 키 기준으로 맞춤"""
+        for path, size in ((self.vectors_path, self._row_count * self.row_bytes), (self.keys_path, self._keys_offset)):
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                os.truncate(path, size)
+
+    def _rows(self, rows: list) -> np.ndarray:
+        needed = max(rows) + 1
+        if self._mmap is None or self._mmap.shape[0] < needed:
+            total = os.path.getsize(self.vectors_path) // self.row_bytes
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(total, self.dim))
+        return np.asarray(self._mmap[rows])
+
+    def get_many(self, keys: list) -> dict:
+        """캐시에 있는 키만 {key: vector}로 반환"""
+        if any(key not in self.index for key in keys):
+            self._load_new_keys()
+        found = [key for key in keys if key in self.index]
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        if not found:
+            return {}
+        vectors = self._rows([self.index[key] for key in found])
+        return dict(zip(found, vectors))
+
+    def put_many(self, keys: list, vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(keys), self.dim)
+        with open(self.lock_path, "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._load_new_keys()
+            new = [(i, key) for i, key in enumerate(keys) if key not in self.index]
+            if not new:
+                return
+            self._truncate_torn_writes()
+            start_row = self._row_count
+            with open(self.vectors_path, "ab") as f:
+                f.write(vectors[[i for i, _ in new]].tobytes())
+            with open(self.keys_path, "a", encoding="utf-8") as f:
+                f.write("".join(f"{key} {start_row + n}\n" for n, (_, key) in enumerate(new)))
+            self._load_new_keys()
+
+    def stats(self) -> dict:
+        return {"entries": len(self.index), "hits": self.hits, "misses": self.misses}
+
+
+class EmbeddingBatcher:
+    """
+    짧은 시간(window) 안에 여러 코루틴에서 들어온 임베딩 요청을 모아 한 번의 API 호출로 보냅니다.
+    같은 배치 안의 중복 텍스트는 한 번만 요청합니다.
+    API 호출은 타이머 콜백에서 시작되므로 호출자의 llm_priority를 물려받지 못합니다. 대신 요청마다
+    우선순위를 함께 저장하고, 배치 안에서 가장 높은 우선순위(interactive가 하나라도 있으면 interactive)로 보냅니다.
+    """
+
+    def __init__(self, embed_func, window: float = EMBEDDING_BATCH_WINDOW, max_batch: int = EMBEDDING_MAX_BATCH):
+        self.embed_func = embed_func
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = {}  # text -> [future, ...]
+        self._pending_priority = None
+        self._flush_handle = None
+        self.batches = 0
+        self.requests = 0
+
+    async def embed(self, texts: list, priority: int = None) -> np.ndarray:
+        loop = asyncio.get_running_loop()
+        self.requests += 1
+        futures = []
+        priority = current_priority() if priority is None else priority
+        for text in texts:
+            if self._pending_priority is None or priority < self._pending_priority:
+                self._pending_priority = priority
+            future = loop.create_future()
+            self._pending.setdefault(text, []).append(future)
+            futures.append(future)
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+        if self._pending and self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.window, self._flush)
+        return np.stack(await asyncio.gather(*futures))
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, {}
+        priority, self._pending_priority = self._pending_priority, None
+        self.batches += 1
+        asyncio.get_running_loop().create_task(self._run(batch, priority))
+
+    async def _run(self, batch: dict, priority: int):
+        texts = list(batch)
+        try:
+            with llm_priority(priority):
+                vectors = await self.embed_func(texts)
+            if len(vectors) != len(texts):
+                raise ValueError(f"임베딩 API가 {len(texts)}개 요청에 {len(vectors)}개 벡터를 반환했습니다.")
+        except Exception as e:
+            for futures in batch.values():
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+            return
+        for text, vector in zip(texts, vectors):
+            for future in batch[text]:
+                if not future.done():
+                    future.set_result(vector)
+
+
+class CachedEmbedder:
+    """영구 캐시 -> (캐시에 없는 텍스트만) 마이크로 배처 -> 실제 임베딩 API"""
+
+    def __init__(self, embed_func, model: str, dim: int, cache_dir: str = EMBEDDING_CACHE_DIR, **batcher_options):
+        self.model = model
+        self.store = EmbeddingStore(model, dim, cache_dir)
+        self.batcher = EmbeddingBatcher(embed_func, **batcher_options)
+
+    async def __call__(self, texts: list, priority: int = None) -> np.ndarray:
+        keys = [text_key(self.model, text) for text in texts]
+        cached = self.store.get_many(keys)
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached:
+                missing.setdefault(key, text)
+        if missing:
+            vectors = await self.batcher.embed(list(missing.values()), priority)
+            self.store.put_many(list(missing), vectors)
+            cached.update(zip(missing, vectors))
+
+        return np.stack([cached[key] for key in keys]).astype(np.float32, copy=False)
+
+    def stats(self) -> dict:
+        return {**self.store.stats(), "api_batches": self.batcher.batches, "batched_requests": self.batcher.requests}
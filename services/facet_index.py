@@ -0,0 +1,164 @@
+# services/facet_index.py
+
+import re
+from collections import defaultdict
+import numpy as np
+from services.book_catalog import SnapshotCache
+from services.library_fetcher import AGE_GROUPS
+
+FACETS = ("age", "class_nm", "publication_year")
+
+# 세션 키워드(띄어쓰기 단위 토큰)가 이 말과 정확히 같으면 해당 연령대 도서로 후보를 좁힘
+AGE_HINTS = {
+    "8-13": ("초등", "초등학생", "초등학교", "어린이", "초딩"),
+    "14-16": ("중학생", "중학교", "중등", "중딩"),
+    "17-19": ("고등학생", "고등학교", "고딩", "수험생", "고3"),
+    "20-39": ("대학생", "대학교", "직장인", "사회초년생", "취준생", "청년", "신혼"),
+    "40-59": ("중년",),
+    "60-80": ("노년", "노인", "은퇴", "시니어"),
+}
+# 여러 연령대에 걸치는 말
+AGE_RANGE_HINTS = {
+    "청소년": ("14-16", "17-19"),
+    "십대": ("8-13", "14-16", "17-19"),
+}
+_HINT_LABELS = {hint: (label,) for label, hints in AGE_HINTS.items() for hint in hints}
+_HINT_LABELS.update(AGE_RANGE_HINTS)
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+# '3세대' 같은 말은 나이가 아님
+_AGE_NUMBER = re.compile(r"(?<!\d)(\d{1,2})\s*(?:살|세(?!대))")
+_AGE_DECADE = re.compile(r"(?<!\d)([1-8])0\s*대")
+
+
+def _age_label(age: int):
+    for label, low, high in AGE_GROUPS:
+        if low <= age <= high:
+            return label
+    return None
+
+
+def _overlapping_labels(low: int, high: int) -> list:
+    return [label for label, group_low, group_high in AGE_GROUPS if group_low <= high and low <= group_high]
+
+
+def infer_age_groups(keywords: list) -> list:
+    """
+    키워드에서 연령대 라벨을 추론합니다 ('중학생' -> 14-16, '15살' -> 14-16, '10대' -> 8-13, 14-16, 17-19).
+    힌트는 토큰 전체가 같을 때만 인정하므로 '노인과 바다' 같은 제목·주제 키워드는 연령대로 보지 않습니다.
+    :return: AGE_GROUPS 순서의 라벨 리스트 (추론할 수 없으면 빈 리스트)
+    """
+    labels = set()
+    for keyword in keywords:
+        for token in _TOKEN.findall(keyword):
+            labels.update(_HINT_LABELS.get(token, ()))
+        for match in _AGE_NUMBER.finditer(keyword):
+            labels.add(_age_label(int(match.group(1))))
+        for match in _AGE_DECADE.finditer(keyword):
+            decade = int(match.group(1)) * 10
+            labels.update(_overlapping_labels(decade, decade + 9))
+    labels.discard(None)
+    return [label for label, _, _ in AGE_GROUPS if label in labels]
+
+
+def class_prefixes(class_nm: str) -> list:
+    """'문학 > 한국문학 > 소설' -> ['문학', '문학 > 한국문학', '문학 > 한국문학 > 소설']"""
+    parts = [part.strip() for part in (class_nm or "").split(">") if part.strip()]
+    return [" > ".join(parts[:i + 1]) for i in range(len(parts))]
+
+
+class FacetIndex:
+    """
+    연령대(age), 분류(class_nm, 상위 분류 포함), 출판연도(publication_year) 값별 비트셋 색인.
+    각 값마다 np.packbits로 압축한 행 비트셋을 미리 만들어 두고, 같은 facet 안은 OR, facet끼리는 AND로
+    교집합을 구해 후보 행 번호를 돌려줍니다.
+    """
+
+    def __init__(self, books):
+        rows_by_value = {facet: defaultdict(list) for facet in FACETS}
+        years = []
+        self.size = 0
+        for row, book in enumerate(books):
+            self.size += 1
+            for label in book.get("age") or []:
+                rows_by_value["age"][label].append(row)
+            for prefix in class_prefixes(book.get("class_nm")):
+                rows_by_value["class_nm"][prefix].append(row)
+            year = str(book.get("publication_year") or "").strip()[:4]
+            if year.isdigit():
+                rows_by_value["publication_year"][year].append(row)
+            years.append(int(year) if year.isdigit() else -1)
+
+        self._bitsets = {
+            facet: {value: self._pack(rows) for value, rows in values.items()}
+            for facet, values in rows_by_value.items()
+        }
+        self._counts = {
+            facet: {value: len(rows) for value, rows in values.items()}
+            for facet, values in rows_by_value.items()
+        }
+        self._years = np.asarray(years, dtype=np.int32)
+        self._empty = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def _pack(self, rows) -> np.ndarray:
+        mask = np.zeros(self.size, dtype=bool)
+        mask[rows] = True
+        return np.packbits(mask)
+
+    def values(self, facet: str) -> dict:
+        """facet 값별 도서 수"""
+        return dict(self._counts[facet])
+
+    def bitset(self, facet: str, values) -> np.ndarray:
+        """값들 중 하나라도 해당하는 행의 비트셋 (OR)"""
+        if isinstance(values, str):
+            values = [values]
+        result = self._empty
+        for value in values:
+            bits = self._bitsets[facet].get(str(value))
+            if bits is not None:
+                result = result | bits
+        return result
+
+    def year_bitset(self, year_from: int = None, year_to: int = None) -> np.ndarray:
+        mask = self._years >= 0
+        if year_from is not None:
+            mask &= self._years >= year_from
+        if year_to is not None:
+            mask &= self._years <= year_to
+        return np.packbits(mask)
+
+    def rows(self, age=None, class_nm=None, year_from: int = None, year_to: int = None):
+        """
+        facet 조건을 모두 만족하는 행 번호 배열. 조건이 하나도 없으면 None (= 전체 카탈로그)
+        :param age: 연령대 라벨 또는 라벨 리스트 ('14-16')
+        :param class_nm: 분류 또는 분류 리스트. 상위 분류('문학')를 주면 하위 분류도 모두 포함
+        """
+        bitsets = []
+        if age:
+            bitsets.append(self.bitset("age", age))
+        if class_nm:
+            bitsets.append(self.bitset("class_nm", class_nm))
+        if year_from is not None or year_to is not None:
+            bitsets.append(self.year_bitset(year_from, year_to))
+        if not bitsets:
+            return None
+        result = bitsets[0]
+        for bits in bitsets[1:]:
+            result = result & bits
+        return np.flatnonzero(np.unpackbits(result, count=self.size))
+
+
+_index = SnapshotCache(lambda snapshot: FacetIndex(snapshot.books))
+
+
+def get_facet_index(snapshot=None) -> FacetIndex:
+    """카탈로그 스냅샷이 바뀌면 (파일 갱신) 색인을 다시 만듭니다."""
+    return _index.get(snapshot)
+
+
+def candidate_rows_for_keywords(keywords: list):
+    """세션 키워드가 연령대를 암시하면 그 연령대 도서의 행 번호, 아니면 None"""
+    age_groups = infer_age_groups(keywords)
+    if not age_groups:
+        return None
+    return get_facet_index().rows(age=age_groups)
@@ -0,0 +1,90 @@
+# services/history_manager.py
+
+import asyncio
+import os
+from services.llm_scheduler import BULK, llm_priority
+from services.session_store import user_sessions
+
+HISTORY_KEEP_MESSAGES = int(os.getenv("HISTORY_KEEP_MESSAGES", "6"))     # 그대로 넣는 최근 메시지 수
+HISTORY_SUMMARY_BATCH = int(os.getenv("HISTORY_SUMMARY_BATCH", "4"))     # 이만큼 밀려나면 요약에 합침
+HISTORY_SUMMARY_MAX_CHARS = int(os.getenv("HISTORY_SUMMARY_MAX_CHARS", "600"))
+
+SUMMARY_SYSTEM_PROMPT = """
+너는 도서 추천 챗봇의 대화 기록을 요약하는 비서야.
+기존 요약과 새로 추가된 대화를 합쳐서, 사용자의 상황·성격·관심사·선호를 중심으로 한국어 3~5문장으로 요약해.
+질문 문장이나 인사말은 빼고 사실만 남겨. 요약문만 출력해.
+"""
+
+_in_progress = set()
+
+
+def recent_messages(session) -> list:
+    """QueryParam.conversation_history에 넣을 최근 메시지 (길이 고정)"""
+    return session["messages"][-HISTORY_KEEP_MESSAGES:]
+
+
+def unsummarized_messages(session) -> list:
+    """
+    아직 요약에 반영되지 않은 메시지. 요약 갱신이 늦어져도
+    최근 창 + 요약 배치 크기를 넘지 않도록 오래된 것부터 잘라냅니다.
+    """
+    limit = HISTORY_KEEP_MESSAGES + HISTORY_SUMMARY_BATCH
+    return session["messages"][session["summarized_count"]:][-limit:]
+
+
+def render_history(session) -> str:
+    """
+    RAG 질의에 넣을 대화 맥락: 이전 대화 요약 + 누적 키워드 + 요약되지 않은 최근 메시지.
+    대화가 길어져도 요약 길이와 메시지 수에 상한이 있어 프롬프트 크기가 일정합니다.
+    """
+    parts = []
+    summary = session.get("summary")
+    if summary:
+        parts.append(f"[이전 대화 요약] {summary}")
+    if session["keywords"]:
+        parts.append(f"[관심 키워드] {', '.join(session['keywords'])}")
+    parts.extend(f"{m['role']}: {m['content']}" for m in unsummarized_messages(session))
+    return "\n".join(parts)
+
+
+def schedule_summary_update(session):
+    """최근 창 밖으로 밀려난 메시지가 HISTORY_SUMMARY_BATCH개 이상 쌓이면 백그라운드에서 요약을 갱신합니다."""
+    pending = len(session["messages"]) - HISTORY_KEEP_MESSAGES - session["summarized_count"]
+    if pending < HISTORY_SUMMARY_BATCH or session.user_id in _in_progress:
+        return None
+    _in_progress.add(session.user_id)
+    return asyncio.create_task(_update_summary(
+        session.user_id,
+        base_count=session["summarized_count"],
+        base_trimmed=session["trimmed_count"],
+        previous_summary=session.get("summary", ""),
+        messages=list(session["messages"][session["summarized_count"]:session["summarized_count"] + pending]),
+    ))
+
+
+async def _update_summary(user_id: str, base_count: int, base_trimmed: int, previous_summary: str, messages: list):
+    from models.deepseek_lightrag import llm_model_func
+
+    try:
+        dialogue = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+        prompt = f"기존 요약:\n{previous_summary or '(없음)'}\n\n새 대화:\n{dialogue}"
+        # 요약은 응답 지연과 무관하므로 남는 처리량만 사용
+        with llm_priority(BULK):
+            summary = await llm_model_func(prompt, system_prompt=SUMMARY_SYSTEM_PROMPT, max_tokens=400)
+        summary = summary.strip()[:HISTORY_SUMMARY_MAX_CHARS]
+
+        # 그 사이 다른 요청(또는 다른 워커)이 세션을 바꿨을 수 있으니 최신 세션에 반영
+        session = await user_sessions.aget(user_id)
+        if session is None:
+            return  # 그사이 만료로 정리된 사용자는 되살리지 않음
+        # 요약하는 동안 trim()으로 앞쪽 메시지가 잘렸으면 그만큼 기준점을 당겨서 반영
+        base_count -= session["trimmed_count"] - base_trimmed
+        if base_count < 0 or session["summarized_count"] != base_count:
+            return  # 다른 요약이 먼저 반영됨
+        session["summary"] = summary
+        session["summarized_count"] = base_count + len(messages)
+        await user_sessions.asave(session)
+    except Exception as e:
+        print("❗대화 요약 갱신 실패:", e)
+    finally:
+        _in_progress.discard(user_id)
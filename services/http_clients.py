@@ -0,0 +1,178 @@
+# services/http_clients.py
+
+import asyncio
+import json
+import os
+import random
+import httpx
+
+DEFAULT_TIMEOUT = float(os.getenv("LLM_HTTP_TIMEOUT", "60"))
+DEFAULT_MAX_RETRIES = int(os.getenv("LLM_HTTP_MAX_RETRIES", "2"))
+MAX_CONNECTIONS_PER_HOST = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "20"))
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class HttpClientManager:
+    """
+    외부 LLM/임베딩 API 호출용 httpx.AsyncClient를 base URL별로 하나씩 유지합니다.
+    앱 lifespan에서 만들어 모든 요청이 keep-alive 커넥션을 재사용하고,
+    호출마다 전체 데드라인(재시도 포함)과 429/5xx 재시도 정책을 적용합니다.
+    """
+
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT, max_retries: int = DEFAULT_MAX_RETRIES,
+                 max_connections: int = MAX_CONNECTIONS_PER_HOST, backoff: float = 0.5):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._clients = {}
+        self._stats = {}
+
+    def client(self, base_url: str) -> httpx.AsyncClient:
+        base_url = base_url.rstrip("/")
+        client = self._clients.get(base_url)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(base_url=base_url, limits=self._limits, timeout=self.timeout)
+            self._clients[base_url] = client
+            self._stats[base_url] = {"requests": 0, "retries": 0, "failures": 0, "in_flight": 0}
+        return client
+
+    async def post_json(self, base_url: str, path: str, payload: dict, api_key: str = None,
+                        timeout: float = None, max_retries: int = None) -> dict:
+        """
+        :param timeout: 재시도를 포함한 이 호출 전체의 데드라인(초)
+        """
+        client = self.client(base_url)
+        stats = self._stats[base_url.rstrip("/")]
+        max_retries = self.max_retries if max_retries is None else max_retries
+        headers = {"Content-Type": "application/json"}
+        if api_key:
+            headers["Authorization"] = f"Bearer {api_key}"
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (timeout or self.timeout)
+
+        for attempt in range(max_retries + 1):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                stats["failures"] += 1
+                raise httpx.TimeoutException(f"{base_url}{path} 데드라인 초과")
+
+            stats["requests"] += 1
+            stats["in_flight"] += 1
+            retry_after = None
+            try:
+                response = await client.post(path, json=payload, headers=headers, timeout=remaining)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    return response.json()
+                error = httpx.HTTPStatusError(
+                    f"{response.status_code} from {base_url}{path}", request=response.request, response=response
+                )
+                retry_after = response.headers.get("Retry-After")
+            except (httpx.TransportError, httpx.TimeoutException) as e:
+                error = e
+            except httpx.HTTPStatusError:
+                stats["failures"] += 1
+                raise
+            finally:
+                stats["in_flight"] -= 1
+
+            delay = self.backoff * (2 ** attempt) * (1 + random.random() * 0.1)
+            if retry_after is not None:
+                try:
+                    delay = max(delay, float(retry_after))
+                except ValueError:
+                    pass
+            if attempt == max_retries or loop.time() + delay >= deadline:
+                stats["failures"] += 1
+                raise error
+            stats["retries"] += 1
+            await asyncio.sleep(delay)
+
+    async def stream_sse(self, base_url: str, path: str, payload: dict, api_key: str = None,
+                         timeout: float = None, max_retries: int = None):
+        """
+        OpenAI 호환 스트리밍 응답(Server-Sent Events)의 "data:" JSON 이벤트를 순서대로 yield 합니다.
+        재시도는 첫 바이트를 받기 전(429/5xx, 연결 오류)까지만 합니다.
+        """
+        client = self.client(base_url)
+        stats = self._stats[base_url.rstrip("/")]
+        max_retries = self.max_retries if max_retries is None else max_retries
+        headers = {"Content-Type": "application/json", "Accept": "text/event-stream"}
+        if api_key:
+            headers["Authorization"] = f"Bearer {api_key}"
+        request_timeout = httpx.Timeout(timeout or self.timeout, connect=10.0)
+
+        for attempt in range(max_retries + 1):
+            started = False
+            stats["requests"] += 1
+            stats["in_flight"] += 1
+            try:
+                async with client.stream("POST", path, json=payload, headers=headers, timeout=request_timeout) as response:
+                    if response.status_code in RETRY_STATUS_CODES and attempt < max_retries:
+                        error = f"HTTP {response.status_code}"
+                    else:
+                        response.raise_for_status()
+                        async for line in response.aiter_lines():
+                            if not line.startswith("data:"):
+                                continue
+                            data = line[len("data:"):].strip()
+                            if data == "[DONE]":
+                                return
+                            started = True
+                            yield json.loads(data)
+                        return
+            except (httpx.TransportError, httpx.TimeoutException) as e:
+                if started or attempt == max_retries:
+                    stats["failures"] += 1
+                    raise
+                error = e
+            except httpx.HTTPStatusError:
+                stats["failures"] += 1
+                raise
+            finally:
+                stats["in_flight"] -= 1
+
+            stats["retries"] += 1
+            print(f"🔁 {base_url}{path} 스트림 재시도 {attempt + 1}/{max_retries}: {error}")
+            await asyncio.sleep(self.backoff * (2 ** attempt))
+
+    def stats(self) -> dict:
+        result = {}
+        for base_url, client in self._clients.items():
+            pool = getattr(getattr(client, "_transport", None), "_pool", None)
+            connections = getattr(pool, "connections", [])
+            result[base_url] = {
+                **self._stats[base_url],
+                "open_connections": len(connections),
+                "idle_connections": sum(1 for conn in connections if conn.is_idle()),
+            }
+        return result
+
+    async def aclose(self):
+        await asyncio.gather(*(client.aclose() for client in self._clients.values()))
+        self._clients.clear()
+
+
+_manager = None
+
+
+def get_http_clients() -> HttpClientManager:
+    """앱 lifespan 밖(배치 스크립트 등)에서 호출되면 그 자리에서 만들어 재사용합니다."""
+    global _manager
+    if _manager is None:
+        _manager = HttpClientManager()
+    return _manager
+
+
+async def init_http_clients() -> HttpClientManager:
+    return get_http_clients()
+
+
+async def close_http_clients():
+    global _manager
+    if _manager is not None:
+        await _manager.aclose()
+        _manager = None
@@ -0,0 +1,68 @@
+# services/isbn_cache.py
+
+import json
+import os
+import time
+
+ISBN_CACHE_DIR = "./isbn_cache"
+ISBN_CACHE_TTL_SECONDS = int(os.getenv("ISBN_CACHE_TTL_DAYS", "30")) * 24 * 3600
+
+
+class IsbnResponseCache:
+    """
+    ISBN별 srchDtlList(요약) / keywordList(키워드) 응답을 디스크에 저장하는 캐시.
+    ISBN 하나당 파일 하나({dir}/{isbn}.json)로 저장하므로 수집 도중 중단돼도
+    이미 받은 응답은 남아 있습니다. ttl_seconds=0 이면 모든 항목을 만료로 취급합니다.
+    """
+
+    def __init__(self, cache_dir: str = ISBN_CACHE_DIR, ttl_seconds: int = ISBN_CACHE_TTL_SECONDS):
+        self.cache_dir = cache_dir
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, isbn13: str) -> str:
+        return os.path.join(self.cache_dir, f"{isbn13}.json")
+
+    def _read(self, isbn13: str):
+        try:
+            with open(self._path(isbn13), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, isbn13: str):
+        """만료되지 않은 항목이면 {"summary", "keywords", "fetched_at"} 반환, 아니면 None"""
+        entry = self._read(isbn13)
+        if entry is None or time.time() - entry.get("fetched_at", 0) >= self.ttl_seconds:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, isbn13: str, summary: str, keywords: list, fetched_at: float = None):
+        entry = {
+            "isbn13": isbn13,
+            "summary": summary,
+            "keywords": keywords,
+            "fetched_at": fetched_at if fetched_at is not None else time.time()
+        }
+        tmp_path = self._path(isbn13) + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(isbn13))
+
+    def seed_from_books(self, books: list, fetched_at: float) -> int:
+        """
+        캐시가 아직 없는 기존 도서 레코드를 캐시에 채워 넣습니다.
+        fetched_at에는 기존 데이터 파일의 수정 시각을 넘겨서 TTL이 실제 수집 시점 기준으로 계산되게 합니다.
+        """
+        seeded = 0
+        for book in books:
+            isbn = book.get("isbn13")
+            if not isbn or os.path.exists(self._path(isbn)):
+                continue
+            self.put(isbn, book.get("summary", ""), book.get("keywords", []), fetched_at=fetched_at)
+            seeded += 1
+        return seeded
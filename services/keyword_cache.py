@@ -0,0 +1,138 @@
+# services/keyword_cache.py
+
+import asyncio
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+KEYWORD_CACHE_MAX_ENTRIES = int(os.getenv("KEYWORD_CACHE_MAX_ENTRIES", "5000"))
+KEYWORD_CACHE_TTL_SECONDS = int(os.getenv("KEYWORD_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+KEYWORD_CACHE_PATH = os.getenv("KEYWORD_CACHE_PATH")  # 설정하면 SQLite 디스크 캐시 사용
+
+_PUNCTUATION = re.compile(r"[^\w\s]", re.UNICODE)
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_message(message: str) -> str:
+    """공백·구두점·대소문자·유니코드 표기 차이를 없앤 캐시 키 ("안녕하세요!!" == "안녕하세요")"""
+    text = unicodedata.normalize("NFKC", message).lower()
+    text = _PUNCTUATION.sub(" ", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+class KeywordCache:
+    """
+    정규화된 메시지 -> 키워드 리스트 캐시.
+    1차: 메모리 LRU (최대 max_entries개, TTL), 2차(선택): 재시작 후에도 유지되는 SQLite 파일.
+    비동기 경로에서는 aget/aput을 쓰면 SQLite 조회·커밋을 스레드에서 실행해 이벤트 루프를 막지 않습니다.
+    """
+
+    def __init__(self, max_entries: int = KEYWORD_CACHE_MAX_ENTRIES, ttl_seconds: int = KEYWORD_CACHE_TTL_SECONDS,
+                 disk_path: str = KEYWORD_CACHE_PATH):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (저장 시각, keywords)
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()  # SQLite 연결은 스레드 간에 공유하므로 한 번에 한 스레드만 사용
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._db = None
+        if disk_path:
+            self._db = sqlite3.connect(disk_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS keyword_cache (key TEXT PRIMARY KEY, keywords TEXT, stored_at REAL)"
+            )
+            self._db.commit()
+
+    def _memory_get(self, key: str, now: float):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return list(entry[1])
+            if entry is not None:
+                del self._entries[key]
+            if self._db is None:
+                self.misses += 1
+            return None
+
+    def _disk_get(self, key: str, now: float):
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT keywords, stored_at FROM keyword_cache WHERE key = ?", (key,)
+            ).fetchone()
+        with self._lock:
+            if row is not None and now - row[1] < self.ttl_seconds:
+                keywords = json.loads(row[0])
+                self._store(key, keywords, row[1])
+                self.disk_hits += 1
+                return list(keywords)
+            self.misses += 1
+            return None
+
+    def _disk_put(self, key: str, keywords: list, stored_at: float):
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO keyword_cache (key, keywords, stored_at) VALUES (?, ?, ?)",
+                (key, json.dumps(keywords, ensure_ascii=False), stored_at)
+            )
+            self._db.commit()
+
+    def get(self, message: str):
+        key = normalize_message(message)
+        now = time.time()
+        keywords = self._memory_get(key, now)
+        if keywords is None and self._db is not None:
+            keywords = self._disk_get(key, now)
+        return keywords
+
+    async def aget(self, message: str):
+        key = normalize_message(message)
+        now = time.time()
+        keywords = self._memory_get(key, now)
+        if keywords is None and self._db is not None:
+            keywords = await asyncio.to_thread(self._disk_get, key, now)
+        return keywords
+
+    def put(self, message: str, keywords: list):
+        key = normalize_message(message)
+        now = time.time()
+        with self._lock:
+            self._store(key, list(keywords), now)
+        if self._db is not None:
+            self._disk_put(key, keywords, now)
+
+    async def aput(self, message: str, keywords: list):
+        key = normalize_message(message)
+        now = time.time()
+        with self._lock:
+            self._store(key, list(keywords), now)
+        if self._db is not None:
+            await asyncio.to_thread(self._disk_put, key, list(keywords), now)
+
+    def _store(self, key: str, keywords: list, stored_at: float):
+        self._entries[key] = (stored_at, keywords)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+        }
+
+
+keyword_cache = KeywordCache()
@@ -1,10 +1,15 @@
 import os
 from typing import List
-import httpx
 from dotenv import load_dotenv
+from services.http_clients import get_http_clients
+from services.keyword_cache import keyword_cache
+from services.llm_scheduler import llm_scheduler
+from services.local_keyword_extractor import LOCAL_KEYWORD_MIN_CONFIDENCE, get_local_keyword_extractor
 
 load_dotenv()
 
+KEYWORD_TIMEOUT = float(os.getenv("KEYWORD_TIMEOUT", "15"))
+
 # ✅ GPT로부터 키워드를 추출하는 함수
 async def extract_keywords_from_gpt(user_message: str) -> List[str]:
     """
@@ -12,6 +17,10 @@ async def extract_keywords_from_gpt(user_message: str) -> List[str]:
     :param user_message: 사용자 발화
     :return: 키워드 리스트
     """
+    cached = await keyword_cache.aget(user_message)
+    if cached is not None:
+        return cached
+
     system_prompt = """
         너는 사용자 입력으로부터 핵심 키워드를 추출하는 AI 비서야.
         사용자의 감정, 관심사, 상황을 반영하는 명사(또는 고유명사)를 최대 5개까지 골라줘.
@@ -33,31 +42,42 @@ async def extract_keywords_from_gpt(user_message: str) -> List[str]:
 
     # 🧠 deepseek-chat 또는 gpt-4o, gpt-3.5-turbo 등 가능
     api_key = os.getenv("OPENAI_API_KEY")
-    base_url = "https://api.openai.com/v1"  # DeepSeek일 경우: https://api.deepseek.com/v1
+    base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")  # DeepSeek일 경우: https://api.deepseek.com/v1
     model = "gpt-3.5-turbo"  # 또는 deepseek-chat
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            f"{base_url}/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json"
-            },
-            json={
-                "model": model,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                "temperature": 0.5
-            }
-        )
-
-    result = response.json()
     try:
+        async with llm_scheduler.slot("openai"):
+            result = await get_http_clients().post_json(
+                base_url, "/chat/completions",
+                {
+                    "model": model,
+                    "messages": [
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_message}
+                    ],
+                    "temperature": 0.5
+                },
+                api_key=api_key,
+                timeout=KEYWORD_TIMEOUT,
+            )
         content = result["choices"][0]["message"]["content"]
         keyword_data = eval(content)  # 단순 JSON 파싱
-        return keyword_data.get("keywords", [])
+        keywords = keyword_data.get("keywords", [])
+        await keyword_cache.aput(user_message, keywords)  # 실패 응답은 캐시하지 않음
+        return keywords
     except Exception as e:
         print("❗키워드 추출 실패:", e)
         return []
+
+
+# ⚡ 로컬 카탈로그 어휘 우선, 신뢰도가 낮거나 일치하는 키워드가 없을 때만 GPT 호출
+async def extract_keywords(user_message: str) -> List[str]:
+    try:
+        keywords, confidence = get_local_keyword_extractor().extract(user_message)
+    except Exception as e:
+        print("❗로컬 키워드 추출 실패:", e)
+        keywords, confidence = [], 0.0
+
+    if keywords and confidence >= LOCAL_KEYWORD_MIN_CONFIDENCE:
+        return keywords
+    return await extract_keywords_from_gpt(user_message)
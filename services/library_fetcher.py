@@ -0,0 +1,245 @@
+# services/library_fetcher.py
+
+import asyncio
+import os
+import random
+import httpx
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DATA4LIBRARY_BASE_URL = os.getenv("DATA4LIBRARY_BASE_URL", "http://data4library.kr/api")
+
+# 📚 수집 대상 연령대 (초등~노년층)
+AGE_GROUPS = [
+    ("8-13", 8, 13),     # 초등학생
+    ("14-16", 14, 16),   # 중학생
+    ("17-19", 17, 19),   # 고등학생
+    ("20-39", 20, 39),   # 20~30대
+    ("40-59", 40, 59),   # 40~50대
+    ("60-80", 60, 80)    # 60~80대
+]
+BOOKS_PER_AGE_GROUP = 120
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def parse_keywords(data: dict) -> list:
+    items = data.get("response", {}).get("items", [])
+    return [
+        {"word": item["item"]["word"], "weight": int(item["item"]["weight"])}
+        for item in items if "item" in item
+    ]
+
+
+def parse_summary(data: dict) -> str:
+    try:
+        return data["response"]["detail"][0]["book"]["description"]
+    except (KeyError, IndexError):
+        return ""
+
+
+def build_book_data(doc: dict, label: str, summary: str, keywords: list) -> dict:
+    return {
+        "title": doc.get("bookname"),
+        "authors": doc.get("authors"),
+        "publisher": doc.get("publisher"),
+        "publication_year": doc.get("publication_year"),
+        'class_nm': doc.get('class_nm'),
+        "isbn13": doc.get("isbn13"),
+        "summary": summary,
+        "keywords": keywords,
+        "imageUrl": doc.get("bookImageURL"),
+        "bookUrl": doc.get("bookDtlUrl"),
+        "age": [label]
+    }
+
+
+def merge_age_labels(*label_lists) -> list:
+    """여러 연령대 라벨 리스트의 합집합을 AGE_GROUPS 순서로 돌려줍니다."""
+    merged = {label for labels in label_lists for label in labels or []}
+    ordered = [label for label, _, _ in AGE_GROUPS if label in merged]
+    return ordered + sorted(merged.difference(ordered))
+
+
+def select_books_by_age(lists_by_age: list, limit: int = BOOKS_PER_AGE_GROUP):
+    """
+    연령대별 인기 목록을 순서대로 훑으며 중복 ISBN을 합칩니다.
+    :param lists_by_age: [(연령대 라벨, loanItemSrch docs), ...]
+    :return: (ISBN -> (doc, 연령대 라벨 리스트)) 삽입 순서 유지 dict
+    """
+    seen = {}
+    for label, books_raw in lists_by_age:
+        count = 0
+        for item in books_raw:
+            if count >= limit:
+                break
+            doc = item.get("doc", {})
+            isbn = doc.get("isbn13")
+            if not isbn:
+                continue
+            if isbn in seen:
+                if label not in seen[isbn][1]:
+                    seen[isbn][1].append(label)
+                continue
+            seen[isbn] = (doc, [label])
+            count += 1
+        print(f"✅ {label} 연령대에서 {count}권 수집 완료.")
+    return seen
+
+
+class AsyncRateLimiter:
+    """초당 요청 수를 제한하는 간단한 간격 기반 리미터 (rate <= 0 이면 무제한)"""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            wait = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+class LibraryFetcher:
+    """
+    data4library API 비동기 수집기.
+    커넥션 풀을 공유하는 httpx 클라이언트 하나로 동시 요청 수, 초당 요청 수,
+    요청별 타임아웃과 재시도(지수 백오프)를 관리합니다.
+
+    async with LibraryFetcher() as fetcher:
+        books = await fetcher.fetch_popular_books_all_ages()
+    """
+
+    def __init__(
+        self,
+        auth_key: str = None,
+        base_url: str = DATA4LIBRARY_BASE_URL,
+        concurrency: int = 8,
+        requests_per_second: float = 10.0,
+        timeout: float = 10.0,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        cache=None,
+    ):
+        self.auth_key = auth_key or os.getenv("DATA4LIBRARY_API_KEY")
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.cache = cache  # IsbnResponseCache (선택)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._limiter = AsyncRateLimiter(requests_per_second)
+        self._limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        self._client = None
+
+    async def __aenter__(self):
+        self._client = httpx.AsyncClient(timeout=self.timeout, limits=self._limits)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self._client.aclose()
+        self._client = None
+
+    async def _get_json(self, endpoint: str, params: dict) -> dict:
+        params = {"authKey": self.auth_key, "format": "json", **params}
+        url = f"{self.base_url}/{endpoint}"
+
+        for attempt in range(self.max_retries + 1):
+            await self._limiter.acquire()
+            try:
+                async with self._semaphore:
+                    response = await self._client.get(url, params=params)
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    return response.json()
+                error = httpx.HTTPStatusError(
+                    f"{response.status_code} from {endpoint}", request=response.request, response=response
+                )
+            except (httpx.TransportError, httpx.TimeoutException) as e:
+                error = e
+
+            if attempt == self.max_retries:
+                raise error
+            delay = self.backoff * (2 ** attempt) * (1 + random.random() * 0.1)
+            print(f"🔁 {endpoint} 재시도 {attempt + 1}/{self.max_retries} ({delay:.1f}s 후): {error}")
+            await asyncio.sleep(delay)
+
+    async def fetch_popular_books(self, start_date="2023-01-01", end_date="2025-04-13", from_age="8", to_age="13", page_size=100) -> list:
+        data = await self._get_json("loanItemSrch", {
+            "startDt": start_date,
+            "endDt": end_date,
+            "from_age": from_age,
+            "to_age": to_age,
+            "pageSize": page_size,
+        })
+        return data.get("response", {}).get("docs", [])
+
+    async def fetch_keywords_for_book(self, isbn13: str) -> list:
+        data = await self._get_json("keywordList", {"isbn13": isbn13, "additionalYN": "Y"})
+        return parse_keywords(data)
+
+    async def fetch_summary_for_book(self, isbn13: str) -> str:
+        data = await self._get_json("srchDtlList", {"isbn13": isbn13, "loaninfo": "Y"})
+        return parse_summary(data)
+
+    async def fetch_book_details(self, isbn13: str):
+        """
+        요약과 키워드를 동시에 요청합니다. 실패 시 빈 값으로 대체합니다.
+        캐시가 있으면 만료되지 않은 항목은 요청 없이 재사용하고, 두 요청이 모두 성공한 경우에만 캐시에 저장합니다.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(isbn13)
+            if cached is not None:
+                return cached["summary"], cached["keywords"]
+
+        summary, keywords = await asyncio.gather(
+            self.fetch_summary_for_book(isbn13),
+            self.fetch_keywords_for_book(isbn13),
+            return_exceptions=True,
+        )
+        if self.cache is not None and not isinstance(summary, Exception) and not isinstance(keywords, Exception):
+            self.cache.put(isbn13, summary, keywords)
+        if isinstance(summary, Exception):
+            print(f"❗[{isbn13}] 요약 수집 실패: {summary}")
+            summary = ""
+        if isinstance(keywords, Exception):
+            print(f"❗[{isbn13}] 키워드 수집 실패: {keywords}")
+            keywords = []
+        return summary, keywords
+
+    async def fetch_age_group_lists(self, page_size: int = 200) -> list:
+        print(f"📥 연령대 {len(AGE_GROUPS)}개 동시 수집 중...")
+        lists = await asyncio.gather(*(
+            self.fetch_popular_books(from_age=str(from_age), to_age=str(to_age), page_size=page_size)
+            for _, from_age, to_age in AGE_GROUPS
+        ))
+        return [(label, books_raw) for (label, _, _), books_raw in zip(AGE_GROUPS, lists)]
+
+    async def fetch_popular_books_all_ages(self, existing_books: list = None) -> list:
+        """
+        :param existing_books: 기존 books_with_age.json 레코드. 주어지면 같은 ISBN의 레코드를 기반으로
+                               서지 정보는 최신 목록 기준으로 갱신하고, 연령대 라벨은 기존 라벨과 합칩니다.
+                               이번 목록에 들지 않은 기존 레코드는 그대로 뒤에 유지합니다.
+        """
+        selected = select_books_by_age(await self.fetch_age_group_lists())
+        existing = {b["isbn13"]: b for b in existing_books or [] if b.get("isbn13")}
+
+        print(f"📥 도서 {len(selected)}권 상세 정보 동시 수집 중...")
+        details = await asyncio.gather(*(self.fetch_book_details(isbn) for isbn in selected))
+        if self.cache is not None:
+            print(f"♻️ 캐시 재사용 {self.cache.hits}권 / 새로 수집 {self.cache.misses}권")
+
+        books = []
+        for isbn, (doc, labels), (summary, keywords) in zip(selected, selected.values(), details):
+            book_data = {**existing.get(isbn, {}), **build_book_data(doc, labels[0], summary, keywords)}
+            book_data["age"] = merge_age_labels(existing.get(isbn, {}).get("age"), labels)
+            books.append(book_data)
+        books.extend(book for isbn, book in existing.items() if isbn not in selected)
+        return books
@@ -0,0 +1,192 @@
+# services/llm_scheduler.py
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+INTERACTIVE = 0  # /chat 등 사용자가 기다리는 호출
+BULK = 1         # 도서 수집/LightRAG 삽입 등 배치 작업
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+# 현재 코루틴(과 그 안에서 만든 태스크)의 우선순위. 기본은 interactive
+_current_priority = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: int):
+    """with llm_priority(BULK): 안에서 시작한 LLM/임베딩 호출은 모두 bulk로 스케줄링됩니다."""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> int:
+    return _current_priority.get()
+
+
+class CallerPriority:
+    """
+    LightRAG는 llm/임베딩 호출을 자체 워커 태스크 큐(priority_limit_async_func_call)로 넘기는데, 워커 태스크는
+    처음 만든 호출자의 컨텍스트를 복사하므로 ContextVar 우선순위가 호출마다 전달되지 않습니다.
+    큐 앞에서 호출자의 우선순위를 읽어 priority= 인자로 실어 보내면 워커 안에서도 그 값을 씁니다.
+    감싼 함수의 속성(embedding_dim 등)은 그대로 보입니다.
+    """
+
+    def __init__(self, func):
+        self._func = func
+
+    def __getattr__(self, name):
+        if name == "_func":
+            raise AttributeError(name)
+        return getattr(self._func, name)
+
+    def __deepcopy__(self, memo):
+        # LightRAG가 asdict(self)로 설정을 복사할 때 함수처럼 그대로 공유
+        return self
+
+    async def __call__(self, *args, **kwargs):
+        kwargs.setdefault("priority", _current_priority.get())
+        return await self._func(*args, **kwargs)
+
+
+def _env_float(provider: str, name: str, default: float) -> float:
+    return float(os.getenv(f"LLM_SCHED_{provider.upper()}_{name}", default))
+
+
+class ProviderScheduler:
+    """
+    한 LLM 제공자(API 키)에 대한 우선순위 스케줄러.
+    - 토큰 버킷으로 초당 요청 수 제한 (rate <= 0 이면 무제한)
+    - 전체 동시 실행 수 max_in_flight, 그중 bulk가 쓸 수 있는 최대치 bulk_max_in_flight
+    - 대기열은 우선순위 순이라 interactive 요청이 기다리는 동안에는 bulk가 배정되지 않음
+    """
+
+    def __init__(self, name: str, rate: float, burst: float, max_in_flight: int, bulk_max_in_flight: int):
+        self.name = name
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_in_flight = max_in_flight
+        self.bulk_max_in_flight = min(bulk_max_in_flight, max_in_flight)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._waiters = []  # (priority, seq, future, enqueued_at)
+        self._seq = itertools.count()
+        self._timer = None
+        self._in_flight = {INTERACTIVE: 0, BULK: 0}
+        self._granted = {INTERACTIVE: 0, BULK: 0}
+        self._wait_total = {INTERACTIVE: 0.0, BULK: 0.0}
+
+    def _refill(self):
+        if self.rate <= 0:
+            self._tokens = self.burst
+            return
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _has_capacity(self, priority: int) -> bool:
+        if sum(self._in_flight.values()) >= self.max_in_flight:
+            return False
+        return priority == INTERACTIVE or self._in_flight[BULK] < self.bulk_max_in_flight
+
+    def _dispatch(self):
+        while self._waiters:
+            priority, _, future, enqueued_at = self._waiters[0]
+            if future.done():  # 대기 중 취소됨
+                heapq.heappop(self._waiters)
+                continue
+            if not self._has_capacity(priority):
+                return
+            self._refill()
+            if self._tokens < 1:
+                if self._timer is None:
+                    delay = (1 - self._tokens) / self.rate
+                    self._timer = asyncio.get_running_loop().call_later(delay, self._on_timer)
+                return
+            heapq.heappop(self._waiters)
+            self._tokens -= 1
+            self._in_flight[priority] += 1
+            self._granted[priority] += 1
+            self._wait_total[priority] += time.monotonic() - enqueued_at
+            future.set_result(None)
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    async def acquire(self, priority: int):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future, time.monotonic()))
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(priority)  # 배정 직후 취소된 경우 자리 반납
+            raise
+
+    def release(self, priority: int):
+        self._in_flight[priority] -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: int = None):
+        priority = _current_priority.get() if priority is None else priority
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    def stats(self) -> dict:
+        queued = {INTERACTIVE: 0, BULK: 0}
+        for priority, _, future, _ in self._waiters:
+            if not future.done():
+                queued[priority] += 1
+        result = {"tokens": round(self._tokens, 2)}
+        for priority, name in PRIORITY_NAMES.items():
+            granted = self._granted[priority]
+            result[name] = {
+                "queue_depth": queued[priority],
+                "in_flight": self._in_flight[priority],
+                "granted": granted,
+                "avg_wait_ms": round(self._wait_total[priority] / granted * 1000, 1) if granted else 0.0,
+            }
+        return result
+
+
+class LLMScheduler:
+    """제공자 이름별 ProviderScheduler 모음. 설정은 LLM_SCHED_<PROVIDER>_RPS / _BURST / _MAX_IN_FLIGHT / _BULK_MAX_IN_FLIGHT"""
+
+    def __init__(self):
+        self._providers = {}
+
+    def provider(self, name: str) -> ProviderScheduler:
+        scheduler = self._providers.get(name)
+        if scheduler is None:
+            max_in_flight = int(_env_float(name, "MAX_IN_FLIGHT", 16))
+            scheduler = ProviderScheduler(
+                name,
+                rate=_env_float(name, "RPS", 10),
+                burst=_env_float(name, "BURST", 10),
+                max_in_flight=max_in_flight,
+                bulk_max_in_flight=int(_env_float(name, "BULK_MAX_IN_FLIGHT", max(1, max_in_flight // 2))),
+            )
+            self._providers[name] = scheduler
+        return scheduler
+
+    def slot(self, provider: str, priority: int = None):
+        return self.provider(provider).slot(priority)
+
+    def stats(self) -> dict:
+        return {name: scheduler.stats() for name, scheduler in self._providers.items()}
+
+
+llm_scheduler = LLMScheduler()
@@ -0,0 +1,96 @@
+# services/local_keyword_extractor.py
+
+import os
+from sklearn.feature_extraction.text import TfidfVectorizer
+from services.book_catalog import SnapshotCache
+
+LOCAL_KEYWORD_MIN_CONFIDENCE = float(os.getenv("LOCAL_KEYWORD_MIN_CONFIDENCE", "0.5"))
+LOCAL_KEYWORD_MAX = 5
+MIN_TERM_LENGTH = 2  # '책', '나' 같은 한 글자 키워드는 대부분 의미가 약해서 제외
+
+# 접두어 일치 뒤에 남은 부분이 이 조사·어미(또는 둘의 조합)일 때만 키워드로 인정
+# ("사랑니가"의 '니가'는 조사가 아니므로 '사랑'으로 보지 않음)
+KOREAN_PARTICLES = {
+    "은", "는", "이", "가", "을", "를", "에", "의", "도", "로", "으로", "와", "과", "랑", "이랑",
+    "하고", "에서", "에게", "한테", "께", "까지", "부터", "만", "보다", "처럼", "같은", "이나", "나",
+    "요", "이요", "야", "이야", "에요", "이에요", "예요", "이고", "고", "라서", "이라서", "인", "적인",
+}
+
+
+class LocalKeywordExtractor:
+    """
+    카탈로그 keywords 어휘만으로 사용자 발화에서 키워드를 찾는 로컬 추출기.
+    책별 키워드 목록으로 학습한 TF-IDF의 IDF를 가중치로 써서 흔한 키워드보다 변별력 있는 키워드를 우선합니다.
+    한국어 조사가 붙은 어절("왕따를", "학교에서")은 나머지가 조사·어미인 가장 긴 접두어 일치로 찾습니다.
+    """
+
+    def __init__(self, books: list):
+        keyword_docs = [
+            [kw["word"] for kw in book.get("keywords", []) if len(kw["word"]) >= MIN_TERM_LENGTH]
+            for book in books
+        ]
+        keyword_docs = [doc for doc in keyword_docs if doc]
+        self.idf = {}
+        if keyword_docs:
+            vectorizer = TfidfVectorizer(analyzer=lambda doc: doc, lowercase=False)
+            vectorizer.fit(keyword_docs)
+            self.idf = dict(zip(vectorizer.get_feature_names_out(), vectorizer.idf_))
+
+        self.single_terms = {term for term in self.idf if " " not in term}
+        self.phrase_terms = {term for term in self.idf if " " in term}
+        self.max_term_length = max((len(term) for term in self.single_terms), default=0)
+
+    @staticmethod
+    def _is_particle(rest: str) -> bool:
+        if not rest or rest in KOREAN_PARTICLES:
+            return True
+        # "학교에서는", "친구한테도" 처럼 조사 두 개가 이어지는 경우
+        return any(rest[:i] in KOREAN_PARTICLES and rest[i:] in KOREAN_PARTICLES for i in range(1, len(rest)))
+
+    def _match_token(self, token: str):
+        for end in range(min(len(token), self.max_term_length), MIN_TERM_LENGTH - 1, -1):
+            if token[:end] in self.single_terms and self._is_particle(token[end:]):
+                return token[:end]
+        return None
+
+    def _match_phrase(self, token: str, next_token: str):
+        # "사회 문제에" -> "사회 문제" 처럼 두 어절 키워드도 뒤 어절의 조사를 떼고 찾음
+        for end in range(len(next_token), 0, -1):
+            phrase = f"{token} {next_token[:end]}"
+            if phrase in self.phrase_terms and self._is_particle(next_token[end:]):
+                return phrase
+        return None
+
+    def extract(self, message: str):
+        """
+        :return: (키워드 리스트, 신뢰도 0~1). 신뢰도는 어절 중 카탈로그 키워드로 설명된 비율로 계산합니다.
+        """
+        tokens = [token for token in message.split() if len(token) >= MIN_TERM_LENGTH]
+        if not tokens or not self.idf:
+            return [], 0.0
+
+        matches = {}
+        covered = 0
+        for i, token in enumerate(tokens):
+            term = self._match_token(token)
+            if term is not None:
+                matches[term] = self.idf[term]
+                covered += 1
+            if self.phrase_terms and i + 1 < len(tokens):
+                phrase = self._match_phrase(token, tokens[i + 1])
+                if phrase is not None:
+                    matches[phrase] = self.idf[phrase]
+                    covered += term is None
+
+        keywords = sorted(matches, key=matches.get, reverse=True)[:LOCAL_KEYWORD_MAX]
+        # 한국어 발화는 어절의 절반 정도가 용언·부사라서, 그 절반을 설명하면 신뢰도 1로 봄.
+        # 단, 세 어절 이하의 짧은 발화는 한두 번의 일치로 신뢰도가 부풀지 않도록 모든 어절을 기준으로 함
+        return keywords, min(1.0, covered / max(len(tokens) / 2, min(len(tokens), 3)))
+
+
+_extractor = SnapshotCache(lambda snapshot: LocalKeywordExtractor(snapshot.books))
+
+
+def get_local_keyword_extractor() -> LocalKeywordExtractor:
+    """카탈로그 스냅샷이 바뀌면 (파일 갱신) 어휘를 다시 만듭니다."""
+    return _extractor.get()
@@ -0,0 +1,186 @@
+# services/metrics.py
+
+import bisect
+import contextvars
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_PREFIX = os.getenv("METRICS_PREFIX", "bookbot")
+# 초 단위 히스토그램 버킷 (LLM 호출이 수 초 걸리므로 위쪽을 넓게)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# 현재 요청에서 측정한 단계별 소요 시간 [(stage, seconds), ...]. 요청 밖에서는 None
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Histogram:
+    """레이블 조합별 누적 버킷 히스토그램 (Prometheus histogram 형식)"""
+
+    def __init__(self, name: str, help_text: str, label_names: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((labels, list(series)) for labels, series in self._series.items())
+        for labels, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _format_labels(self.label_names, labels, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            label_text = _format_labels(self.label_names, labels)
+            lines.append(f"{self.name}_sum{label_text} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{label_text} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    단계별 소요 시간 히스토그램과 HTTP 요청 히스토그램, 그리고 각 서비스의 stats()를 모아
+    /metrics 에서 Prometheus 텍스트 형식으로 내보냅니다.
+    """
+
+    def __init__(self, prefix: str = METRICS_PREFIX):
+        self.prefix = prefix
+        self.stage_seconds = Histogram(
+            f"{prefix}_stage_duration_seconds", "요청 처리 단계별 소요 시간", ("stage",)
+        )
+        self.request_seconds = Histogram(
+            f"{prefix}_http_request_duration_seconds", "HTTP 요청 처리 시간", ("method", "route", "status")
+        )
+        self._stats_providers = {}  # name -> callable returning dict
+
+    def observe_stage(self, stage: str, seconds: float):
+        self.stage_seconds.observe(seconds, stage)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, seconds))
+
+    @contextmanager
+    def stage(self, stage: str):
+        """with metrics.stage("keyword_extraction"): 블록의 소요 시간을 기록 (async 함수 안에서도 사용 가능)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe_stage(stage, time.perf_counter() - started)
+
+    def register_stats(self, name: str, provider):
+        """provider()가 돌려주는 dict의 숫자 값들을 게이지로 내보냄 (중첩 dict는 이름을 _로 이어 붙임)"""
+        self._stats_providers[name] = provider
+
+    def _render_stats(self) -> list:
+        lines = []
+        for name, provider in sorted(self._stats_providers.items()):
+            try:
+                stats = provider()
+            except Exception as e:
+                print(f"❗metrics: {name} stats 수집 실패:", e)
+                continue
+            for key, value in _flatten(stats):
+                metric = f"{self.prefix}_{name}_{key}"
+                lines.append(f"# TYPE {metric} gauge")
+                lines.append(f"{metric} {float(value)}")
+        return lines
+
+    def render(self) -> str:
+        lines = self.stage_seconds.render() + self.request_seconds.render() + self._render_stats()
+        return "\n".join(lines) + "\n"
+
+
+def _flatten(stats: dict, prefix: str = ""):
+    for key, value in stats.items():
+        # Prometheus 이름에 쓸 수 없는 문자(URL의 :/. 등)는 _로 바꿈
+        name = prefix + re.sub(r"[^0-9a-zA-Z_]+", "_", str(key)).strip("_")
+        if isinstance(value, dict):
+            yield from _flatten(value, name + "_")
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            yield name, value
+        elif isinstance(value, bool):
+            yield name, int(value)
+
+
+metrics = MetricsRegistry()
+
+
+def server_timing_header(timings: list, total: float = None) -> str:
+    """[(stage, seconds)] -> 'keyword_extraction;dur=12.3, rag_local;dur=812.0' (같은 단계는 합산)"""
+    merged = {}
+    for stage, seconds in timings:
+        merged[stage] = merged.get(stage, 0.0) + seconds
+    parts = [f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in merged.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
+
+
+class MetricsMiddleware:
+    """
+    요청마다 단계별 타이머 목록을 만들고, 응답 헤더에 Server-Timing으로 붙이며
+    전체 처리 시간을 라우트별 히스토그램에 기록하는 ASGI 미들웨어.
+    스트리밍 응답은 헤더를 먼저 보내므로 그 이후 단계는 Server-Timing에는 빠지고 히스토그램에만 남습니다.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        timings = []
+        token = _request_timings.set(timings)
+        status = {"code": 500}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                header = server_timing_header(timings, time.perf_counter() - started)
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (b"server-timing", header.encode("latin-1"))
+                ]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            route = scope.get("route")
+            # 라우트가 없으면(404 등) 경로 대신 고정 레이블을 써서 시계열 수가 늘어나지 않도록
+            route_path = getattr(route, "path", None) or "unmatched"
+            self.registry.request_seconds.observe(
+                time.perf_counter() - started, scope["method"], route_path, str(status["code"])
+            )
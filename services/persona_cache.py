@@ -0,0 +1,163 @@
+# services/persona_cache.py
+
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from services.book_catalog import get_catalog
+from services.facet_index import get_facet_index
+from services.library_fetcher import AGE_GROUPS
+from services.recommendation_engine import get_recommendation_engine
+
+PERSONA_CACHE_MAX_ENTRIES = int(os.getenv("PERSONA_CACHE_MAX_ENTRIES", "5000"))
+PERSONA_BATCH_CONCURRENCY = int(os.getenv("PERSONA_BATCH_CONCURRENCY", "4"))
+PERSONA_DEFAULT_K = 3
+
+# 파트너 연동용 기본 페르소나: 수집 연령대별 기본 추천 + 자주 쓰는 키워드 프로필
+KEYWORD_PROFILES = [
+    ["친구", "우정", "학교"],
+    ["가족", "사랑"],
+    ["성장", "꿈", "진로"],
+    ["모험", "판타지"],
+    ["과학", "우주"],
+    ["역사", "전쟁"],
+    ["마음", "위로", "힐링"],
+    ["경제", "돈"],
+]
+DEFAULT_PERSONAS = (
+    [{"keywords": [], "age": [label]} for label, _, _ in AGE_GROUPS]
+    + [{"keywords": keywords, "age": []} for keywords in KEYWORD_PROFILES]
+    + [{"keywords": keywords, "age": [label]} for label, _, _ in AGE_GROUPS for keywords in KEYWORD_PROFILES]
+)
+
+
+def profile_key(keywords: list, age: list = (), class_nm: list = (), k: int = PERSONA_DEFAULT_K) -> tuple:
+    """순서·중복과 무관하게 같은 프로필이면 같은 키"""
+    return (
+        tuple(sorted({kw.strip() for kw in keywords if kw and kw.strip()})),
+        tuple(sorted(set(age))),
+        tuple(sorted(set(class_nm))),
+        k,
+    )
+
+
+def recommend_for_profile(keywords: list, age: list = (), class_nm: list = (), k: int = PERSONA_DEFAULT_K,
+                          snapshot=None) -> list:
+    """
+    LLM 호출 없이 로컬 엔진과 facet 색인으로 프로필 추천을 계산합니다.
+    키워드가 없으면 facet 안에서 카탈로그에 저장된 순서대로 고릅니다 (연령대별 대출 순위는 따로 저장하지 않으므로
+    연령대 안의 인기 순서까지 보장하지는 않음).
+    :param snapshot: 계산에 쓸 카탈로그 스냅샷. 도서 목록·facet 색인·엔진을 모두 이 스냅샷 기준으로 맞춤 (기본값은 최신)
+    :return: [(책, 점수), ...]
+    """
+    if snapshot is None:
+        snapshot = get_catalog().snapshot()
+    books = snapshot.books
+    rows = get_facet_index(snapshot).rows(age=list(age), class_nm=list(class_nm))
+    if keywords:
+        recommended = get_recommendation_engine(snapshot).recommend(list(keywords), k=k, rows=rows)
+        return [(book, score) for book, score in recommended if book.get("title")]
+
+    candidates = range(len(books)) if rows is None else rows
+    results, seen = [], set()
+    for row in candidates:
+        book = books[int(row)]
+        title = book.get("title")
+        if not title or title in seen:
+            continue
+        seen.add(title)
+        results.append((book, 0.0))
+        if len(results) == k:
+            break
+    return results
+
+
+class PersonaCache:
+    """
+    프로필 -> 추천 결과 메모리 캐시. 카탈로그 스냅샷이 바뀌면(도서 데이터 갱신) 통째로 비우고,
+    precompute()로 기본 페르소나를 미리 채워 두면 자주 쓰는 프로필은 바로 응답합니다.
+    """
+
+    def __init__(self, max_entries: int = PERSONA_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _check_snapshot(self):
+        snapshot = get_catalog().snapshot()
+        if self._snapshot is not snapshot:
+            if self._snapshot is not None:
+                self.invalidations += 1
+            self._entries.clear()
+            self._snapshot = snapshot
+
+    def get(self, key: tuple):
+        with self._lock:
+            self._check_snapshot()
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, key: tuple, result: list, snapshot=None):
+        """:param snapshot: 계산에 쓴 카탈로그 스냅샷. 그사이 카탈로그가 바뀌었으면 저장하지 않음"""
+        with self._lock:
+            self._check_snapshot()
+            if snapshot is not None and snapshot is not self._snapshot:
+                return
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def recommend(self, keywords: list, age: list = (), class_nm: list = (), k: int = PERSONA_DEFAULT_K):
+        """:return: (추천 결과, 캐시 적중 여부)"""
+        key = profile_key(keywords, age, class_nm, k)
+        cached = self.get(key)
+        if cached is not None:
+            return cached, True
+        snapshot = get_catalog().snapshot()
+        result = recommend_for_profile(*key, snapshot=snapshot)
+        self.put(key, result, snapshot)
+        return result, False
+
+    async def recommend_many(self, profiles: list, concurrency: int = PERSONA_BATCH_CONCURRENCY) -> list:
+        """여러 프로필을 스레드 풀에서 동시에 계산 (numpy 행렬곱은 GIL을 풀어서 병렬로 돌아감)"""
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(profile: dict):
+            async with semaphore:
+                return await asyncio.to_thread(
+                    self.recommend, profile.get("keywords", []), profile.get("age", []),
+                    profile.get("class_nm", []), profile.get("k", PERSONA_DEFAULT_K),
+                )
+
+        return await asyncio.gather(*(run(profile) for profile in profiles))
+
+    def precompute(self, profiles: list = DEFAULT_PERSONAS) -> int:
+        """기본 페르소나 결과를 미리 채움. 이미 있는 프로필은 건너뜀"""
+        computed = 0
+        for profile in profiles:
+            _, hit = self.recommend(profile.get("keywords", []), profile.get("age", []),
+                                    profile.get("class_nm", []), profile.get("k", PERSONA_DEFAULT_K))
+            computed += not hit
+        print(f"🧑‍🤝‍🧑 기본 페르소나 추천 {computed}건 계산 (총 {len(profiles)}건)")
+        return computed
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+persona_cache = PersonaCache()
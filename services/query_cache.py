@@ -0,0 +1,191 @@
+# services/query_cache.py
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+import numpy as np
+from services.keyword_cache import normalize_message
+
+QUERY_CACHE_MAX_ENTRIES = int(os.getenv("QUERY_CACHE_MAX_ENTRIES", "2000"))
+QUERY_CACHE_TTL_SECONDS = int(os.getenv("QUERY_CACHE_TTL_SECONDS", str(6 * 3600)))
+# 0보다 크면 임베딩 코사인 유사도가 이 값 이상인 이전 질의의 응답도 재사용 (예: 0.97)
+QUERY_CACHE_SIMILARITY = float(os.getenv("QUERY_CACHE_SIMILARITY", "0"))
+
+
+class _BucketVectors:
+    """
+    한 버킷의 질의 임베딩 행렬. 미리 잡아 둔 행렬에 행을 채우고 지울 때는 마지막 행으로 메워서,
+    조회할 때마다 벡터를 다시 쌓지 않고 matrix[:size] @ vector 한 번으로 끝냅니다.
+    """
+
+    def __init__(self, dim: int, capacity: int = 64):
+        self.matrix = np.zeros((capacity, dim), dtype=np.float32)
+        self.stored_at = np.zeros(capacity, dtype=np.float64)
+        self.keys = []
+        self.rows = {}  # key -> 행 번호
+
+    def put(self, key: str, vector: np.ndarray, stored_at: float):
+        row = self.rows.get(key)
+        if row is None:
+            row = len(self.keys)
+            if row == len(self.matrix):
+                self.matrix = np.resize(self.matrix, (row * 2, self.matrix.shape[1]))
+                self.stored_at = np.resize(self.stored_at, row * 2)
+            self.keys.append(key)
+            self.rows[key] = row
+        self.matrix[row] = vector
+        self.stored_at[row] = stored_at
+
+    def remove(self, key: str):
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        last = len(self.keys) - 1
+        if row != last:
+            moved = self.keys[last]
+            self.keys[row] = moved
+            self.rows[moved] = row
+            self.matrix[row] = self.matrix[last]
+            self.stored_at[row] = self.stored_at[last]
+        self.keys.pop()
+
+    def best(self, vector: np.ndarray, oldest: float):
+        """:return: (키, 유사도) 또는 None. oldest보다 먼저 저장된(TTL이 지난) 행은 제외"""
+        size = len(self.keys)
+        if not size:
+            return None
+        similarities = self.matrix[:size] @ vector
+        similarities[self.stored_at[:size] < oldest] = -np.inf
+        best = int(np.argmax(similarities))
+        if not np.isfinite(similarities[best]):
+            return None
+        return self.keys[best], float(similarities[best])
+
+
+class QueryCache:
+    """
+    rag.aquery 응답 캐시.
+    1) (모드, 프롬프트 키, 정규화된 질의) 완전 일치
+    2) 선택: 같은 (모드, 프롬프트 키) 안에서 질의 임베딩 유사도가 임계값 이상인 항목
+    프롬프트 키는 렌더링된 시스템 프롬프트 대신 호출자가 정하는 템플릿 이름/버전(+ 프롬프트에 넣은 값)입니다.
+    항목 수는 max_entries로 제한하고 LRU로 제거하며, 적중할 때마다 TTL을 확인합니다.
+    """
+
+    def __init__(self, max_entries: int = QUERY_CACHE_MAX_ENTRIES, ttl_seconds: int = QUERY_CACHE_TTL_SECONDS,
+                 similarity_threshold: float = QUERY_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._entries = OrderedDict()  # key -> (저장 시각, 응답, 버킷, 임베딩 or None)
+        self._vectors = {}  # 버킷 -> _BucketVectors
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _bucket(mode: str, prompt_key: str) -> str:
+        return hashlib.sha1(f"{mode}\0{prompt_key or ''}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _key(bucket: str, normalized_query: str) -> str:
+        return hashlib.sha1(f"{bucket}\0{normalized_query}".encode("utf-8")).hexdigest()
+
+    def _evict(self, now: float):
+        while self._entries:
+            key, entry = next(iter(self._entries.items()))
+            if len(self._entries) > self.max_entries or now - entry[0] > self.ttl_seconds:
+                self._remove(key)
+            else:
+                break
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key)
+        vectors = self._vectors.get(entry[2])
+        if vectors is not None:
+            vectors.remove(key)
+            if not vectors.keys:
+                del self._vectors[entry[2]]
+
+    def _semantic_lookup(self, bucket: str, vector: np.ndarray, now: float):
+        vectors = self._vectors.get(bucket)
+        best = vectors.best(vector, now - self.ttl_seconds) if vectors is not None else None
+        if best is None or best[1] < self.similarity_threshold:
+            return None
+        self._entries.move_to_end(best[0])
+        return self._entries[best[0]][1]
+
+    async def aquery(self, rag, query: str, param, system_prompt: str = None, embed=None, prompt_key: str = None):
+        """
+        rag.aquery와 같은 인자를 받습니다. param.stream=True여도 적중하면 완성된 문자열을 반환하고,
+        적중하지 않으면 스트림을 그대로 넘기면서 끝까지 받은 응답을 저장합니다.
+        :param embed: 유사 질의 조회에 쓸 async 임베딩 함수 (texts -> ndarray). 없으면 rag.embedding_func
+        :param prompt_key: 시스템 프롬프트 템플릿 이름/버전 (예: "interview-v1"). 없으면 시스템 프롬프트 전체로 구분
+        """
+        now = time.time()
+        self._evict(now)
+        bucket = self._bucket(param.mode, system_prompt if prompt_key is None else prompt_key)
+        normalized = normalize_message(query)
+        key = self._key(bucket, normalized)
+
+        entry = self._entries.get(key)
+        if entry is not None and now - entry[0] > self.ttl_seconds:
+            # LRU 순서상 앞쪽만 정리하므로 자주 적중해 뒤로 밀린 항목은 여기서 만료
+            self._remove(key)
+            entry = None
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return entry[1]
+
+        vector = None
+        if self.similarity_threshold > 0:
+            embed = embed or rag.embedding_func
+            vector = np.asarray((await embed([normalized]))[0], dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            vector = vector / norm if norm else vector
+            response = self._semantic_lookup(bucket, vector, now)
+            if response is not None:
+                self.semantic_hits += 1
+                self._store(key, response, bucket, vector)  # 다음엔 완전 일치로 바로 찾도록
+                return response
+
+        self.misses += 1
+        response = await rag.aquery(query, param=param, system_prompt=system_prompt)
+        if isinstance(response, str):
+            self._store(key, response, bucket, vector)
+            return response
+        return self._tee_stream(response, key, bucket, vector)
+
+    async def _tee_stream(self, stream, key: str, bucket: str, vector):
+        parts = []
+        async for chunk in stream:
+            parts.append(chunk)
+            yield chunk
+        self._store(key, "".join(parts), bucket, vector)
+
+    def _store(self, key: str, response: str, bucket: str, vector):
+        if not response or not response.strip():
+            return
+        now = time.time()
+        self._entries[key] = (now, response, bucket, vector)
+        self._entries.move_to_end(key)
+        if vector is not None:
+            vectors = self._vectors.get(bucket)
+            if vectors is None:
+                vectors = self._vectors[bucket] = _BucketVectors(len(vector))
+            vectors.put(key, vector, now)
+        self._evict(now)
+
+    def stats(self) -> dict:
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.semantic_hits) / lookups, 3) if lookups else 0.0,
+        }
+
+
+query_cache = QueryCache()
@@ -0,0 +1,137 @@
+# services/recommendation_engine.py
+
+import os
+from collections import defaultdict
+import numpy as np
+from scipy.sparse import csr_matrix
+from sklearn.preprocessing import normalize
+from services.book_catalog import SnapshotCache
+
+# rag: 기존 LightRAG + LLM 추천, local: 키워드 행렬만으로 추천 (LLM 호출 없음),
+# hybrid: 로컬 상위 후보를 RAG 프롬프트에 넣어 그 안에서 고르게 함
+RECOMMEND_MODE = os.getenv("RECOMMEND_MODE", "rag")
+HYBRID_CANDIDATES = int(os.getenv("RECOMMEND_HYBRID_CANDIDATES", "20"))
+
+
+class RecommendationEngine:
+    """
+    카탈로그의 keywords/weight로 만든 (책 x 키워드) 희소 행렬에 대해
+    세션 키워드 벡터와의 코사인 유사도 top-k를 한 번의 행렬곱으로 계산합니다.
+    """
+
+    def __init__(self, books: list):
+        self.books = books
+        if hasattr(books, "keyword_csr"):
+            matrix = self._matrix_from_columnar(books)
+        else:
+            self.vocab = {}
+            rows, cols, values = [], [], []
+            for row, book in enumerate(books):
+                for kw in book.get("keywords", []):
+                    col = self.vocab.setdefault(kw["word"], len(self.vocab))
+                    rows.append(row)
+                    cols.append(col)
+                    # data4library 가중치는 편차가 커서 로그 스케일로 완화
+                    values.append(np.log1p(max(float(kw["weight"]), 0.0)))
+
+            matrix = csr_matrix(
+                (np.asarray(values, dtype=np.float32), (rows, cols)),
+                shape=(len(books), len(self.vocab)), dtype=np.float32
+            )
+        matrix.sum_duplicates()
+        self.matrix = normalize(matrix, norm="l2", axis=1, copy=False)
+        self._build_partial_index()
+
+    def _build_partial_index(self):
+        """어휘의 문자 bigram -> 열 번호 배열. 부분 일치 후보를 어휘 전체를 훑지 않고 찾는 데 씀"""
+        postings = defaultdict(list)
+        for word, col in self.vocab.items():
+            for gram in {word[i:i + 2] for i in range(len(word) - 1)}:
+                postings[gram].append(col)
+        self._words = [None] * len(self.vocab)
+        for word, col in self.vocab.items():
+            self._words[col] = word
+        self._postings = {gram: np.asarray(sorted(cols), dtype=np.int32) for gram, cols in postings.items()}
+
+    def _partial_matches(self, keyword: str) -> list:
+        """keyword를 포함하는 어휘의 열 번호 (keyword의 모든 bigram을 가진 어휘만 실제로 확인)"""
+        grams = {keyword[i:i + 2] for i in range(len(keyword) - 1)}
+        lists = [self._postings.get(gram) for gram in grams]
+        if not lists or any(cols is None for cols in lists):
+            return []
+        lists.sort(key=len)
+        candidates = lists[0]
+        for cols in lists[1:]:
+            candidates = np.intersect1d(candidates, cols, assume_unique=True)
+            if not len(candidates):
+                return []
+        return [int(col) for col in candidates if keyword in self._words[col]]
+
+    def _matrix_from_columnar(self, catalog) -> csr_matrix:
+        """컬럼 카탈로그의 키워드 CSR 배열로 dict 순회 없이 행렬을 만듦"""
+        offsets, string_ids, weights = catalog.keyword_csr()
+        vocab_ids, cols = np.unique(string_ids, return_inverse=True)
+        self.vocab = {catalog.string(int(sid)): col for col, sid in enumerate(vocab_ids)}
+        values = np.log1p(np.maximum(weights, 0.0)).astype(np.float32)
+        return csr_matrix(
+            (values, cols.astype(np.int32), np.asarray(offsets, dtype=np.int64)),
+            shape=(len(catalog), len(vocab_ids)), dtype=np.float32
+        )
+
+    def _query_vector(self, keywords: list) -> np.ndarray:
+        query = np.zeros(len(self.vocab), dtype=np.float32)
+        for keyword in keywords:
+            col = self.vocab.get(keyword)
+            if col is not None:
+                query[col] = 1.0
+            else:
+                # 카탈로그에 정확히 없는 키워드는 그 키워드를 포함하는 어휘에 약하게 반영
+                if len(keyword) >= 2:
+                    for col in self._partial_matches(keyword):
+                        query[col] = max(query[col], 0.5)
+        norm = np.linalg.norm(query)
+        return query / norm if norm else query
+
+    def score(self, keywords: list, rows=None) -> np.ndarray:
+        """각 책(또는 rows로 지정한 후보 행)의 코사인 유사도"""
+        query = self._query_vector(keywords)
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        return matrix @ query
+
+    def recommend(self, keywords: list, k: int = 3, rows=None, exclude_titles=()) -> list:
+        """
+        :param rows: 후보 행 번호 배열 (None이면 전체 카탈로그)
+        :return: [(책 dict, 점수), ...] 점수 내림차순, 점수 0인 책 제외
+        """
+        if not keywords or not self.books:
+            return []
+        scores = self.score(keywords, rows)
+        row_ids = np.arange(len(self.books)) if rows is None else np.asarray(rows)
+
+        # 제목이 중복된 책이 있을 수 있어 여유 있게 뽑은 뒤 정렬
+        take = min(len(scores), k * 2 + len(exclude_titles))
+        if take == 0:
+            return []
+        top = np.argpartition(-scores, take - 1)[:take]
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        results, seen = [], set(exclude_titles)
+        for idx in top:
+            if scores[idx] <= 0:
+                break
+            book = self.books[row_ids[idx]]
+            if book.get("title") in seen:
+                continue
+            seen.add(book.get("title"))
+            results.append((book, float(scores[idx])))
+            if len(results) == k:
+                break
+        return results
+
+
+_engine = SnapshotCache(lambda snapshot: RecommendationEngine(snapshot.books))
+
+
+def get_recommendation_engine(snapshot=None) -> RecommendationEngine:
+    """카탈로그 스냅샷이 바뀌면 (파일 갱신) 행렬을 다시 만듭니다."""
+    return _engine.get(snapshot)
@@ -1,10 +1,391 @@
 # services/session_store.py
 
-from collections import defaultdict
-
-user_sessions = defaultdict(lambda: {
-    "messages": [],              # 사용자 메시지 기록
-    "keywords": [],              # 추출된 키워드
-    "can_recommend": False,      # 추천 가능 여부
-    "recommended_titles": []     # 추천된 책 제목 저장
-})
\ No newline at end of file
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")  # memory | sqlite
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+SESSION_MAX_SESSIONS = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+SESSION_IDLE_TTL_SECONDS = int(os.getenv("SESSION_IDLE_TTL_SECONDS", str(24 * 3600)))
+SESSION_MAX_MESSAGES = int(os.getenv("SESSION_MAX_MESSAGES", "40"))
+
+
+class Session:
+    """
+    한 사용자의 대화 상태. 기존 코드와 같이 session["messages"] 처럼 dict 방식으로도 접근할 수 있습니다.
+    정해진 필드 외의 값은 extra에 보관합니다.
+    """
+
+    __slots__ = (
+        "user_id", "name",
+        "messages",            # 사용자 메시지 기록 (최근 SESSION_MAX_MESSAGES개만 유지)
+        "keywords",            # 추출된 키워드
+        "can_recommend",       # 추천 가능 여부
+        "recommended_titles",  # 추천된 책 제목 저장
+        "user_type", "user_type_reason",
+        "summary",             # 최근 창 밖으로 밀려난 대화의 누적 요약
+        "summarized_count",    # messages 앞쪽에서 summary에 이미 반영된 메시지 수
+        "trimmed_count",       # trim()으로 지금까지 잘라낸 메시지 수 (요약 기준점 보정용)
+        "extra", "last_access",
+    )
+
+    def __init__(self, user_id: str, name: str = None):
+        self.user_id = user_id
+        self.name = name
+        self.messages = []
+        self.keywords = []
+        self.can_recommend = False
+        self.recommended_titles = []
+        self.user_type = None
+        self.user_type_reason = None
+        self.summary = ""
+        self.summarized_count = 0
+        self.trimmed_count = 0
+        self.extra = {}
+        self.last_access = time.time()
+
+    def __getitem__(self, key):
+        if key in Session.__slots__:
+            return getattr(self, key)
+        return self.extra[key]
+
+    def __setitem__(self, key, value):
+        if key in Session.__slots__:
+            setattr(self, key, value)
+        else:
+            self.extra[key] = value
+
+    def __contains__(self, key):
+        return (key in Session.__slots__ and getattr(self, key) is not None) or key in self.extra
+
+    def get(self, key, default=None):
+        value = self[key] if key in self else None
+        return default if value is None else value
+
+    def trim(self, max_messages: int = SESSION_MAX_MESSAGES):
+        """
+        오래된 메시지부터 max_messages개가 남을 때까지 잘라내되, 아직 요약에 반영되지 않은 메시지는 남깁니다.
+        요약이 계속 실패해도 무한히 늘지 않도록 max_messages의 2배를 넘으면 요약 여부와 관계없이 자릅니다.
+        """
+        excess = len(self.messages) - max_messages
+        if excess <= 0:
+            return
+        dropped = max(min(excess, self.summarized_count), len(self.messages) - max_messages * 2)
+        if dropped <= 0:
+            return
+        del self.messages[:dropped]
+        self.summarized_count = max(0, self.summarized_count - dropped)
+        self.trimmed_count += dropped
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in Session.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Session":
+        session = cls(data["user_id"], data.get("name"))
+        for field in Session.__slots__:
+            if field in data:
+                setattr(session, field, data[field])
+        return session
+
+
+class MemorySessionBackend:
+    """프로세스 내 LRU 저장소. 최대 세션 수를 넘거나 idle TTL이 지나면 오래된 세션부터 제거합니다."""
+
+    blocking = False  # 파일 I/O가 없으므로 이벤트 루프에서 바로 호출
+
+    def __init__(self, max_sessions: int = SESSION_MAX_SESSIONS, idle_ttl: int = SESSION_IDLE_TTL_SECONDS):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self, now: float):
+        while self._sessions:
+            user_id, session = next(iter(self._sessions.items()))
+            if len(self._sessions) > self.max_sessions or now - session.last_access > self.idle_ttl:
+                del self._sessions[user_id]
+            else:
+                break
+
+    def load(self, user_id: str):
+        now = time.time()
+        with self._lock:
+            self._evict(now)
+            session = self._sessions.get(user_id)
+            if session is not None:
+                session.last_access = now
+                self._sessions.move_to_end(user_id)
+            return session
+
+    def save(self, session: Session):
+        session.trim()
+        session.last_access = time.time()
+        with self._lock:
+            self._sessions[session.user_id] = session
+            self._sessions.move_to_end(session.user_id)
+            self._evict(session.last_access)
+
+    def delete(self, user_id: str):
+        with self._lock:
+            self._sessions.pop(user_id, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+def _encode_fields(data: dict) -> dict:
+    """필드별 JSON 문자열 (변경 여부 비교용)"""
+    return {field: json.dumps(data[field], ensure_ascii=False, sort_keys=True) for field in data}
+
+
+def _merge_messages(base: list, local: list, stored: list):
+    """
+    마지막 동기화 시점(base) 이후 이 객체에 덧붙인 메시지만 DB의 최신 목록(stored) 뒤에 이어 붙입니다.
+    local이 base의 앞쪽 일부를 잘라낸 뒤 덧붙인 형태가 아니면(목록을 새로 쓴 경우) None을 돌려줍니다.
+    """
+    for dropped in range(len(base) + 1):
+        kept = len(base) - dropped
+        if kept == 0 and base:
+            break
+        if local[:kept] == base[dropped:]:
+            return stored + local[kept:]
+    return None
+
+
+class SQLiteSessionBackend:
+    """
+    로컬 SQLite 파일 저장소. 여러 uvicorn 워커가 같은 파일을 열어 세션을 공유합니다.
+    WAL 모드로 읽기와 쓰기가 서로 막지 않으며, 저장할 때 idle TTL/최대 개수 기준으로 오래된 세션을 정리합니다.
+    변경 사항은 save()를 호출해야 다른 워커에 보입니다.
+
+    같은 사용자는 프로세스 안에서 항상 같은 Session 객체를 돌려주고(load 때 다른 워커의 변경을 반영),
+    save()는 마지막으로 읽거나 쓴 뒤 이 객체에서 바뀐 필드만 DB의 최신 값 위에 덮어씁니다.
+    그래서 백그라운드 요약 저장과 채팅 턴 저장이 엇갈려도 서로의 필드를 되돌리지 않습니다.
+    messages는 양쪽 워커가 모두 덧붙였으면 이 객체가 덧붙인 메시지만 DB의 최신 목록 뒤에 이어 붙입니다.
+    """
+
+    blocking = True  # 비동기 경로에서는 SessionStore.aget/asave로 스레드에서 호출
+
+    def __init__(self, path: str = SESSION_DB_PATH, max_sessions: int = SESSION_MAX_SESSIONS,
+                 idle_ttl: int = SESSION_IDLE_TTL_SECONDS):
+        self.path = path
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # user_id -> (Session, 마지막으로 DB와 맞춘 필드별 JSON)
+        self._saves = 0
+        db = self._db()
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions (user_id TEXT PRIMARY KEY, data TEXT NOT NULL, last_access REAL NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access)")
+        db.commit()
+
+    def _db(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5.0)
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    @staticmethod
+    def _pull(session: Session, base: dict, stored: dict):
+        """DB에서 바뀌었고 이 객체에서는 안 바뀐 필드를 객체에 반영"""
+        current = _encode_fields(session.to_dict())
+        for field, encoded in _encode_fields(stored).items():
+            if field in current and encoded != base.get(field) and current[field] == base.get(field):
+                setattr(session, field, stored[field])
+                base[field] = encoded
+
+    def _remember(self, session: Session):
+        self._cache[session.user_id] = (session, _encode_fields(session.to_dict()))
+        self._cache.move_to_end(session.user_id)
+        while len(self._cache) > self.max_sessions:
+            self._cache.popitem(last=False)
+
+    def load(self, user_id: str):
+        with self._lock:
+            row = self._db().execute(
+                "SELECT data, last_access FROM sessions WHERE user_id = ?", (user_id,)
+            ).fetchone()
+            if row is None or time.time() - row[1] > self.idle_ttl:
+                self._cache.pop(user_id, None)
+                return None
+            stored = json.loads(row[0])
+            cached = self._cache.get(user_id)
+            if cached is None:
+                session = Session.from_dict(stored)
+                self._remember(session)
+                return session
+            session, base = cached
+            self._pull(session, base, stored)
+            self._cache.move_to_end(user_id)
+            return session
+
+    @staticmethod
+    def _merge_appended_messages(session: Session, base: dict, stored: dict):
+        """다른 워커도 같은 세션에 메시지를 덧붙였으면 양쪽 메시지를 모두 남김 (마지막 저장이 덮어쓰지 않도록)"""
+        if "messages" not in base or "messages" not in stored:
+            return
+        stored_encoded = _encode_fields({"messages": stored["messages"]})["messages"]
+        if stored_encoded == base["messages"]:
+            return
+        if _encode_fields({"messages": session.messages})["messages"] == base["messages"]:
+            return  # 이 객체는 안 바뀌었으므로 _pull이 DB 값을 가져옴
+        merged = _merge_messages(json.loads(base["messages"]), session.messages, stored["messages"])
+        if merged is not None:
+            session.messages = merged
+
+    def save(self, session: Session):
+        # trim()은 다른 워커가 덧붙인 메시지를 합친 뒤 트랜잭션 안에서 함
+        session.last_access = time.time()
+        with self._lock:
+            cached = self._cache.get(session.user_id)
+            # 캐시에 없는 객체(새로 만든 세션)는 모든 필드를 저장
+            base = cached[1] if cached is not None and cached[0] is session else {}
+            db = self._db()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute("SELECT data FROM sessions WHERE user_id = ?", (session.user_id,)).fetchone()
+                stored = json.loads(row[0]) if row is not None else {}
+                self._merge_appended_messages(session, base, stored)
+                self._pull(session, base, stored)
+                session.trim()
+                current = session.to_dict()
+                merged = {**stored, **{
+                    field: value for field, value in current.items()
+                    if _encode_fields({field: value})[field] != base.get(field)
+                }}
+                db.execute(
+                    "INSERT OR REPLACE INTO sessions (user_id, data, last_access) VALUES (?, ?, ?)",
+                    (session.user_id, json.dumps(merged, ensure_ascii=False), session.last_access)
+                )
+                self._saves += 1
+                if self._saves % 100 == 0:
+                    self._evict(db, session.last_access)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            self._remember(session)
+
+    def _evict(self, db: sqlite3.Connection, now: float):
+        db.execute("DELETE FROM sessions WHERE last_access < ?", (now - self.idle_ttl,))
+        db.execute(
+            "DELETE FROM sessions WHERE user_id IN ("
+            "SELECT user_id FROM sessions ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+            (self.max_sessions,)
+        )
+
+    def delete(self, user_id: str):
+        with self._lock:
+            self._cache.pop(user_id, None)
+            db = self._db()
+            db.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+            db.commit()
+
+    def __len__(self):
+        return self._db().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def create_session_backend(kind: str = SESSION_BACKEND):
+    if kind == "sqlite":
+        return SQLiteSessionBackend()
+    return MemorySessionBackend()
+
+
+class SessionStore:
+    """
+    기존 user_sessions[user_id] 사용법을 유지하는 세션 저장소.
+    없는(또는 만료로 정리된) 사용자를 조회하면 KeyError를 냅니다. 새 세션은 get_or_create()나 register_user()로 만듭니다.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else create_session_backend()
+
+    def __getitem__(self, user_id: str) -> Session:
+        session = self.backend.load(user_id)
+        if session is None:
+            raise KeyError(user_id)
+        return session
+
+    def get(self, user_id: str, default=None):
+        session = self.backend.load(user_id)
+        return default if session is None else session
+
+    def get_or_create(self, user_id: str, name: str = None) -> Session:
+        session = self.backend.load(user_id)
+        if session is None:
+            session = Session(user_id, name)
+            self.backend.save(session)
+        return session
+
+    def __setitem__(self, user_id: str, session: Session):
+        session.user_id = user_id
+        self.backend.save(session)
+
+    def __contains__(self, user_id: str) -> bool:
+        return self.backend.load(user_id) is not None
+
+    def __delitem__(self, user_id: str):
+        self.backend.delete(user_id)
+
+    def __len__(self):
+        return len(self.backend)
+
+    def save(self, session: Session):
+        self.backend.save(session)
+
+    async def _call(self, func, *args):
+        # SQLite처럼 파일 I/O가 있는 백엔드는 이벤트 루프를 막지 않도록 스레드에서 실행
+        if getattr(self.backend, "blocking", False):
+            return await asyncio.to_thread(func, *args)
+        return func(*args)
+
+    async def aget(self, user_id: str, default=None):
+        return await self._call(self.get, user_id, default)
+
+    async def asave(self, session: Session):
+        await self._call(self.save, session)
+
+
+user_sessions = SessionStore()
+
+
+def register_user(user_id: str, name: str) -> Session:
+    session = Session(user_id, name)
+    user_sessions.save(session)
+    return session
+
+
+def save_session(session: Session):
+    user_sessions.save(session)
+
+
+async def save_session_async(session: Session):
+    await user_sessions.asave(session)
+
+
+def user_exists(user_id: str) -> bool:
+    return user_id in user_sessions
+
+
+def get_user_name(user_id: str) -> str:
+    session = user_sessions.get(user_id)
+    return (session.name if session is not None else None) or "사용자"
+
+
+def get_user_type(user_id: str):
+    session = user_sessions.get(user_id)
+    if session is None:
+        return None, None
+    return session.user_type, session.user_type_reason
@@ -0,0 +1,102 @@
+# services/title_index.py
+
+import os
+import re
+import unicodedata
+from collections import defaultdict
+import numpy as np
+from services.book_catalog import SnapshotCache
+
+TITLE_MATCH_MIN_SCORE = float(os.getenv("TITLE_MATCH_MIN_SCORE", "0.5"))
+# 후보가 카탈로그 제목 안에 통째로 들어 있으면(부제 생략 등) 최소 이 점수로 인정
+TITLE_SUBSTRING_SCORE = 0.9
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+_NUMBER = re.compile(r"\d+")
+
+
+def normalize_title(title: str) -> str:
+    """비교용 제목: 전각/반각 통일, 소문자, 공백·문장부호 제거"""
+    return _NON_WORD.sub("", unicodedata.normalize("NFKC", title or "").lower())
+
+
+def title_grams(normalized: str) -> set:
+    """앞뒤 경계 표시를 붙인 문자 bigram 집합 ('^흔한', ... '매$'). 한 글자 제목도 gram이 2개 생김"""
+    padded = f"^{normalized}$"
+    return {padded[i:i + 2] for i in range(len(padded) - 1)}
+
+
+class TitleIndex:
+    """
+    카탈로그 제목의 문자 bigram 역색인.
+    LLM이 돌려준 제목과 bigram을 하나 이상 공유하는 제목만 후보로 모아 Dice 계수로 순위를 매기므로,
+    전체 제목을 훑지 않고도 띄어쓰기·맞춤법이 조금 다른 제목을 카탈로그의 정식 제목으로 바꿀 수 있습니다.
+    """
+
+    def __init__(self, titles):
+        self.titles = []       # 정규화 제목이 같은 책은 카탈로그에서 처음 나온 제목 하나만 보관
+        self.normalized = []
+        self.gram_counts = []
+        by_normalized = {}
+        postings = defaultdict(list)
+        for title in titles:
+            normalized = normalize_title(title)
+            if not normalized or normalized in by_normalized:
+                continue
+            title_id = by_normalized[normalized] = len(self.titles)
+            grams = title_grams(normalized)
+            self.titles.append(title)
+            self.normalized.append(normalized)
+            self.gram_counts.append(len(grams))
+            for gram in grams:
+                postings[gram].append(title_id)
+        self._by_normalized = by_normalized
+        self._postings = {gram: np.asarray(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._gram_counts = np.asarray(self.gram_counts, dtype=np.float32)
+
+    def match(self, query: str, k: int = 3, min_score: float = TITLE_MATCH_MIN_SCORE) -> list:
+        """:return: [(카탈로그 제목, 유사도 0~1), ...] 유사도 내림차순"""
+        normalized = normalize_title(query)
+        if not normalized:
+            return []
+        exact = self._by_normalized.get(normalized)
+        if exact is not None:
+            return [(self.titles[exact], 1.0)]
+
+        grams = title_grams(normalized)
+        numbers = _NUMBER.findall(normalized)
+        lists = [self._postings[gram] for gram in grams if gram in self._postings]
+        if not lists:
+            return []
+        candidates, shared = np.unique(np.concatenate(lists), return_counts=True)
+        scores = 2.0 * shared / (len(grams) + self._gram_counts[candidates])
+
+        results = []
+        for title_id, score in zip(candidates.tolist(), scores.tolist()):
+            # 시리즈 권수가 다르면 ('흔한남매 3' vs '흔한남매 1') 글자가 비슷해도 다른 책
+            if numbers and _NUMBER.findall(self.normalized[title_id]) != numbers:
+                continue
+            if len(normalized) >= 2 and normalized in self.normalized[title_id]:
+                score = max(score, TITLE_SUBSTRING_SCORE)
+            if score >= min_score:
+                results.append((title_id, score))
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return [(self.titles[title_id], round(score, 4)) for title_id, score in results[:k]]
+
+    def resolve(self, candidates: list, min_score: float = TITLE_MATCH_MIN_SCORE) -> list:
+        """LLM 후보 제목들을 가장 잘 맞는 카탈로그 제목으로 바꿔서 반환 (못 찾은 후보는 제외, 중복 제거)"""
+        resolved = []
+        for candidate in candidates:
+            if not isinstance(candidate, str):
+                continue
+            matches = self.match(candidate, k=1, min_score=min_score)
+            if matches and matches[0][0] not in resolved:
+                resolved.append(matches[0][0])
+        return resolved
+
+
+_index = SnapshotCache(lambda snapshot: TitleIndex(book.get("title") for book in snapshot.books))
+
+
+def get_title_index() -> TitleIndex:
+    """카탈로그 스냅샷이 바뀌면 (파일 갱신) 색인을 다시 만듭니다."""
+    return _index.get()
@@ -0,0 +1,118 @@
+import asyncio
+import threading
+import time
+import pytest
+
+pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from models import deepseek_model
+from models.deepseek_model import BatchingInferenceWorker, build_prompt
+
+TINY_MODEL = "hf-internal-testing/tiny-random-LlamaForCausalLM"
+
+
+class FakeGenerateBatch:
+    """프롬프트와 max_tokens를 그대로 돌려주는 generate_batch (배치 하나에 일정 시간이 걸림)"""
+
+    def __init__(self, seconds: float = 0.05):
+        self.seconds = seconds
+        self.batch_sizes = []
+        self.fail_next = False
+        self.block = None
+
+    def __call__(self, prompts, max_tokens):
+        self.batch_sizes.append(len(prompts))
+        if self.block is not None:
+            self.block.wait()
+        time.sleep(self.seconds)
+        if self.fail_next:
+            self.fail_next = False
+            raise RuntimeError("generate 실패")
+        return [f"{prompt}|{limit}" for prompt, limit in zip(prompts, max_tokens)]
+
+
+def test_concurrent_requests_are_batched_and_routed_back():
+    generate = FakeGenerateBatch()
+    worker = BatchingInferenceWorker(generate_batch=generate, max_batch=8, max_wait_ms=20)
+
+    async def main():
+        async def call(i):
+            await asyncio.sleep(i % 3 * 0.001)
+            return await worker.generate([f"질문 {i}"], max_tokens=16 + i)
+        try:
+            return await asyncio.gather(*(call(i) for i in range(20)))
+        finally:
+            await worker.stop()
+
+    results = asyncio.run(main())
+    assert results == [f"{build_prompt([f'질문 {i}'])}|{16 + i}" for i in range(20)]
+    assert sum(generate.batch_sizes) == 20
+    assert max(generate.batch_sizes) <= 8
+    assert len(generate.batch_sizes) < 20
+
+
+def test_failed_batch_fails_its_requests_and_worker_keeps_running():
+    generate = FakeGenerateBatch()
+    worker = BatchingInferenceWorker(generate_batch=generate, max_batch=4, max_wait_ms=20)
+
+    async def main():
+        try:
+            generate.fail_next = True
+            failed = await asyncio.gather(*(worker.generate([f"실패 {i}"]) for i in range(3)), return_exceptions=True)
+            assert all(isinstance(result, RuntimeError) for result in failed)
+            assert await worker.generate(["정상"], max_tokens=5) == f"{build_prompt(['정상'])}|5"
+        finally:
+            await worker.stop()
+
+    asyncio.run(main())
+
+
+def test_stop_cancels_in_flight_and_queued_requests():
+    generate = FakeGenerateBatch()
+    generate.block = threading.Event()
+    worker = BatchingInferenceWorker(generate_batch=generate, max_batch=2, max_wait_ms=1)
+
+    async def main():
+        tasks = [asyncio.create_task(worker.generate([f"질문 {i}"])) for i in range(4)]
+        while not generate.batch_sizes:
+            await asyncio.sleep(0.005)  # 첫 배치가 생성 중
+        await worker.stop()
+        generate.block.set()
+        return await asyncio.wait_for(asyncio.gather(*tasks, return_exceptions=True), 1)
+
+    results = asyncio.run(main())
+    assert all(isinstance(result, asyncio.CancelledError) for result in results)
+
+
+def test_worker_restarts_on_a_new_event_loop():
+    worker = BatchingInferenceWorker(generate_batch=FakeGenerateBatch(0), max_wait_ms=1)
+    assert asyncio.run(worker.generate(["첫 루프"], 3)) == f"{build_prompt(['첫 루프'])}|3"
+    assert asyncio.run(worker.generate(["두 번째 루프"], 3)) == f"{build_prompt(['두 번째 루프'])}|3"
+
+
+@pytest.fixture
+def tiny_model(monkeypatch):
+    monkeypatch.setattr(deepseek_model, "LOCAL_MODEL_NAME", TINY_MODEL)
+    monkeypatch.setattr(deepseek_model, "_model", None)
+    monkeypatch.setattr(deepseek_model, "_tokenizer", None)
+    try:
+        deepseek_model.get_model()
+    except OSError as e:  # 체크포인트를 받을 수 없는 환경 (오프라인 등)
+        pytest.skip(f"{TINY_MODEL} 로드 실패: {e}")
+
+
+def test_tiny_model_batches_match_single_generation(tiny_model):
+    # 한 자리 숫자만 다른 프롬프트라 토큰 길이가 같아 패딩 없이 배치됨
+    prompts = [[f"질문 {i}"] for i in range(4)]
+    expected = [deepseek_model.generate_chat_response(messages, max_tokens=8) for messages in prompts]
+    worker = BatchingInferenceWorker(max_batch=4, max_wait_ms=50)
+
+    async def main():
+        try:
+            return await asyncio.gather(*(worker.generate(messages, max_tokens=8) for messages in prompts))
+        finally:
+            await worker.stop()
+
+    assert asyncio.run(main()) == expected
+    assert worker.stats()["batches"] == 1
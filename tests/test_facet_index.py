@@ -0,0 +1,17 @@
+from services.facet_index import infer_age_groups
+
+
+def test_decade_covers_every_overlapping_age_group():
+    assert infer_age_groups(["10대"]) == ["8-13", "14-16", "17-19"]
+    assert infer_age_groups(["30대 직장인"]) == ["20-39"]
+
+
+def test_teen_words_map_to_teen_groups():
+    assert infer_age_groups(["청소년"]) == ["14-16", "17-19"]
+    assert infer_age_groups(["십대"]) == ["8-13", "14-16", "17-19"]
+
+
+def test_hints_match_whole_tokens_only():
+    assert infer_age_groups(["노인과 바다"]) == []
+    assert infer_age_groups(["3세대"]) == []
+    assert infer_age_groups(["중학생 아들"]) == ["14-16"]
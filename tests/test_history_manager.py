@@ -0,0 +1,50 @@
+import asyncio
+import sys
+import types
+from services import history_manager
+from services.session_store import MemorySessionBackend, Session, SessionStore
+
+
+def test_summary_applies_after_messages_are_trimmed(monkeypatch):
+    store = SessionStore(MemorySessionBackend())
+    monkeypatch.setattr(history_manager, "user_sessions", store)
+    release = asyncio.Event()
+
+    async def llm_model_func(prompt, **kwargs):
+        await release.wait()
+        return "요약"
+
+    monkeypatch.setitem(sys.modules, "models.deepseek_lightrag", types.SimpleNamespace(llm_model_func=llm_model_func))
+
+    async def main():
+        session = Session("u1", "테스트")
+        session.messages = [{"role": "user", "content": str(i)} for i in range(40)]
+        session.summary, session.summarized_count = "이전 요약", 10
+        store.save(session)
+        task = history_manager.schedule_summary_update(session)
+        covered = 40 - history_manager.HISTORY_KEEP_MESSAGES  # 요약이 끝나면 messages[:covered]가 반영됨
+
+        # 요약이 끝나기 전에 다음 턴이 저장되면서 이미 요약된 앞쪽 메시지가 잘림
+        session.messages.extend({"role": "user", "content": f"new {i}"} for i in range(4))
+        store.save(session)
+        assert session.trimmed_count == 4 and session.summarized_count == 6
+
+        release.set()
+        await task
+        assert session.summary == "요약"
+        # 잘린 만큼 당겨서 반영했으므로 아직 요약되지 않은 첫 메시지는 원래 covered번째 메시지
+        assert session.messages[session.summarized_count]["content"] == str(covered)
+        assert session.summarized_count == covered - 4
+
+    asyncio.run(main())
+
+
+def test_trim_keeps_unsummarized_messages_up_to_hard_cap():
+    session = Session("u2")
+    session.messages = list(range(50))
+    session.summarized_count = 5
+    session.trim(max_messages=40)
+    assert session.messages[0] == 5 and session.summarized_count == 0
+    session.messages = list(range(100))
+    session.trim(max_messages=40)
+    assert len(session.messages) == 80
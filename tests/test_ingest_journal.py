@@ -0,0 +1,21 @@
+from services.ingest_journal import IngestJournal
+
+
+def test_restart_after_torn_write_keeps_next_record(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    journal = IngestJournal(str(path))
+    journal.record("book-1", "h1", "ok", 0.1)
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"key": "book-2", "hash": "h2", "sta')  # 기록 도중 중단
+
+    journal = IngestJournal(str(path))
+    assert journal.is_done("book-1", "h1")
+    assert "book-2" not in journal.state
+    journal.record("book-2", "h2", "ok", 0.1)
+    journal.close()
+
+    journal = IngestJournal(str(path))
+    assert journal.is_done("book-1", "h1")
+    assert journal.is_done("book-2", "h2")
+    journal.close()
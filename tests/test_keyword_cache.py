@@ -0,0 +1,20 @@
+import asyncio
+
+from services.keyword_cache import KeywordCache
+
+
+def test_async_put_persists_to_disk(tmp_path):
+    path = str(tmp_path / "keywords.db")
+
+    async def scenario():
+        await KeywordCache(disk_path=path).aput("왕따가 걱정돼요!!", ["왕따"])
+        restarted = KeywordCache(disk_path=path)
+        first = await restarted.aget("왕따가 걱정돼요")
+        second = await restarted.aget("왕따가 걱정돼요")
+        return restarted, first, second
+
+    restarted, first, second = asyncio.run(scenario())
+    assert first == second == ["왕따"]
+    assert (restarted.disk_hits, restarted.hits, restarted.misses) == (1, 1, 0)
+    assert asyncio.run(restarted.aget("다른 메시지")) is None
+    assert restarted.misses == 1
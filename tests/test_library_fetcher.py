@@ -0,0 +1,36 @@
+import asyncio
+
+from services.library_fetcher import LibraryFetcher
+
+
+class FakeFetcher(LibraryFetcher):
+    def __init__(self, lists_by_age):
+        super().__init__(auth_key="test")
+        self.lists_by_age = lists_by_age
+
+    async def fetch_age_group_lists(self, page_size: int = 200) -> list:
+        return self.lists_by_age
+
+    async def fetch_book_details(self, isbn13: str):
+        return f"summary-{isbn13}", []
+
+
+def _doc(isbn, title):
+    return {"doc": {"isbn13": isbn, "bookname": title}}
+
+
+def test_merge_keeps_existing_ages_and_unmatched_books():
+    existing = [
+        {"isbn13": "111", "title": "old", "age": ["40-59"], "note": "kept"},
+        {"isbn13": "222", "title": "gone", "age": ["60-80"]},
+    ]
+    fetcher = FakeFetcher([("8-13", [_doc("111", "new")]), ("14-16", [_doc("333", "fresh")])])
+
+    books = asyncio.run(fetcher.fetch_popular_books_all_ages(existing_books=existing))
+
+    by_isbn = {b["isbn13"]: b for b in books}
+    assert by_isbn["111"]["age"] == ["8-13", "40-59"]
+    assert by_isbn["111"]["title"] == "new"
+    assert by_isbn["111"]["note"] == "kept"
+    assert by_isbn["222"] == existing[1]
+    assert by_isbn["333"]["age"] == ["14-16"]
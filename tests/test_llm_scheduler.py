@@ -0,0 +1,55 @@
+import asyncio
+import copy
+from services.llm_scheduler import BULK, INTERACTIVE, CallerPriority, current_priority, llm_priority
+
+
+def test_priority_survives_a_long_lived_worker_task():
+    """LightRAG priority_limit_async_func_call처럼 처음 호출자의 컨텍스트로 만든 워커가 호출을 대신 실행해도 우선순위 유지"""
+    received = []
+
+    async def model_func(prompt, priority=None):
+        received.append((prompt, priority, current_priority()))
+        return prompt
+
+    async def main():
+        queue = asyncio.Queue()
+        worker = None
+
+        async def run_worker():
+            while True:
+                args, kwargs, future = await queue.get()
+                future.set_result(await model_func(*args, **kwargs))
+
+        async def queued_func(*args, **kwargs):
+            nonlocal worker
+            if worker is None:
+                worker = asyncio.create_task(run_worker())  # 첫 호출자의 컨텍스트를 복사
+            future = asyncio.get_running_loop().create_future()
+            await queue.put((args, kwargs, future))
+            return await future
+
+        wrapped = CallerPriority(queued_func)
+        with llm_priority(BULK):
+            await wrapped("ingest")
+        await wrapped("chat")
+        with llm_priority(BULK):
+            await wrapped("summary")
+        worker.cancel()
+
+    asyncio.run(main())
+    assert [(prompt, priority) for prompt, priority, _ in received] == [
+        ("ingest", BULK), ("chat", INTERACTIVE), ("summary", BULK)
+    ]
+    # ContextVar만 보면 워커는 첫 호출자(BULK) 값을 계속 봄
+    assert received[1][2] == BULK
+
+
+def test_wrapper_keeps_attributes_and_survives_deepcopy():
+    async def embed(texts, priority=None):
+        return priority
+
+    embed.embedding_dim = 1536
+    wrapped = CallerPriority(embed)
+    assert wrapped.embedding_dim == 1536
+    assert copy.deepcopy({"func": wrapped})["func"] is wrapped
+    assert asyncio.run(wrapped(["a"], priority=BULK)) == BULK
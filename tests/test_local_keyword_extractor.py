@@ -0,0 +1,18 @@
+from services.local_keyword_extractor import LocalKeywordExtractor
+
+
+def _extractor(*words):
+    return LocalKeywordExtractor([{"keywords": [{"word": w, "weight": 1}]} for w in words])
+
+
+def test_prefix_match_requires_particle():
+    extractor = _extractor("사랑", "우정", "학교", "사회 문제")
+    assert extractor.extract("사랑니가 아파요") == ([], 0.0)
+    keywords, _ = extractor.extract("학교에서는 우정을 사회 문제에 대해")
+    assert set(keywords) == {"학교", "우정", "사회 문제"}
+
+
+def test_one_hit_in_two_tokens_is_not_full_confidence():
+    keywords, confidence = _extractor("우정").extract("우정이 좋아요")
+    assert keywords == ["우정"]
+    assert confidence < 1.0
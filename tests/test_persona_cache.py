@@ -0,0 +1,19 @@
+import types
+
+from services import book_catalog, persona_cache
+
+
+def _snapshot(*titles):
+    books = [{"title": t, "age": ["8-13"], "keywords": [{"word": "우정", "weight": 1}]} for t in titles]
+    return types.SimpleNamespace(books=books)
+
+
+def test_recommend_uses_indexes_built_from_the_given_snapshot(monkeypatch):
+    old, latest = _snapshot("옛 책"), _snapshot("새 책 1", "새 책 2")
+    catalog = types.SimpleNamespace(snapshot=lambda: latest)
+    monkeypatch.setattr(book_catalog, "get_catalog", lambda: catalog)
+    monkeypatch.setattr(persona_cache, "get_catalog", lambda: catalog)
+
+    assert [b["title"] for b, _ in persona_cache.recommend_for_profile(["우정"], age=["8-13"], snapshot=old)] == ["옛 책"]
+    assert [b["title"] for b, _ in persona_cache.recommend_for_profile([], age=["8-13"], snapshot=old)] == ["옛 책"]
+    assert len(persona_cache.recommend_for_profile([], age=["8-13"])) == 2
@@ -0,0 +1,49 @@
+import asyncio
+import types
+import numpy as np
+from services.query_cache import QueryCache
+
+
+class FakeRag:
+    def __init__(self):
+        self.calls = 0
+
+    async def aquery(self, query, param, system_prompt=None):
+        self.calls += 1
+        return f"answer {self.calls}"
+
+
+async def embed_by_first_char(batch):
+    """첫 글자가 같으면 같은 벡터"""
+    vectors = np.zeros((len(batch), 8), dtype=np.float32)
+    for i, text in enumerate(batch):
+        vectors[i, ord(text[0]) % 8] = 1.0
+    return vectors
+
+
+def test_semantic_hit_uses_bucket_matrix_and_skips_removed_entries():
+    cache = QueryCache(max_entries=3, similarity_threshold=0.99)
+    rag, param = FakeRag(), types.SimpleNamespace(mode="global")
+
+    async def ask(query, prompt_key="p"):
+        return await cache.aquery(rag, query, param, embed=embed_by_first_char, prompt_key=prompt_key)
+
+    async def main():
+        assert await ask("a first") == "answer 1"
+        assert await ask("a second") == "answer 1"      # 같은 버킷의 유사 질의
+        assert await ask("a third", "other") == "answer 2"  # 다른 버킷은 섞이지 않음
+        for query in ("b", "c", "d"):                   # max_entries를 넘겨 앞 항목 제거
+            await ask(query)
+        assert await ask("a again") == "answer 6"          # 제거된 'a' 항목과는 매칭되지 않음
+
+    asyncio.run(main())
+    assert cache.semantic_hits == 1
+    assert sum(len(v.keys) for v in cache._vectors.values()) == len(cache._entries)
+
+
+def test_exact_hit_expires_after_ttl():
+    cache = QueryCache(ttl_seconds=-1)
+    rag, param = FakeRag(), types.SimpleNamespace(mode="local")
+    asyncio.run(cache.aquery(rag, "q", param, prompt_key="p"))
+    asyncio.run(cache.aquery(rag, "q", param, prompt_key="p"))
+    assert rag.calls == 2
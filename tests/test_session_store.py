@@ -0,0 +1,34 @@
+import asyncio
+
+from services.session_store import Session, SessionStore, SQLiteSessionBackend
+
+
+def test_concurrent_appends_from_two_workers_keep_both_messages(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    worker_a, worker_b = SQLiteSessionBackend(path), SQLiteSessionBackend(path)
+    worker_a.save(Session("u1", "민수"))
+
+    session_a, session_b = worker_a.load("u1"), worker_b.load("u1")
+    session_a.messages.append({"role": "user", "content": "a"})
+    session_b.messages.append({"role": "user", "content": "b"})
+    worker_a.save(session_a)
+    worker_b.save(session_b)
+
+    contents = [m["content"] for m in SQLiteSessionBackend(path).load("u1").messages]
+    assert contents == ["a", "b"]
+
+
+def test_user_type_is_persisted_through_async_save(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = SessionStore(SQLiteSessionBackend(path))
+    store.save(Session("u1", "민수"))
+
+    async def classify():
+        session = await store.aget("u1")
+        session["user_type"] = "탐험가형"
+        session["user_type_reason"] = "새로운 주제를 좋아함"
+        await store.asave(session)
+
+    asyncio.run(classify())
+    other_worker = SQLiteSessionBackend(path).load("u1")
+    assert (other_worker.user_type, other_worker.user_type_reason) == ("탐험가형", "새로운 주제를 좋아함")